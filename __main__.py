@@ -0,0 +1,10 @@
+# __main__.py
+# Gjør det mulig å kjøre pakken med ``python -m py_viz``.
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+sys.exit(main())
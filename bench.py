@@ -0,0 +1,279 @@
+# bench.py
+"""
+Ytelsesmålinger på syntetiske kodebaser.
+
+Genererer Python-kilde med et valgfritt antall funksjoner og klasser,
+kall-fan-out og nestingsdybde, og tar tiden på ``parse_file``,
+``Graph.build`` (med og uten layout), layoutene og ``NodeCanvas.load_graph``. Canvaset
+erstattes av ``RecordingCanvas``, som husker elementene i minnet, så det
+trengs ingen skjerm.
+
+Hver måling skrives som én JSON-linje, slik at kjøringer kan
+sammenlignes og skaleringskurver plottes:
+
+    python bench.py --sizes 100 1000 10000 --fanout 3 10 -o bench_results.jsonl
+"""
+import argparse
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from graph_model import Graph
+from parser import parse_file
+
+STAGES = ("parse_file", "Graph.build", "Graph.build+layout", "Graph.build+multilevel", "layout", "layout.multilevel", "layout.layered",
+          "layout.components", "NodeCanvas.load_graph", "NodeCanvas.auto_pan_zoom")
+
+
+# ---------- syntetisk kilde ----------
+def generate_source(functions: int, classes: int = 0, fanout: int = 3, depth: int = 1,
+                    methods: int = 3, seed: int = 0) -> str:
+    """Lag en modul med ``functions`` toppnivåfunksjoner og ``classes`` klasser.
+
+    Hver funksjon og metode kaller ``fanout`` tilfeldige toppnivåfunksjoner.
+    Med ``depth`` > 1 får hver funksjon en kjede av nøstede hjelpefunksjoner
+    ``depth - 1`` nivåer ned.
+    """
+    rng = random.Random(seed)
+    names = [f"func_{i}" for i in range(functions)]
+    lines: list[str] = []
+
+    def body(name: str, indent: int, level: int):
+        pad = "    " * indent
+        for callee in rng.sample(names, min(fanout, len(names))):
+            lines.append(f"{pad}y = {callee}(x)")
+        if level < depth:
+            inner = f"{name}_inner{level}"
+            lines.append(f"{pad}def {inner}(x):")
+            body(inner, indent + 1, level + 1)
+            lines.append(f"{pad}y = {inner}(y)")
+        lines.append(f"{pad}return y")
+
+    for name in names:
+        lines.append(f"def {name}(x, y=None):")
+        body(name, 1, 1)
+        lines.append("")
+    for c in range(classes):
+        lines.append(f"class Class_{c}:")
+        for m in range(methods):
+            lines.append(f"    def m{c}_{m}(self, x, y=None):")
+            body(f"m{c}_{m}", 2, 1)
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- canvas uten skjerm ----------
+def recording_canvas(graph, width: int = 1200, height: int = 800):
+    """En ``NodeCanvas`` som tegner til en ordbok i stedet for Tk.
+
+    Importeres lat, så benchmarken fungerer (uten canvas-målingene) også
+    der tkinter mangler.
+    """
+    from gui_main import NodeCanvas
+
+    class RecordingCanvas(NodeCanvas):
+        def __init__(self, graph):
+            self.graph = graph
+            self.recorded: dict[int, dict] = {}
+            self._ids = itertools.count(1)
+            self._size = (width, height)
+            self._scrollregion = (0.0, 0.0, 4000.0, 4000.0)
+            self._origin = (0.0, 0.0)
+            self._init_state()
+
+        def _create(self, kind, coords, tags=(), **options):
+            item = next(self._ids)
+            self.recorded[item] = {"kind": kind, "coords": list(coords), "tags": tuple(tags), **options}
+            return item
+
+        def create_rectangle(self, *coords, **options):
+            return self._create("rectangle", coords, **options)
+
+        def create_oval(self, *coords, **options):
+            return self._create("oval", coords, **options)
+
+        def create_line(self, *coords, **options):
+            return self._create("line", coords, **options)
+
+        def create_text(self, *coords, **options):
+            return self._create("text", coords, **options)
+
+        def find_withtag(self, tag):
+            if isinstance(tag, int):
+                return (tag,) if tag in self.recorded else ()
+            return tuple(i for i, item in self.recorded.items() if tag in item["tags"])
+
+        def delete(self, *items):
+            for tag in items:
+                for item in list(self.recorded) if tag == "all" else self.find_withtag(tag):
+                    del self.recorded[item]
+
+        def coords(self, item, *coords):
+            if coords:
+                self.recorded[item]["coords"] = list(coords)
+            return self.recorded[item]["coords"]
+
+        def itemconfig(self, tag, **options):
+            for item in self.find_withtag(tag):
+                self.recorded[item].update(options)
+
+        def move(self, tag, dx, dy):
+            for item in self.find_withtag(tag):
+                c = self.recorded[item]["coords"]
+                c[0::2] = [v + dx for v in c[0::2]]
+                c[1::2] = [v + dy for v in c[1::2]]
+
+        def tag_raise(self, *tags):
+            pass
+
+        def tag_lower(self, *tags):
+            pass
+
+        def canvasx(self, x):
+            return self._origin[0] + x
+
+        def canvasy(self, y):
+            return self._origin[1] + y
+
+        def winfo_width(self):
+            return self._size[0]
+
+        def winfo_height(self):
+            return self._size[1]
+
+        def configure(self, scrollregion=None, **options):
+            if scrollregion is not None:
+                self._scrollregion = tuple(float(v) for v in scrollregion)
+
+        def cget(self, key):
+            return " ".join(str(v) for v in self._scrollregion)
+
+        def xview_moveto(self, fraction):
+            x0, _, x1, _ = self._scrollregion
+            self._origin = (x0 + fraction * (x1 - x0), self._origin[1])
+
+        def yview_moveto(self, fraction):
+            _, y0, _, y1 = self._scrollregion
+            self._origin = (self._origin[0], y0 + fraction * (y1 - y0))
+
+        def after(self, ms, func=None, *args):
+            pass
+
+        def after_idle(self, func, *args):
+            func(*args)
+
+    return RecordingCanvas(graph)
+
+
+# ---------- måling ----------
+def timed(func, repeat: int = 1) -> float:
+    """Beste tid i sekunder over ``repeat`` kjøringer."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(functions: int, classes: int, fanout: int, depth: int, repeat: int = 1,
+             canvas: bool = True, seed: int = 0) -> list[dict]:
+    """Mål alle trinn for én størrelse og returner én post per trinn."""
+    source = generate_source(functions, classes, fanout, depth, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.py"
+        path.write_text(source, encoding="utf8")
+        parsed = parse_file(path)
+        seconds = {"parse_file": timed(lambda: parse_file(path), repeat)}
+
+    nodes, edges, groups = parsed
+    graph = Graph()
+    seconds["Graph.build"] = timed(lambda: graph.build(nodes, edges, groups, layout=False), repeat)
+    # Hele byggingen slik GUI-et og CLI-et kjører den: force-layout og overlappsløsning
+    seconds["Graph.build+layout"] = timed(lambda: graph.build(nodes, edges, groups), repeat)
+    seconds["Graph.build+multilevel"] = timed(lambda: graph.build(nodes, edges, groups, engine="multilevel"),
+                                              repeat)
+
+    def layout():
+        graph.build(nodes, edges, groups, layout=False)
+        graph._apply_force_directed_layout()
+    seconds["layout"] = timed(layout, repeat)
+
+    for engine in ("multilevel", "layered", "components"):
+        def other():
+            graph.build(nodes, edges, groups, layout=False)
+            graph.apply_layout(engine)
+        seconds[f"layout.{engine}"] = timed(other, repeat)
+
+    if canvas:
+        try:
+            view = recording_canvas(graph)
+        except ImportError:
+            view = None
+        if view is not None:
+            seconds["NodeCanvas.load_graph"] = timed(lambda: view.load_graph(graph), repeat)
+            seconds["NodeCanvas.auto_pan_zoom"] = timed(view.auto_pan_zoom, repeat)
+
+    common = {
+        "functions": functions, "classes": classes, "fanout": fanout, "depth": depth,
+        "nodes": len(graph.nodes), "edges": len(graph.edges), "source_bytes": len(source),
+        "repeat": repeat,
+    }
+    return [{"stage": stage, "seconds": s, **common} for stage, s in seconds.items()]
+
+
+def scaling(records: list[dict]) -> dict[str, float]:
+    """Log-log-stigning av tid mot antall noder per trinn (1 ≈ lineær, 2 ≈ kvadratisk)."""
+    slopes = {}
+    for stage in STAGES:
+        points = sorted((r["nodes"], r["seconds"]) for r in records
+                        if r["stage"] == stage and r["nodes"] > 0 and r["seconds"] > 0)
+        if len(points) >= 2 and points[-1][0] > points[0][0]:
+            (n0, t0), (n1, t1) = points[0], points[-1]
+            slopes[stage] = math.log(t1 / t0) / math.log(n1 / n0)
+    return slopes
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python bench.py", description="Ytelsesmålinger på syntetisk kode")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="antall funksjoner")
+    ap.add_argument("--class-ratio", type=float, default=0.05, help="klasser per funksjon (standard: 0.05)")
+    ap.add_argument("--fanout", type=int, nargs="+", default=[3], help="kall per funksjon")
+    ap.add_argument("--depth", type=int, nargs="+", default=[1], help="nestingsdybde (1 = ingen nøsting)")
+    ap.add_argument("--repeat", type=int, default=1, help="ta beste tid av så mange kjøringer")
+    ap.add_argument("--no-canvas", action="store_true", help="hopp over NodeCanvas-målingene")
+    ap.add_argument("-o", "--output", type=Path, default=Path("bench_results.jsonl"),
+                    help="JSON Lines-fil resultatene legges til i")
+    return ap
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    run = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+           "machine": platform.machine()}
+    records = []
+    with open(args.output, "a", encoding="utf8") as out:
+        for fanout, depth, size in itertools.product(args.fanout, args.depth, args.sizes):
+            case = run_case(size, int(size * args.class_ratio), fanout, depth, args.repeat, not args.no_canvas)
+            for record in case:
+                out.write(json.dumps({**run, **record}) + "\n")
+                print(f"{record['stage']:<26} n={record['nodes']:<7} e={record['edges']:<8} "
+                      f"fanout={fanout} depth={depth} {record['seconds']:.4f}s")
+            out.flush()
+            records.extend(case)
+
+    for (fanout, depth), group in itertools.groupby(records, key=lambda r: (r["fanout"], r["depth"])):
+        for stage, slope in scaling(list(group)).items():
+            print(f"scaling fanout={fanout} depth={depth} {stage}: n^{slope:.2f}")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# cli.py
+"""
+Kommandolinje uten GUI: parser en fil eller et prosjekt, legger ut grafen
+og eksporterer den. Tk importeres bare med ``--gui``.
+
+    python -m cli prosjekt/ -o graph -f json svg pvg
+    python -m cli graph.pvg -f svg
+    python -m cli graph.pvg -f tiles     # graph.tiles/z/x/y.png, zoombar flispyramide
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+FORMATS = ("json", "jsonl", "xml", "svg", "png", "tiles", "pvg")
+LAYOUTS = ("force", "multilevel", "layered", "components")  # som graph_model.LAYOUTS, uten å importere numpy for --help
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m cli", description="Python Node Visualizer")
+    ap.add_argument("path", type=Path, help="Python-fil, prosjektmappe eller lagret graf (.pvg/.jsonl/.xml)")
+    ap.add_argument("-o", "--output", default="graph", help="filnavn uten endelse (standard: graph)")
+    ap.add_argument("-f", "--format", nargs="+", choices=FORMATS, default=["json"],
+                    help="ett eller flere eksportformater; tiles skriver en mappe med PNG-fliser")
+    ap.add_argument("-j", "--workers", type=int, default=None,
+                    help="antall parse-prosesser for mapper (standard: antall kjerner)")
+    ap.add_argument("--no-cache", action="store_true", help="ikke bruk parse-cachen")
+    ap.add_argument("--layout", choices=LAYOUTS, default="force",
+                    help="force: kraftbasert; multilevel: kraftbasert på grovkornede nivåer, "
+                         "raskere på store grafer; layered: lagdelt, kallere til venstre; components: hver "
+                         "sammenhengende del for seg, parallelt, og pakket etterpå (standard: force)")
+    ap.add_argument("--compact", action="store_true",
+                    help="hold grafen i array-form (CompactGraph), for svært store grafer")
+    ap.add_argument("-v", "--verbose", action="count", default=0, help="mer logging (-vv for debug)")
+    ap.add_argument("--profile", action="store_true",
+                    help="skriv tid og tellere per trinn til stderr etter kjøringen")
+    ap.add_argument("--gui", action="store_true", help="åpne stien i GUI-et i stedet for å eksportere")
+    return ap
+
+
+def load_graph(path: Path, workers=None, use_cache=True, compact=False, engine="force"):
+    """Les en lagret graf direkte, eller parse og legg ut Python-kilde."""
+    if path.suffix == ".pvg":
+        from snapshot import load_snapshot
+        return load_snapshot(str(path), compact=compact)
+    if path.suffix in (".jsonl", ".xml"):
+        import export
+        return getattr(export, f"load_{path.suffix[1:]}")(str(path), compact=compact)
+
+    from compact_graph import CompactGraph
+    from graph_model import Graph
+    from parse_cache import ParseCache
+    from parser import parse_file, parse_project
+
+    cache = ParseCache() if use_cache else None
+    try:
+        if path.is_dir():
+            nodes, edges, groups = parse_project(path, workers=workers, cache=cache)
+        else:
+            nodes, edges, groups = parse_file(path, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    graph = CompactGraph() if compact else Graph()
+    graph.build(nodes, edges, groups, engine=engine)
+    return graph
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    levels = [logging.WARNING, logging.INFO, logging.DEBUG]
+    logging.basicConfig(level=levels[min(args.verbose, 2)], format="%(levelname)s %(name)s: %(message)s")
+    if not args.path.exists():
+        print(f"No such file or directory: {args.path}", file=sys.stderr)
+        return 2
+
+    if args.gui:
+        import gui_main  # trekker inn tkinter
+        gui_main.main(args.path)
+        return 0
+
+    import export
+    import instrument
+    import snapshot
+
+    profile = instrument.enable() if args.profile else None
+    with instrument.stage("load"):
+        graph = load_graph(args.path, args.workers, not args.no_cache, args.compact, args.layout)
+    for fmt in args.format:
+        with instrument.stage(f"export.{fmt}"):
+            if fmt == "pvg":
+                snapshot.save_snapshot(graph, args.output)
+            else:
+                getattr(export, f"export_to_{fmt}")(graph, args.output)
+        print(f"Wrote {args.output}.{fmt}")
+    if profile is not None:
+        instrument.disable()
+        print(profile.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
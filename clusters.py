@@ -0,0 +1,497 @@
+# clusters.py
+"""
+Sammenfoldbare klynger av pakker, moduler og klasser over en ``Graph``.
+
+Nodene ordnes i et tre etter de kvalifiserte navnene (``pakke.modul:navn``)
+og ``Graph.group_of``: pakke → modul → klasse → funksjon. Bladene nummereres
+i dybde-først-rekkefølge, så hver klynge dekker et sammenhengende intervall
+``[lo, hi)`` av blad-id-er, og kantene sorteres etter kilde og mål.
+
+Det som vises er et «snitt» gjennom treet: sammenfoldede klynger som bokser,
+utfoldede klynger som rammer rundt barna sine, og blader som vanlige noder.
+``rep`` sier hvilket synlig element hvert blad hører til. Kantene mellom
+synlige elementer slås sammen til ``ClusterEdge`` med antall kall; når en
+klynge foldes ut eller sammen, regnes bare kantene inn til og ut fra
+intervallet dens om.
+
+Ved bygging regnes i tillegg, for hver klynge, de sammenslåtte kantene
+mellom barna dens ut (via laveste felles forfar til hver kant). De brukes
+til å legge ut barna først når klyngen foldes ut første gang, så bare
+toppnivået legges ut når grafen åpnes.
+"""
+import logging
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import instrument
+from graph_model import Graph, Node, layout_arrays
+from layout import resolve_overlaps
+
+log = logging.getLogger(__name__)
+
+PAD = 30  # luft inne i en utfoldet ramme
+HEADER = 40  # plass til navnet øverst i en utfoldet ramme
+BOX_MIN, BOX_MAX = 160, 640  # bredde på sammenfoldede klynger, skalert med antall noder
+
+
+@dataclass(eq=False)
+class Cluster:
+    name: str  # "pakke", "pakke.modul" eller "pakke.modul:Klasse"
+    kind: str  # "root", "package", "module" eller "class"
+    parent: "Cluster | None" = None
+    children: list["Cluster"] = field(default_factory=list)
+    members: list[str] = field(default_factory=list)  # nodene som ligger rett under klyngen
+    id: int = 0
+    lo: int = 0  # bladintervallet [lo, hi)
+    hi: int = 0
+    x: float = 0.0  # boksen når klyngen er sammenfoldet, rammen når den er utfoldet
+    y: float = 0.0
+    width: float = 0.0
+    height: float = 0.0
+    expanded: bool = False
+    laid_out: bool = False  # barna har fått posisjoner
+
+    @property
+    def size(self) -> int:
+        """Antall noder i klyngen, også i underklyngene."""
+        return self.hi - self.lo
+
+    @property
+    def label(self) -> str:
+        return self.name.rpartition(":")[2] if ":" in self.name else self.name.rpartition(".")[2]
+
+
+@dataclass(eq=False)
+class ClusterEdge:
+    src: object  # Cluster eller Node
+    dst: object
+    count: int  # antall kall som er slått sammen
+    ids: tuple[int, int] = (0, 0)  # (src, dst) som element-id-er i treet
+
+
+@dataclass
+class ClusterChange:
+    """Hva canvaset må fjerne, tegne og flytte etter ``expand``/``collapse``."""
+    removed: list = field(default_factory=list)
+    added: list = field(default_factory=list)
+    moved: list = field(default_factory=list)  # fortsatt synlige, med ny posisjon eller ny telling
+
+    def is_empty(self) -> bool:
+        return not (self.removed or self.added or self.moved)
+
+
+def module_of(name: str) -> str:
+    """Modulnavnet i ``modul:navn``; tom streng for ukvalifiserte navn (én fil)."""
+    return name.partition(":")[0] if ":" in name else ""
+
+
+class ClusterTree:
+    def __init__(self, graph: Graph, node_size: tuple[int, int] | None = None,
+                 expanded=(), progress=None, engine="force"):
+        """Bygg treet og legg ut toppnivået med ``engine`` (se ``graph_model.LAYOUTS``).
+
+        ``node_size`` gis nodene når de legges ut, så layouten stemmer med
+        størrelsen canvaset tegner dem i. Klyngene i ``expanded`` (navn)
+        foldes ut med en gang, f.eks. når treet bygges på nytt etter en
+        endring i kildene.
+        """
+        self.graph = graph
+        self.node_size = node_size
+        self.engine = engine
+        with instrument.stage("clusters.build"):
+            self._build_tree()
+            self._build_edges()
+            self._aggregate_local()
+        if progress is not None:
+            progress(0.5)
+        with instrument.stage("clusters.layout"):
+            self._layout_children(self.root)
+            self._assign(self.root)
+            self._edges_at: dict[int, set] = {}
+            self.edges: dict[tuple[int, int], ClusterEdge] = {}
+            self._add_pairs(np.arange(len(self.src)), ClusterChange())
+            for name in expanded:
+                cluster = self.by_name.get(name)
+                if cluster is not None:
+                    self.expand(cluster)
+            if not expanded:
+                # En enkelt pakke øverst foldes ut, så grafen åpner på modulnivå
+                top = self.root
+                while len(top.children) == 1 and not top.members:
+                    top = top.children[0]
+                    self.expand(top)
+        instrument.count("clusters.clusters", len(self.clusters))
+        log.info("Clustered %d nodes into %d clusters.", len(self.leaves), len(self.clusters) - 1)
+
+    # ---------- bygging ----------
+    def _cluster(self, name: str, kind: str, parent: Cluster) -> Cluster:
+        cluster = self.by_name.get(name)
+        if cluster is None:
+            cluster = Cluster(name, kind, parent)
+            self.by_name[name] = cluster
+            parent.children.append(cluster)
+        return cluster
+
+    def _module(self, module: str) -> Cluster:
+        """Klyngen for ``module``, med en klynge per pakke over den."""
+        if not module:
+            return self.root
+        cluster = self.by_name.get(module)
+        if cluster is None:
+            package, _, _ = module.rpartition(".")
+            parent = self._module(package)
+            if parent.kind == "module":
+                parent.kind = "package"  # pakke med egen __init__.py
+            cluster = self._cluster(module, "module", parent)
+        return cluster
+
+    def _build_tree(self):
+        graph = self.graph
+        self.root = Cluster("", "root", expanded=True)
+        self.by_name: dict[str, Cluster] = {}
+        for name in graph.nodes:
+            group = graph.group_of.get(name)
+            if group is not None and group in graph.groups:
+                parent = self._cluster(group, "class", self._module(module_of(group)))
+            else:
+                parent = self._module(module_of(name))
+            parent.members.append(name)
+
+        # Dybde-først: hver klynge får et sammenhengende bladintervall
+        self.clusters: list[Cluster] = []
+        self.leaves: list[str] = []
+        stack = [(self.root, False)]
+        while stack:
+            cluster, done = stack.pop()
+            if done:
+                cluster.hi = len(self.leaves)
+                continue
+            cluster.id = len(self.clusters)
+            self.clusters.append(cluster)
+            cluster.lo = len(self.leaves)
+            self.leaves.extend(cluster.members)
+            cluster.children.sort(key=lambda c: c.name)
+            stack.append((cluster, True))
+            stack.extend((child, False) for child in reversed(cluster.children))
+
+        n_clusters = len(self.clusters)
+        self.leaf_id = {name: i for i, name in enumerate(self.leaves)}
+        self.nodes: list[Node] = [graph.nodes[name] for name in self.leaves]
+        total = n_clusters + len(self.leaves)
+        # Element-id-er: klynger først, så bladene forskjøvet med antall klynger
+        self.parent = np.zeros(total, dtype=np.int64)
+        self.depth = np.zeros(total, dtype=np.int64)
+        for cluster in self.clusters[1:]:
+            self.parent[cluster.id] = cluster.parent.id
+            self.depth[cluster.id] = self.depth[cluster.parent.id] + 1
+        for cluster in self.clusters:
+            ids = np.arange(cluster.lo, cluster.lo + len(cluster.members)) + n_clusters
+            self.parent[ids] = cluster.id
+            self.depth[ids] = self.depth[cluster.id] + 1
+        self.rep = np.zeros(len(self.leaves), dtype=np.int64)
+
+    def _build_edges(self):
+        leaf_id = self.leaf_id
+        pairs = [(leaf_id[e.src.info.name], leaf_id[e.dst.info.name]) for e in self.graph.edges]
+        pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        self.src, self.dst = pairs[:, 0], pairs[:, 1]
+        self.weight = np.array([e.weight for e in self.graph.edges], dtype=np.int64)  # kall per kant
+        # Kantene sortert etter kilde og etter mål, så kantene til et bladintervall er to skiver
+        self.by_src = np.argsort(self.src, kind="stable")
+        self.by_dst = np.argsort(self.dst, kind="stable")
+        self.src_sorted = self.src[self.by_src]
+        self.dst_sorted = self.dst[self.by_dst]
+
+    def _aggregate_local(self):
+        """Sammenslåtte kanter mellom barna til hver klynge, gruppert på klyngen."""
+        offset = len(self.clusters)
+        a, b = self.src + offset, self.dst + offset
+        keep = a != b
+        a, b, weight = a[keep], b[keep], self.weight[keep]
+        if not len(a):
+            self.local = np.zeros((0, 3), dtype=np.int64)
+            self.local_counts = np.zeros(0, dtype=np.int64)
+            self.local_start = np.zeros(len(self.clusters) + 1, dtype=np.int64)
+            return
+        child_a, child_b = a.copy(), b.copy()
+        active = np.ones(len(a), dtype=bool)
+        while active.any():
+            # Løft den dypeste siden (begge ved lik dybde) til de møtes i felles forfar
+            da, db = self.depth[a], self.depth[b]
+            up_a, up_b = active & (da >= db), active & (db >= da)
+            child_a[up_a], a[up_a] = a[up_a], self.parent[a[up_a]]
+            child_b[up_b], b[up_b] = b[up_b], self.parent[b[up_b]]
+            active = a != b
+        # Antall kall, ikke antall kanter: en kant kan stå for flere kallsteder
+        rows, inverse = np.unique(np.stack([a, child_a, child_b], axis=1), axis=0, return_inverse=True)
+        self.local = rows
+        self.local_counts = np.bincount(inverse.ravel(), weights=weight, minlength=len(rows)).astype(np.int64)
+        self.local_start = np.searchsorted(rows[:, 0], np.arange(len(self.clusters) + 1))
+
+    # ---------- snitt og kanter ----------
+    def item(self, i: int):
+        """Klyngen eller noden med element-id ``i``."""
+        offset = len(self.clusters)
+        return self.clusters[i] if i < offset else self.nodes[i - offset]
+
+    def item_id(self, key) -> int | None:
+        if isinstance(key, Cluster):
+            return key.id
+        leaf = self.leaf_id.get(key.info.name)
+        return None if leaf is None else leaf + len(self.clusters)
+
+    def _assign(self, cluster: Cluster):
+        """La bladene i ``cluster`` representeres av barna dens."""
+        members = len(cluster.members)
+        self.rep[cluster.lo:cluster.lo + members] = np.arange(cluster.lo, cluster.lo + members) + len(self.clusters)
+        for child in cluster.children:
+            self.rep[child.lo:child.hi] = child.id
+
+    def _incident(self, cluster: Cluster) -> np.ndarray:
+        """Kantene med minst ett endepunkt i bladintervallet til ``cluster``."""
+        lo, hi = cluster.lo, cluster.hi
+        out = self.by_src[np.searchsorted(self.src_sorted, lo):np.searchsorted(self.src_sorted, hi)]
+        inc = self.by_dst[np.searchsorted(self.dst_sorted, lo):np.searchsorted(self.dst_sorted, hi)]
+        src = self.src[inc]
+        return np.concatenate([out, inc[(src < lo) | (src >= hi)]])
+
+    def _pairs(self, edge_ids: np.ndarray):
+        a, b = self.rep[self.src[edge_ids]], self.rep[self.dst[edge_ids]]
+        keep = a != b
+        if not keep.any():
+            return []
+        rows, inverse = np.unique(np.stack([a[keep], b[keep]], axis=1), axis=0, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=self.weight[edge_ids][keep], minlength=len(rows))
+        return zip(rows.tolist(), counts.astype(np.int64).tolist())
+
+    def _remove_pairs(self, edge_ids: np.ndarray, change: ClusterChange):
+        for (a, b), n in self._pairs(edge_ids):
+            edge = self.edges[a, b]
+            edge.count -= n
+            if edge.count > 0:
+                change.moved.append(edge)
+                continue
+            del self.edges[a, b]
+            self._edges_at[a].discard(edge)
+            self._edges_at[b].discard(edge)
+            change.removed.append(edge)
+
+    def _add_pairs(self, edge_ids: np.ndarray, change: ClusterChange):
+        for (a, b), n in self._pairs(edge_ids):
+            edge = self.edges.get((a, b))
+            if edge is not None:
+                edge.count += n
+                change.moved.append(edge)
+                continue
+            edge = ClusterEdge(self.item(a), self.item(b), n, (a, b))
+            self.edges[a, b] = edge
+            self._edges_at.setdefault(a, set()).add(edge)
+            self._edges_at.setdefault(b, set()).add(edge)
+            change.added.append(edge)
+
+    def edges_at(self, key) -> set:
+        """Synlige kanter inn til og ut fra klyngen eller noden ``key``."""
+        i = self.item_id(key)
+        return self._edges_at.get(i, set()) if i is not None else set()
+
+    def local_edges(self, cluster: Cluster) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(fra, til, antall) som element-id-er for kantene mellom barna til ``cluster``."""
+        lo, hi = self.local_start[cluster.id], self.local_start[cluster.id + 1]
+        rows = self.local[lo:hi]
+        return rows[:, 1], rows[:, 2], self.local_counts[lo:hi]
+
+    # ---------- synlighet ----------
+    def _ancestors(self, cluster: Cluster):
+        parent = cluster.parent
+        while parent is not None:
+            yield parent
+            parent = parent.parent
+
+    def is_visible(self, key) -> bool:
+        if isinstance(key, ClusterEdge):
+            return self.edges.get(key.ids) is key
+        if isinstance(key, Cluster):
+            return key is not self.root and all(c.expanded for c in self._ancestors(key))
+        leaf = self.leaf_id.get(key.info.name)
+        return leaf is not None and self.rep[leaf] == leaf + len(self.clusters)
+
+    def path_to(self, name: str) -> list[Cluster]:
+        """Klyngene som må være utfoldet for at noden ``name`` skal vises, ytterst først."""
+        leaf = self.leaf_id.get(name)
+        if leaf is None:
+            return []
+        path, cluster = [], self.root
+        while not cluster.lo <= leaf < cluster.lo + len(cluster.members):
+            cluster = next(c for c in cluster.children if c.lo <= leaf < c.hi)
+            path.append(cluster)
+        return path
+
+    def visible(self) -> list:
+        """Synlige klynger (bokser og rammer) og noder, foreldre før barn."""
+        out = []
+        stack = [self.root]
+        while stack:
+            cluster = stack.pop()
+            if cluster is not self.root:
+                out.append(cluster)
+            if cluster.expanded:
+                out.extend(self.nodes[cluster.lo:cluster.lo + len(cluster.members)])
+                stack.extend(reversed(cluster.children))
+        return out
+
+    def expanded_names(self) -> list[str]:
+        return [c.name for c in self.clusters[1:] if c.expanded]
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        items = self.root.children + self.nodes[:len(self.root.members)]
+        if not items:
+            return 0.0, 0.0, 0.0, 0.0
+        return (min(i.x for i in items), min(i.y for i in items),
+                max(i.x + i.width for i in items), max(i.y + i.height for i in items))
+
+    # ---------- fold ut og sammen ----------
+    def expand(self, cluster: Cluster) -> ClusterChange:
+        """Fold ut ``cluster``: barna legges ut første gang og erstatter boksen."""
+        change = ClusterChange()
+        if cluster.expanded or not all(c.expanded for c in self._ancestors(cluster)):
+            return change
+        with instrument.stage("clusters.expand"):
+            edge_ids = self._incident(cluster)
+            self._remove_pairs(edge_ids, change)
+            cluster.expanded = True
+            if not cluster.laid_out:
+                self._layout_children(cluster)
+            self._assign(cluster)
+            self._add_pairs(edge_ids, change)
+            change.removed.append(cluster)
+            change.added.append(cluster)
+            change.added.extend(cluster.children)
+            change.added.extend(self.nodes[cluster.lo:cluster.lo + len(cluster.members)])
+            self._fit(cluster)
+            self._make_room(cluster, change)
+        return self._finish(change)
+
+    def collapse(self, cluster: Cluster) -> ClusterChange:
+        """Fold sammen ``cluster`` og alt under den til én boks."""
+        change = ClusterChange()
+        if not cluster.expanded or cluster is self.root:
+            return change
+        with instrument.stage("clusters.collapse"):
+            edge_ids = self._incident(cluster)
+            self._remove_pairs(edge_ids, change)
+            stack = [cluster]
+            while stack:
+                c = stack.pop()
+                change.removed.append(c)
+                if c.expanded:
+                    c.expanded = False
+                    c.width, c.height = self._box_size(c)
+                    change.removed.extend(self.nodes[c.lo:c.lo + len(c.members)])
+                    stack.extend(c.children)
+            self.rep[cluster.lo:cluster.hi] = cluster.id
+            self._add_pairs(edge_ids, change)
+            change.added.append(cluster)
+            for parent in self._ancestors(cluster):
+                if parent is self.root:
+                    break
+                self._fit(parent)
+                change.moved.append(parent)
+        return self._finish(change)
+
+    def toggle(self, cluster: Cluster) -> ClusterChange:
+        return self.collapse(cluster) if cluster.expanded else self.expand(cluster)
+
+    def _finish(self, change: ClusterChange) -> ClusterChange:
+        """Fjern duplikater og det som ikke lenger er synlig; oppdater ``Graph.groups``."""
+        added = list({id(k): k for k in change.added if self.is_visible(k)}.values())
+        fresh = {id(k) for k in added}
+        change.added = added
+        change.moved = list({id(k): k for k in change.moved
+                             if id(k) not in fresh and self.is_visible(k)}.values())
+        change.removed = list({id(k): k for k in change.removed}.values())
+        for key in added + change.moved:
+            if isinstance(key, Cluster) and key.kind == "class":
+                group = self.graph.groups.get(key.name)
+                if group is not None:
+                    group.x, group.y, group.width, group.height = key.x, key.y, key.width, key.height
+                    group.expanded = key.expanded
+        return change
+
+    # ---------- layout ----------
+    @staticmethod
+    def _box_size(cluster: Cluster) -> tuple[float, float]:
+        width = min(BOX_MAX, max(BOX_MIN, 40 * math.sqrt(cluster.size)))
+        return width, width / 2
+
+    def _layout_children(self, cluster: Cluster):
+        """Legg ut barna og nodene rett under ``cluster`` inne i rammen dens."""
+        offset = len(self.clusters)
+        nodes = self.nodes[cluster.lo:cluster.lo + len(cluster.members)]
+        if self.node_size is not None:
+            for node in nodes:
+                node.width, node.height = self.node_size
+        for child in cluster.children:
+            child.width, child.height = self._box_size(child)
+        items = cluster.children + nodes
+        cluster.laid_out = True
+        if not items:
+            return
+        ids = np.array([c.id for c in cluster.children]
+                       + list(range(cluster.lo + offset, cluster.lo + offset + len(nodes))), dtype=np.int64)
+        local = np.full(offset + len(self.leaves), -1, dtype=np.int64)
+        local[ids] = np.arange(len(ids))
+        a, b, _ = self.local_edges(cluster)
+        sizes = np.array([(i.width, i.height) for i in items], dtype=float)
+
+        side = max(400.0, 2 * math.sqrt(float(((sizes + PAD) ** 2).sum())))
+        cols = math.ceil(math.sqrt(len(items)))
+        grid = np.arange(len(items))
+        pos = np.stack([grid % cols, grid // cols], axis=1) * (side / cols)
+        if len(items) > 1:
+            pos = layout_arrays(pos, local[a], local[b], sizes, width=side, height=side, engine=self.engine)
+        pos -= pos.min(axis=0)
+        ox, oy = (0.0, 0.0) if cluster is self.root else (cluster.x + PAD, cluster.y + HEADER)
+        for item, (x, y) in zip(items, pos.tolist()):
+            item.x, item.y = ox + x, oy + y
+        instrument.count("clusters.laid_out", len(items))
+
+    def _fit(self, cluster: Cluster):
+        """La rammen til en utfoldet klynge omslutte barna."""
+        items = cluster.children + self.nodes[cluster.lo:cluster.lo + len(cluster.members)]
+        if not items:
+            return
+        x0, y0 = min(i.x for i in items), min(i.y for i in items)
+        x1, y1 = max(i.x + i.width for i in items), max(i.y + i.height for i in items)
+        cluster.x, cluster.y = x0 - PAD, y0 - HEADER
+        cluster.width, cluster.height = x1 - x0 + 2 * PAD, y1 - y0 + HEADER + PAD
+
+    def _make_room(self, cluster: Cluster, change: ClusterChange):
+        """Skyv søsknene til side på hvert nivå fra ``cluster`` og opp til roten."""
+        for parent in self._ancestors(cluster):
+            items = parent.children + self.nodes[parent.lo:parent.lo + len(parent.members)]
+            if len(items) > 1:
+                pos = np.array([(i.x, i.y) for i in items], dtype=float)
+                sizes = np.array([(i.width, i.height) for i in items], dtype=float)
+                delta = resolve_overlaps(pos, sizes, padding=PAD) - pos
+                for item, (dx, dy) in zip(items, delta.tolist()):
+                    if dx or dy:
+                        self._translate(item, dx, dy, change)
+            if parent is self.root:
+                break
+            self._fit(parent)
+            change.moved.append(parent)
+
+    def _translate(self, item, dx: float, dy: float, change: ClusterChange):
+        """Flytt ``item`` og, for en klynge som er lagt ut, alt under den."""
+        stack = [item]
+        while stack:
+            key = stack.pop()
+            key.x += dx
+            key.y += dy
+            change.moved.append(key)
+            change.moved.extend(self.edges_at(key))
+            if isinstance(key, Cluster) and key.laid_out:
+                stack.extend(key.children)
+                stack.extend(self.nodes[key.lo:key.lo + len(key.members)])
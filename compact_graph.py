@@ -0,0 +1,450 @@
+# compact_graph.py
+"""
+Array-basert lagring av en graf, for svært store grafer.
+
+Noder har heltalls-ID-er og internerte navn, posisjoner og størrelser
+ligger i sammenhengende numpy-arrays og naboskap i CSR-form. Ingen
+Python-objekter lagres per node eller kant; ``graph.nodes[name].x``,
+``graph.edges``, ``graph.out_edges`` osv. er tynne visninger som lages ved
+oppslag, så kode skrevet mot ``Graph`` (eksport, snapshot) kan lese en
+``CompactGraph`` uendret. Strukturen er fast etter ``build``; bare
+posisjoner og størrelser kan endres gjennom visningene.
+"""
+import logging
+from collections.abc import Mapping, Sequence, ValuesView
+
+import numpy as np
+
+import instrument
+from graph_model import layout_arrays
+from parser import GroupInfo
+
+log = logging.getLogger(__name__)
+
+
+def _csr(keys: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Offset (n+1) og radindekser sortert etter ``keys``, stabilt."""
+    order = np.argsort(keys, kind="stable").astype(np.int32)
+    start = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(keys, minlength=n), out=start[1:])
+    return start, order
+
+
+def _intern_csr(lists, intern: dict[str, int]) -> tuple[np.ndarray, np.ndarray]:
+    start = np.zeros(len(lists) + 1, dtype=np.int32)
+    np.cumsum([len(values) for values in lists], out=start[1:])
+    values = np.fromiter((intern.setdefault(v, len(intern)) for vs in lists for v in vs),
+                         dtype=np.int32, count=int(start[-1]))
+    return start, values
+
+
+class Names(Sequence):
+    """Nodenavn internert i én UTF-8-blob med offset per navn.
+
+    Oppslag på navn går via et sortert array av ``hash(name)``, så det
+    trengs verken et strengobjekt eller en dict-oppføring per node.
+    """
+
+    def __init__(self, names=()):
+        encoded = [name.encode("utf8") for name in names]
+        self.blob = b"".join(encoded)
+        self.start = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=self.start[1:])
+        hashes = np.fromiter((hash(name) for name in names), dtype=np.int64, count=len(encoded))
+        self.order = np.argsort(hashes, kind="stable").astype(np.int32)
+        self.hashes = hashes[self.order]
+
+    def __len__(self) -> int:
+        return len(self.start) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[self.start[i]:self.start[i + 1]].decode("utf8")
+
+    def __iter__(self):
+        start = self.start.tolist()
+        blob = self.blob
+        return (blob[a:b].decode("utf8") for a, b in zip(start, start[1:]))
+
+    def __contains__(self, name) -> bool:
+        return self.index_of(name) is not None
+
+    def index_of(self, name: str) -> int | None:
+        """Node-ID for ``name``, eller None."""
+        h = hash(name)
+        k = int(np.searchsorted(self.hashes, h))
+        while k < len(self.hashes) and self.hashes[k] == h:
+            i = int(self.order[k])
+            if self[i] == name:
+                return i
+            k += 1
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.blob) + self.start.nbytes + self.order.nbytes + self.hashes.nbytes
+
+
+class CompactGraph:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.names = Names()  # node-ID -> navn, og navn -> node-ID med ``index_of``
+        self.strings: list[str] = []  # internerte input/output-navn
+        self.pos = np.zeros((0, 2))  # x, y per node
+        self.size = np.zeros((0, 2), dtype=np.int32)  # bredde, høyde per node
+        # inputs/outputs som CSR: node i har inputs[input_start[i]:input_start[i + 1]], indekser i ``strings``
+        self.input_start, self.inputs = np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        self.output_start, self.outputs = np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        self.src = np.zeros(0, dtype=np.int32)  # kant-ID -> node-ID
+        self.dst = np.zeros(0, dtype=np.int32)
+        self.weight = np.zeros(0, dtype=np.int32)  # antall kallsteder per kant
+        self.out_start, self.out_index = _csr(self.src, 0)  # node-ID -> kant-ID-er
+        self.in_start, self.in_index = _csr(self.dst, 0)
+        self.group_names: list[str] = []
+        self.group_ids: dict[str, int] = {}
+        self.node_group = np.zeros(0, dtype=np.int32)  # gruppe-ID per node, -1 uten gruppe
+        self.member_start, self.members = _csr(self.node_group, 0)  # gruppe-ID -> node-ID-er
+
+        self.nodes = _NodeMap(self)
+        self.edges = _EdgeList(self)
+        self.groups = _GroupMap(self)
+        self.out_edges = _Adjacency(self, "out")
+        self.in_edges = _Adjacency(self, "in")
+
+    def build(self, node_infos, edge_infos, group_infos, layout=True, progress=None, engine="force"):
+        """Samme semantikk som ``Graph.build``: rutenettplassering, ukjente kanter hoppes over."""
+        if not node_infos:
+            log.warning("No nodes provided to build the graph.")
+        if not edge_infos:
+            log.info("No edges provided to build the graph.")
+        if not group_infos:
+            log.info("No groups provided to build the graph.")
+
+        with instrument.stage("build"):
+            self._build(node_infos, edge_infos, group_infos)
+        instrument.count("build.nodes", len(self.names))
+        instrument.count("build.edges", len(self.src))
+        if layout:
+            with instrument.stage("layout"):
+                self.layout(progress, engine)
+
+    def _build(self, node_infos, edge_infos, group_infos):
+        self.clear()
+        last = {ni.name: ni for ni in node_infos}  # som i Graph vinner siste NodeInfo per navn
+        ids = {name: i for i, name in enumerate(last)}  # bare under byggingen
+        self.names = Names(list(last))
+        n = len(ids)
+
+        intern: dict[str, int] = {}
+        infos = list(last.values())
+        inputs = _intern_csr([ni.inputs for ni in infos], intern)
+        outputs = _intern_csr([ni.outputs for ni in infos], intern)
+        self.strings = list(intern)
+
+        idx = np.arange(n)
+        canvas_width, canvas_height = 4000, 4000  # som Graph.build
+        pos = np.column_stack([(idx % 10) * (canvas_width // 10) + 50,
+                               (idx // 10) * (canvas_height // 10) + 50]).astype(float)
+        size = np.tile(np.array([140, 70], dtype=np.int32), (n, 1))
+
+        known = [ei for ei in edge_infos if ei.caller in ids and ei.callee in ids]
+        edges = np.array([(ids[ei.caller], ids[ei.callee]) for ei in known], dtype=np.int32).reshape(-1, 2)
+        counts = np.array([ei.count for ei in known], dtype=np.int32)
+        # Like par slås sammen som i Graph: første forekomst beholder plassen, vektene summeres
+        _, first, inverse = np.unique(edges, axis=0, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        weight = np.bincount(rank[inverse.reshape(-1)], weights=counts, minlength=len(order)).astype(np.int32)
+        edges = edges[first[order]]
+
+        node_group = np.full(n, -1, dtype=np.int32)
+        group_names = []
+        for gi in group_infos:
+            g = len(group_names)
+            group_names.append(gi.name)
+            members = [ids[c.name] for c in gi.children if c.name in ids]
+            node_group[members] = g
+
+        self._set_arrays(pos, size, inputs, outputs, edges[:, 0], edges[:, 1], group_names, node_group, weight)
+
+    @classmethod
+    def from_arrays(cls, names, strings, pos, size, inputs, outputs, src, dst, group_names, node_group,
+                    weight=None):
+        """Bygg direkte fra ferdige arrays, f.eks. fra et .pvg-øyeblikksbilde.
+
+        ``inputs`` og ``outputs`` er (offset, strengindekser)-par i CSR-form.
+        Uten ``weight`` har hver kant ett kallsted.
+        """
+        graph = cls()
+        graph.names = names if isinstance(names, Names) else Names(names)
+        graph.strings = list(strings)
+        graph._set_arrays(pos, size, inputs, outputs, src, dst, list(group_names), node_group, weight)
+        return graph
+
+    def _set_arrays(self, pos, size, inputs, outputs, src, dst, group_names, node_group, weight=None):
+        n = len(self.names)
+        self.pos = np.ascontiguousarray(pos, dtype=float).reshape(n, 2)
+        self.size = np.ascontiguousarray(size, dtype=np.int32).reshape(n, 2)
+        self.input_start, self.inputs = (np.asarray(a, dtype=np.int32) for a in inputs)
+        self.output_start, self.outputs = (np.asarray(a, dtype=np.int32) for a in outputs)
+        self.src = np.ascontiguousarray(src, dtype=np.int32)
+        self.dst = np.ascontiguousarray(dst, dtype=np.int32)
+        self.weight = (np.ones(len(self.src), dtype=np.int32) if weight is None
+                       else np.ascontiguousarray(weight, dtype=np.int32))
+        self.out_start, self.out_index = _csr(self.src, n)
+        self.in_start, self.in_index = _csr(self.dst, n)
+        self.group_names = group_names
+        self.group_ids = {name: k for k, name in enumerate(group_names)}
+        self.node_group = np.asarray(node_group, dtype=np.int32)
+        grouped = np.flatnonzero(self.node_group >= 0).astype(np.int32)
+        self.member_start, order = _csr(self.node_group[grouped], len(group_names))
+        self.members = grouped[order]
+
+    def layout(self, progress=None, engine="force", warm_start=False):
+        """Legg ut grafen med ``engine`` rett på posisjonsarrayen."""
+        if len(self.names) < 2:
+            return
+        self.pos[:] = layout_arrays(self.pos, self.src, self.dst, self.size, progress=progress, engine=engine,
+                                    warm_start=warm_start)
+
+    # ---------- oppslag, som i Graph ----------
+    def out_ids(self, node: int) -> np.ndarray:
+        return self.out_index[self.out_start[node]:self.out_start[node + 1]]
+
+    def in_ids(self, node: int) -> np.ndarray:
+        return self.in_index[self.in_start[node]:self.in_start[node + 1]]
+
+    def incident_edges(self, name: str) -> list["EdgeView"]:
+        return self.out_edges.get(name, []) + self.in_edges.get(name, [])
+
+    def find_edge(self, src: str, dst: str) -> "EdgeView | None":
+        s, d = self.names.index_of(src), self.names.index_of(dst)
+        if s is None or d is None:
+            return None
+        hits = self.out_ids(s)
+        hits = hits[self.dst[hits] == d]
+        return EdgeView(self, int(hits[0])) if len(hits) else None
+
+    def nbytes(self) -> int:
+        """Omtrentlig minnebruk for arrays og navnetabeller."""
+        arrays = (self.pos, self.size, self.input_start, self.inputs, self.output_start, self.outputs,
+                  self.src, self.dst, self.weight, self.out_start, self.out_index, self.in_start, self.in_index,
+                  self.node_group, self.member_start, self.members)
+        return sum(a.nbytes for a in arrays) + self.names.nbytes + sum(len(s) + 49 for s in self.strings)
+
+
+# ---------- visninger ----------
+class NodeInfoView:
+    __slots__ = ("_g", "_i")
+
+    def __init__(self, graph: CompactGraph, i: int):
+        self._g, self._i = graph, i
+
+    @property
+    def name(self) -> str:
+        return self._g.names[self._i]
+
+    def _strings(self, start: np.ndarray, values: np.ndarray) -> list[str]:
+        strings = self._g.strings
+        return [strings[s] for s in values[start[self._i]:start[self._i + 1]].tolist()]
+
+    @property
+    def inputs(self) -> list[str]:
+        return self._strings(self._g.input_start, self._g.inputs)
+
+    @property
+    def outputs(self) -> list[str]:
+        return self._strings(self._g.output_start, self._g.outputs)
+
+
+class NodeView:
+    """Leser og skriver nodens rad i arrayene; lik en annen visning av samme node."""
+    __slots__ = ("_g", "_i")
+
+    def __init__(self, graph: CompactGraph, i: int):
+        self._g, self._i = graph, i
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and other._g is self._g and other._i == self._i
+
+    def __hash__(self):
+        return hash((id(self._g), self._i))
+
+    @property
+    def id(self) -> int:
+        return self._i
+
+    @property
+    def info(self) -> NodeInfoView:
+        return NodeInfoView(self._g, self._i)
+
+    @property
+    def x(self) -> float:
+        return float(self._g.pos[self._i, 0])
+
+    @x.setter
+    def x(self, value: float):
+        self._g.pos[self._i, 0] = value
+
+    @property
+    def y(self) -> float:
+        return float(self._g.pos[self._i, 1])
+
+    @y.setter
+    def y(self, value: float):
+        self._g.pos[self._i, 1] = value
+
+    @property
+    def width(self) -> int:
+        return int(self._g.size[self._i, 0])
+
+    @width.setter
+    def width(self, value: int):
+        self._g.size[self._i, 0] = value
+
+    @property
+    def height(self) -> int:
+        return int(self._g.size[self._i, 1])
+
+    @height.setter
+    def height(self, value: int):
+        self._g.size[self._i, 1] = value
+
+
+class EdgeView:
+    __slots__ = ("_g", "_e")
+
+    def __init__(self, graph: CompactGraph, e: int):
+        self._g, self._e = graph, e
+
+    def __eq__(self, other):
+        return isinstance(other, EdgeView) and other._g is self._g and other._e == self._e
+
+    def __hash__(self):
+        return hash((id(self._g), "edge", self._e))
+
+    @property
+    def src(self) -> NodeView:
+        return NodeView(self._g, int(self._g.src[self._e]))
+
+    @property
+    def dst(self) -> NodeView:
+        return NodeView(self._g, int(self._g.dst[self._e]))
+
+    @property
+    def weight(self) -> int:
+        return int(self._g.weight[self._e])
+
+
+class GroupView:
+    __slots__ = ("_g", "_k")
+
+    def __init__(self, graph: CompactGraph, k: int):
+        self._g, self._k = graph, k
+
+    def _members(self) -> np.ndarray:
+        g = self._g
+        return g.members[g.member_start[self._k]:g.member_start[self._k + 1]]
+
+    @property
+    def info(self) -> GroupInfo:
+        children = [NodeInfoView(self._g, i) for i in self._members().tolist()]
+        return GroupInfo(self._g.group_names[self._k], children=children)
+
+    @property
+    def connections(self) -> list[EdgeView]:
+        """Kanter med minst ett endepunkt i gruppen, i kantrekkefølge som i ``Graph``."""
+        g = self._g
+        inside = g.node_group == self._k
+        hits = np.flatnonzero(inside[g.src] | inside[g.dst])
+        return [EdgeView(g, e) for e in hits.tolist()]
+
+
+class _NodeValues(ValuesView):
+    def __iter__(self):
+        g = self._mapping._g
+        return (NodeView(g, i) for i in range(len(g.names)))
+
+
+class _NodeMap(Mapping):
+    def __init__(self, graph: CompactGraph):
+        self._g = graph
+
+    def __getitem__(self, name: str) -> NodeView:
+        i = self._g.names.index_of(name)
+        if i is None:
+            raise KeyError(name)
+        return NodeView(self._g, i)
+
+    def __contains__(self, name) -> bool:
+        return name in self._g.names
+
+    def __iter__(self):
+        return iter(self._g.names)
+
+    def __len__(self) -> int:
+        return len(self._g.names)
+
+    def values(self):
+        return _NodeValues(self)
+
+
+class _EdgeList(Sequence):
+    def __init__(self, graph: CompactGraph):
+        self._g = graph
+
+    def __getitem__(self, e):
+        if isinstance(e, slice):
+            return [EdgeView(self._g, i) for i in range(len(self))[e]]
+        if e < 0:
+            e += len(self)
+        if not 0 <= e < len(self):
+            raise IndexError(e)
+        return EdgeView(self._g, e)
+
+    def __iter__(self):
+        g = self._g
+        return (EdgeView(g, e) for e in range(len(g.src)))
+
+    def __len__(self) -> int:
+        return len(self._g.src)
+
+
+class _GroupMap(Mapping):
+    def __init__(self, graph: CompactGraph):
+        self._g = graph
+
+    def __getitem__(self, name: str) -> GroupView:
+        return GroupView(self._g, self._g.group_ids[name])
+
+    def __iter__(self):
+        return iter(self._g.group_names)
+
+    def __len__(self) -> int:
+        return len(self._g.group_names)
+
+
+class _Adjacency(Mapping):
+    """``out_edges``/``in_edges``: nodenavn -> liste av ``EdgeView``."""
+
+    def __init__(self, graph: CompactGraph, direction: str):
+        self._g = graph
+        self._ids = graph.out_ids if direction == "out" else graph.in_ids
+
+    def __getitem__(self, name: str) -> list[EdgeView]:
+        i = self._g.names.index_of(name)
+        if i is None:
+            raise KeyError(name)
+        return [EdgeView(self._g, e) for e in self._ids(i).tolist()]
+
+    def __iter__(self):
+        return iter(self._g.names)
+
+    def __len__(self) -> int:
+        return len(self._g.names)
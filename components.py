@@ -0,0 +1,188 @@
+# components.py
+"""
+Layout per sammenhengende komponent.
+
+Kodebaser gir gjerne mange løse deler: frittstående hjelpefunksjoner og
+delsystemer som ikke kaller hverandre. En felles force-layout regner
+likevel frastøting mellom alle nodene. Her deles grafen i (svakt)
+sammenhengende komponenter, hver komponent legges ut for seg på en
+``ProcessPoolExecutor``, og de ferdige komponentene pakkes etterpå inn i
+layoutområdet med hyllepakking (høyeste først, rad for rad). Området
+vokser hvis komponentene ikke får plass.
+"""
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import instrument
+from layout import force_directed_layout, multilevel_layout, resolve_overlaps
+
+log = logging.getLogger(__name__)
+
+PARALLEL_MIN_NODES = 2000  # mindre grafer legges ut serielt; prosessoppstart koster mer
+MULTILEVEL_MIN_NODES = 200  # større komponenter får flernivå-layout
+GAP = 40.0  # avstand mellom pakkede komponenter
+
+
+def connected_components(n: int, src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, int]:
+    """Komponent per node (0, 1, ... etter første node) og antall komponenter.
+
+    Kantretning ignoreres. Hver node peker på minste nabo-etikett, og
+    etikettene følges til roten (pekerhopping) til alle kanter har samme
+    etikett i begge ender; hver runde er noen få array-operasjoner.
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    label = np.arange(n, dtype=np.int64)
+    while True:
+        a, b = label[src], label[dst]
+        differ = a != b
+        if not differ.any():
+            break
+        lo, hi = np.minimum(a[differ], b[differ]), np.maximum(a[differ], b[differ])
+        np.minimum.at(label, hi, lo)
+        while True:
+            jumped = label[label]
+            if np.array_equal(jumped, label):
+                break
+            label = jumped
+    _, first, parent = np.unique(label, return_index=True, return_inverse=True)
+    # Nummerer etter første node, så resultatet er uavhengig av etikettene
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    return rank[parent], len(first)
+
+
+def _layout_component(job) -> np.ndarray:
+    """Legg ut én komponent i et kvadrat med side ``side``; kjøres i en arbeiderprosess."""
+    pos, src, dst, sizes, side, warm_start = job
+    if len(pos) >= MULTILEVEL_MIN_NODES:
+        pos = multilevel_layout(pos, src, dst, width=side, height=side, warm_start=warm_start)
+    else:
+        temperature = side / 100 if warm_start else None
+        pos = force_directed_layout(pos, src, dst, width=side, height=side, temperature=temperature)
+    return resolve_overlaps(pos, sizes)
+
+
+def pack(boxes: np.ndarray, width: float, gap: float = GAP) -> np.ndarray:
+    """Øvre venstre hjørne per boks (bredde, høyde) ved hyllepakking.
+
+    Boksene sorteres etter høyde og legges fra venstre mot høyre; en ny
+    hylle startes når raden blir bredere enn ``width``.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 2)
+    corners = np.zeros_like(boxes)
+    x = y = shelf = 0.0
+    for i in np.argsort(-boxes[:, 1], kind="stable").tolist():
+        w, h = boxes[i]
+        if x > 0 and x + w > width:
+            x, y, shelf = 0.0, y + shelf + gap, 0.0
+        corners[i] = (x, y)
+        x += w + gap
+        shelf = max(shelf, h)
+    return corners
+
+
+def layout_components(
+    pos: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    sizes: np.ndarray,
+    width: float = 4000,
+    height: float = 4000,
+    workers: int | None = None,
+    warm_start: bool = False,
+    progress=None,
+) -> np.ndarray:
+    """Legg ut hver komponent for seg (parallelt) og pakk dem i ``width`` × ``height``.
+
+    Hver komponent får et kvadrat med areal i forhold til nodeantallet, så
+    den optimale kantlengden blir den samme som for hele grafen. Grafer
+    under ``PARALLEL_MIN_NODES`` noder, eller ``workers=1``, legges ut i
+    denne prosessen. ``progress(fraction)`` kalles etter hver komponent,
+    vektet med antall noder, og kan avbryte ved å kaste et unntak.
+    """
+    pos = np.array(pos, dtype=float).reshape(-1, 2)
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    n = len(pos)
+    if n < 2:
+        return pos
+
+    label, count = connected_components(n, src, dst)
+    order = np.argsort(label, kind="stable")
+    starts = np.searchsorted(label[order], np.arange(count + 1))
+    members = [order[starts[c]:starts[c + 1]] for c in range(count)]
+    local = np.empty(n, dtype=np.int64)
+    for group in members:
+        local[group] = np.arange(len(group))
+    edge_label = label[src]
+    edge_order = np.argsort(edge_label, kind="stable")
+    edge_starts = np.searchsorted(edge_label[edge_order], np.arange(count + 1))
+    instrument.count("layout.components", count)
+
+    # Komponenter med kanter legges ut; enslige noder pakkes som de er
+    jobs, laid_out = [], []
+    for c, group in enumerate(members):
+        if len(group) < 2:
+            continue
+        edges = edge_order[edge_starts[c]:edge_starts[c + 1]]
+        side = width * math.sqrt(len(group) / n)
+        start = pos[group]
+        if not warm_start:
+            # Skaler startposisjonene inn i komponentens eget kvadrat
+            span = np.ptp(start, axis=0)
+            start = (start - start.min(axis=0)) / np.where(span > 0, span, 1) * side
+        jobs.append((start, local[src[edges]], local[dst[edges]], sizes[group], side, warm_start))
+        laid_out.append(c)
+    log.debug("Laying out %d components (%d with edges) of %d nodes", count, len(jobs), n)
+
+    workers = workers or os.cpu_count() or 1
+    result = [None] * count
+    if workers <= 1 or len(jobs) < 2 or n < PARALLEL_MIN_NODES:
+        done = map(_layout_component, jobs)
+        pool = None
+    else:
+        # Største først, så den lengste jobben ikke starter sist
+        jobs_order = sorted(range(len(jobs)), key=lambda j: -len(jobs[j][0]))
+        jobs = [jobs[j] for j in jobs_order]
+        laid_out = [laid_out[j] for j in jobs_order]
+        pool = ProcessPoolExecutor(max_workers=workers)
+        done = pool.map(_layout_component, jobs)
+    try:
+        placed = 0
+        for c, component in zip(laid_out, done):
+            result[c] = component
+            placed += len(component)
+            if progress is not None:
+                progress(placed / n)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    for c, group in enumerate(members):
+        if result[c] is None:
+            result[c] = np.zeros((1, 2))
+
+    # Rektangelpakking av komponentenes omsluttende bokser
+    lows, boxes = [], []
+    for c, group in enumerate(members):
+        component = result[c]
+        low = component.min(axis=0)
+        lows.append(low)
+        boxes.append((component + sizes[group]).max(axis=0) - low)
+    boxes = np.array(boxes)
+    # Radbredden: området, eller mer hvis komponentene ikke får plass i det
+    area = float(((boxes[:, 0] + GAP) * (boxes[:, 1] + GAP)).sum())
+    row = max(width, math.sqrt(area * 1.2 * width / height), float(boxes[:, 0].max()))
+    corners = pack(boxes, row)
+    out = np.empty_like(pos)
+    for c, group in enumerate(members):
+        out[group] = result[c] - lows[c] + corners[c]
+    if progress is not None:
+        progress(1.0)
+    return out
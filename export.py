@@ -0,0 +1,160 @@
+# export.py
+"""
+Eksport av en ``Graph`` til JSON, JSON Lines, XML, SVG og PNG, uten
+avhengighet til Tk, og innlesing av JSON Lines og XML tilbake til en ``Graph``.
+
+Alle skriverne strømmer node for node og kant for kant, så minnebruken
+ikke vokser med en ekstra kopi av grafen. Brukes både av ``NodeCanvas``
+og av kommandolinjen i ``cli.py``. Som i GUI-et får ``filename``
+filendelsen lagt til.
+"""
+import json
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
+
+from compact_graph import CompactGraph
+from graph_model import Graph
+from parser import EdgeInfo, GroupInfo, NodeInfo
+import render
+
+
+def _indent(text: str, spaces: int) -> str:
+    return text.replace("\n", "\n" + " " * spaces)
+
+
+def export_to_json(graph: Graph, filename: str):
+    """Samme format som ``json.dump(..., indent=4)``, men skrevet fortløpende."""
+    with open(filename + ".json", "w") as f:
+        f.write('{\n    "nodes": [')
+        for i, node in enumerate(graph.nodes.values()):
+            item = {
+                "name": node.info.name,
+                "inputs": node.info.inputs,
+                "outputs": node.info.outputs,
+                "x": node.x,
+                "y": node.y
+            }
+            f.write(("," if i else "") + "\n        " + _indent(json.dumps(item, indent=4), 8))
+        f.write("\n    ]" if graph.nodes else "]")
+        f.write(',\n    "edges": [')
+        for i, edge in enumerate(graph.edges):
+            item = {
+                "src": edge.src.info.name,
+                "dst": edge.dst.info.name
+            }
+            if edge.weight > 1:
+                item["count"] = edge.weight
+            f.write(("," if i else "") + "\n        " + _indent(json.dumps(item, indent=4), 8))
+        f.write("\n    ]\n}" if graph.edges else "]\n}")
+
+
+def export_to_jsonl(graph: Graph, filename: str):
+    """Én JSON-post per linje: grupper, noder og til slutt kanter."""
+    with open(filename + ".jsonl", "w", encoding="utf-8") as f:
+        for group in graph.groups.values():
+            f.write(json.dumps({"type": "group", "name": group.info.name,
+                                "children": [c.name for c in group.info.children]}) + "\n")
+        for node in graph.nodes.values():
+            f.write(json.dumps({"type": "node", "name": node.info.name, "inputs": node.info.inputs,
+                                "outputs": node.info.outputs, "x": node.x, "y": node.y}) + "\n")
+        for edge in graph.edges:
+            rec = {"type": "edge", "src": edge.src.info.name, "dst": edge.dst.info.name}
+            if edge.weight > 1:
+                rec["count"] = edge.weight
+            f.write(json.dumps(rec) + "\n")
+
+
+def export_to_xml(graph: Graph, filename: str):
+    with open(filename + ".xml", "w", encoding="utf-8") as f:
+        xml = XMLGenerator(f, encoding="utf-8", short_empty_elements=True)
+        xml.startDocument()
+        xml.startElement("Graph", {})
+        xml.startElement("Nodes", {})
+        for node in graph.nodes.values():
+            xml.startElement("Node", {"name": node.info.name, "x": str(node.x), "y": str(node.y)})
+            for section, tag, values in (("Inputs", "Input", node.info.inputs),
+                                         ("Outputs", "Output", node.info.outputs)):
+                xml.startElement(section, {})
+                for value in values:
+                    xml.startElement(tag, {})
+                    xml.characters(value)
+                    xml.endElement(tag)
+                xml.endElement(section)
+            xml.endElement("Node")
+        xml.endElement("Nodes")
+        xml.startElement("Edges", {})
+        for edge in graph.edges:
+            attrs = {"src": edge.src.info.name, "dst": edge.dst.info.name}
+            if edge.weight > 1:
+                attrs["count"] = str(edge.weight)
+            xml.startElement("Edge", attrs)
+            xml.endElement("Edge")
+        xml.endElement("Edges")
+        xml.endElement("Graph")
+        xml.endDocument()
+
+
+def export_to_svg(graph: Graph, filename: str, margin: int = 20):
+    """Skriv grafen som SVG med samme farger som canvaset."""
+    with open(filename + ".svg", "w", encoding="utf-8") as f:
+        render.write_svg(graph, f, margin)
+
+
+def export_to_png(graph: Graph, filename: str):
+    """Hele grafen som ett PNG-bilde, tegnet uten Tk; se ``render.render_png``."""
+    render.render_png(graph, filename + ".png")
+
+
+def export_to_tiles(graph: Graph, filename: str):
+    """En pyramide av PNG-fliser i mappen ``filename.tiles``; se ``render.render_tiles``."""
+    render.render_tiles(graph, filename + ".tiles")
+
+
+# ---------- innlesing ----------
+def graph_from_records(nodes, edges, groups, compact=False) -> Graph | CompactGraph:
+    """Bygg en ``Graph`` (eller ``CompactGraph``) uten layout fra (NodeInfo, x, y), EdgeInfo og (navn, barnenavn)."""
+    nodes = list(nodes)
+    infos = {ni.name: ni for ni, _, _ in nodes}
+    group_infos = [
+        GroupInfo(name, children=[infos.get(c) or NodeInfo(c) for c in children])
+        for name, children in groups
+    ]
+    graph = CompactGraph() if compact else Graph()
+    graph.build(list(infos.values()), edges, group_infos, layout=False)
+    for ni, x, y in nodes:
+        node = graph.nodes[ni.name]
+        node.x, node.y = x, y
+    return graph
+
+
+def load_jsonl(path: str, compact: bool = False) -> Graph | CompactGraph:
+    nodes, edges, groups = [], [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            kind = rec["type"]
+            if kind == "node":
+                nodes.append((NodeInfo(rec["name"], rec["inputs"], rec["outputs"]), rec["x"], rec["y"]))
+            elif kind == "edge":
+                edges.append(EdgeInfo(rec["src"], rec["dst"], rec.get("count", 1)))
+            elif kind == "group":
+                groups.append((rec["name"], rec["children"]))
+    return graph_from_records(nodes, edges, groups, compact)
+
+
+def load_xml(path: str, compact: bool = False) -> Graph | CompactGraph:
+    """Les XML fra ``export_to_xml`` element for element med ``iterparse``."""
+    nodes, edges = [], []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "Node":
+            inputs = [e.text or "" for e in elem.iterfind("Inputs/Input")]
+            outputs = [e.text or "" for e in elem.iterfind("Outputs/Output")]
+            nodes.append((NodeInfo(elem.get("name"), inputs, outputs),
+                          float(elem.get("x")), float(elem.get("y"))))
+            elem.clear()
+        elif elem.tag == "Edge":
+            edges.append(EdgeInfo(elem.get("src"), elem.get("dst"), int(elem.get("count", 1))))
+            elem.clear()
+    return graph_from_records(nodes, edges, [], compact)
@@ -1,20 +1,39 @@
 # graph_model.py
-from dataclasses import dataclass, field
+import logging
 import math
-from parser import NodeInfo, GroupInfo  # Adjusted to relative import
+from dataclasses import dataclass, field
 
-@dataclass
+import numpy as np
+
+from parser import NodeInfo, EdgeInfo, GroupInfo  # Adjusted to relative import
+from layout import force_directed_layout, multilevel_layout, resolve_overlaps
+from layered import layered_layout
+from components import layout_components
+import instrument
+
+log = logging.getLogger(__name__)
+
+LAYOUTS = ("force", "multilevel", "layered", "components")  # kraftbasert, flernivå, lagdelt, per komponent
+NEW_NODE_SWEEPS = 10  # barysenter-runder for noder uten lagret posisjon
+
+@dataclass(eq=False)
 class Node:
     info: NodeInfo  # Correct type reference
     x: float = 0.0  # Allow float for x
     y: float = 0.0  # Allow float for y
     width: int = 140
     height: int = 70
+    pinned: bool = False  # flyttet av brukeren; layout lar noden stå
 
-@dataclass
+@dataclass(eq=False)
 class Edge:
     src: "Node"
     dst: "Node"
+    weight: int = 1  # antall kallsteder
+
+def edge_width(weight: int) -> float:
+    """Strekbredde for en kant med ``weight`` kallsteder: 2 for ett, + 1 per dobling."""
+    return 2 + math.log2(max(weight, 1))
 
 @dataclass
 class Group:
@@ -26,88 +45,412 @@ class Group:
     expanded: bool = False
     connections: list[Edge] = field(default_factory=list)  # Initialize connections as an empty list
 
+@dataclass
+class GraphDiff:
+    """Endringer mellom to parse-resultater, se ``watch.diff_results``."""
+    added_nodes: list[NodeInfo] = field(default_factory=list)
+    removed_nodes: list[str] = field(default_factory=list)
+    changed_nodes: list[NodeInfo] = field(default_factory=list)
+    added_edges: list[EdgeInfo] = field(default_factory=list)
+    removed_edges: list[EdgeInfo] = field(default_factory=list)
+    groups: list[GroupInfo] = field(default_factory=list)  # nye eller endrede grupper
+    removed_groups: list[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.added_nodes or self.removed_nodes or self.changed_nodes
+                    or self.added_edges or self.removed_edges or self.groups or self.removed_groups)
+
 class Graph:
     def __init__(self):
+        self.version = 0  # økes ved hver endring av noder og kanter, se query.py
+        self.clear()
+
+    def clear(self):
+        self.version += 1
         self.nodes: dict[str, Node] = {}
         self.edges: list[Edge] = []
         self.groups: dict[str, Group] = {}
+        # Indekser, holdes oppdatert av build/apply_diff/add_edge/remove_edge
+        self.out_edges: dict[str, list[Edge]] = {}
+        self.in_edges: dict[str, list[Edge]] = {}
+        self.group_of: dict[str, str] = {}  # nodenavn -> gruppenavn
+
+    def build(self, node_infos, edge_infos, group_infos, layout=True, progress=None, engine="force",
+              positions=None):
+        """Bygg grafen på nytt og legg den ut med ``engine`` (se ``LAYOUTS``).
 
-    def build(self, node_infos, edge_infos, group_infos):
+        ``progress(fraction)`` får fremdriften i layouten. ``positions`` er
+        lagrede posisjoner (navn -> (x, y, pinned), se ``layout_store.py``);
+        finnes noen av nodene der, beholder de posisjonen og bare de nye
+        nodene legges ut, rundt naboene sine.
+        """
         if not node_infos:
-            print("Warning: No nodes provided to build the graph.")
+            log.warning("No nodes provided to build the graph.")
         if not edge_infos:
-            print("Warning: No edges provided to build the graph.")
+            log.info("No edges provided to build the graph.")
         if not group_infos:
-            print("Warning: No groups provided to build the graph.")
+            log.info("No groups provided to build the graph.")
+
+        with instrument.stage("build"):
+            self._build(node_infos, edge_infos, group_infos)
+        instrument.count("build.nodes", len(self.nodes))
+        instrument.count("build.edges", len(self.edges))
+
+        fresh = self.restore_positions(positions) if positions else None
+        if fresh is not None and len(fresh) < len(self.nodes):
+            instrument.count("build.restored", len(self.nodes) - len(fresh))
+            if fresh:
+                with instrument.stage("layout.incremental"):
+                    self.layout_new_nodes(fresh)
+            self.fit_groups()
+        # Apply force-directed layout
+        elif layout:
+            with instrument.stage("layout"):
+                self.apply_layout(engine, progress)
+
+    def restore_positions(self, positions) -> list[Node]:
+        """Flytt nodene til lagrede posisjoner; returnerer nodene som manglet."""
+        fresh = []
+        for name, node in self.nodes.items():
+            stored = positions.get(name)
+            if stored is None:
+                fresh.append(node)
+            else:
+                node.x, node.y, node.pinned = stored
+        return fresh
+
+    def layout_new_nodes(self, fresh: list[Node]):
+        """Legg ut ``fresh`` rundt de andre nodene, som står fast.
+
+        Nye noder flyttes gjentatte ganger til snittet av naboene som alt har
+        en plass, så de fyller seg inn fra den kjente delen av grafen. Noder
+        uten noen vei dit stables i en kolonne til høyre. Til slutt løses
+        overlapp uten å flytte de gamle nodene.
+        """
+        nodes = list(self.nodes.values())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        pos = np.array([(node.x, node.y) for node in nodes], dtype=float)
+        sizes = np.array([(node.width, node.height) for node in nodes], dtype=float)
+        src = np.array([index[id(edge.src)] for edge in self.edges], dtype=np.int64)
+        dst = np.array([index[id(edge.dst)] for edge in self.edges], dtype=np.int64)
+        n = len(nodes)
+        new = np.zeros(n, dtype=bool)
+        new[[index[id(node)] for node in fresh]] = True
+        placed = ~new
+
+        ends, others = np.concatenate([src, dst]), np.concatenate([dst, src])
+        for _ in range(NEW_NODE_SWEEPS):
+            ok = placed[others]
+            degree = np.bincount(ends[ok], minlength=n)
+            move = new & (degree > 0)
+            if not move.any():
+                break
+            for dim in (0, 1):
+                total = np.bincount(ends[ok], weights=pos[others[ok], dim], minlength=n)
+                pos[move, dim] = total[move] / degree[move]
+            placed |= move
+
+        # Spre noder som havnet på samme punkt, så overlappsløsningen har en retning
+        jitter = np.random.default_rng(0).uniform(-0.5, 0.5, (int(new.sum()), 2))
+        pos[new] += jitter * sizes[new]
+        lost = np.flatnonzero(~placed)
+        if len(lost):
+            known = ~new | placed
+            x0 = (pos[known, 0] + sizes[known, 0]).max() + 40 if known.any() else 0.0
+            y0 = pos[known, 1].min() if known.any() else 0.0
+            pos[lost, 0] = x0
+            pos[lost, 1] = y0 + np.concatenate([[0.0], (sizes[lost[:-1], 1] + 20).cumsum()])
+        pos = resolve_overlaps(pos, sizes, fixed=~new)
+        for i in np.flatnonzero(new).tolist():
+            nodes[i].x, nodes[i].y = float(pos[i, 0]), float(pos[i, 1])
+
+    def _build(self, node_infos, edge_infos, group_infos):
+        self.clear()
 
         # Initialize nodes
         # Dynamically calculate node positions based on canvas dimensions
         canvas_width, canvas_height = 4000, 4000  # Match NodeCanvas scrollregion
         for idx, ni in enumerate(node_infos):
             self.nodes[ni.name] = Node(ni, x=(idx % 10) * (canvas_width // 10) + 50, y=(idx // 10) * (canvas_height // 10) + 50)
+            self.out_edges[ni.name] = []
+            self.in_edges[ni.name] = []
+
+        # Initialize groups and the membership map before edges, so each edge
+        # can be filed under its groups in the same pass.
+        for gi in group_infos:
+            self.groups[gi.name] = Group(gi)
+            for child in gi.children:
+                self.group_of[child.name] = gi.name
 
-        # Convert EdgeInfo to Edge objects during graph building
+        # Convert EdgeInfo to Edge objects during graph building; repeated
+        # pairs become one edge with the call counts summed
+        seen: dict[tuple[str, str], Edge] = {}
         for ei in edge_infos:
             src = self.nodes.get(ei.caller)
             dst = self.nodes.get(ei.callee)
             if src and dst:
-                self.edges.append(Edge(src=src, dst=dst))
-
-        # Initialize groups
-        for idx, gi in enumerate(group_infos):
-            group = Group(gi, x=idx * 200, y=idx * 200)
-            self.groups[gi.name] = group
-            # Populate connections for the group
-            # Convert EdgeInfo to Edge objects for group connections
-            for edge_info in edge_infos:
-                src = self.nodes.get(edge_info.caller)
-                dst = self.nodes.get(edge_info.callee)
-                if src and dst:
-                    edge = Edge(src=src, dst=dst)
-                    if edge.src.info.name in group.info.children or edge.dst.info.name in group.info.children:
+                edge = seen.get((ei.caller, ei.callee))
+                if edge is not None:
+                    edge.weight += ei.count
+                    continue
+                edge = seen[ei.caller, ei.callee] = Edge(src=src, dst=dst, weight=ei.count)
+                self.edges.append(edge)
+                self._index_edge(edge)
+        self.fit_groups()
+
+    def fit_groups(self, groups=None):
+        """Legg gruppeboksene rundt medlemmene, f.eks. etter layout."""
+        for group in self.groups.values() if groups is None else groups:
+            members = [self.nodes[c.name] for c in group.info.children if c.name in self.nodes]
+            if members:
+                x0, y0 = min(n.x for n in members), min(n.y for n in members)
+                group.x, group.y = x0, y0
+                group.width = max(n.x + n.width for n in members) - x0
+                group.height = max(n.y + n.height for n in members) - y0
+
+    # ---------- indekser ----------
+    def _index_edge(self, edge: Edge):
+        src, dst = edge.src.info.name, edge.dst.info.name
+        self.out_edges.setdefault(src, []).append(edge)
+        self.in_edges.setdefault(dst, []).append(edge)
+        if self.group_of:
+            src_group = self.group_of.get(src)
+            dst_group = self.group_of.get(dst)
+            if src_group in self.groups:
+                self.groups[src_group].connections.append(edge)
+            if dst_group != src_group and dst_group in self.groups:
+                self.groups[dst_group].connections.append(edge)
+
+    def _unindex_edge(self, edge: Edge):
+        src, dst = edge.src.info.name, edge.dst.info.name
+        _remove_identity(self.out_edges.get(src, []), edge)
+        _remove_identity(self.in_edges.get(dst, []), edge)
+        for group_name in {self.group_of.get(src), self.group_of.get(dst)}:
+            if group_name in self.groups:
+                _remove_identity(self.groups[group_name].connections, edge)
+
+    def incident_edges(self, name: str) -> list[Edge]:
+        """Alle kanter inn til eller ut fra noden ``name``."""
+        return self.out_edges.get(name, []) + self.in_edges.get(name, [])
+
+    def find_edge(self, src: str, dst: str) -> Edge | None:
+        return next((e for e in self.out_edges.get(src, []) if e.dst.info.name == dst), None)
+
+    def add_edge(self, src: str, dst: str, weight: int = 1) -> Edge | None:
+        """Legg til kanten, eller øk vekten hvis den finnes fra før."""
+        src_node = self.nodes.get(src)
+        dst_node = self.nodes.get(dst)
+        if not (src_node and dst_node):
+            return None
+        edge = self.find_edge(src, dst)
+        if edge is not None:
+            edge.weight += weight
+            return edge
+        edge = Edge(src=src_node, dst=dst_node, weight=weight)
+        self.edges.append(edge)
+        self._index_edge(edge)
+        self.version += 1
+        return edge
+
+    def rename_node(self, old: str, new: str) -> bool:
+        """Gi noden nytt navn og flytt indeksoppføringene. False hvis navnet er tatt."""
+        if new in self.nodes or old not in self.nodes:
+            return False
+        self.version += 1
+        node = self.nodes.pop(old)
+        node.info.name = new
+        self.nodes[new] = node
+        self.out_edges[new] = self.out_edges.pop(old, [])
+        self.in_edges[new] = self.in_edges.pop(old, [])
+        if old in self.group_of:
+            self.group_of[new] = self.group_of.pop(old)
+        return True
+
+    def remove_edge(self, edge: Edge):
+        self._unindex_edge(edge)
+        _remove_identity(self.edges, edge)
+        self.version += 1
+
+    def apply_diff(self, diff: GraphDiff):
+        """Oppdater grafen på stedet; uendrede noder beholder posisjonen sin."""
+        self.version += 1
+        dead: set[int] = set()
+
+        for ei in diff.removed_edges:
+            edge = next((e for e in self.out_edges.get(ei.caller, [])
+                         if e.dst.info.name == ei.callee and id(e) not in dead), None)
+            if edge:
+                self._unindex_edge(edge)
+                dead.add(id(edge))
+
+        for name in diff.removed_nodes:
+            for edge in self.incident_edges(name):
+                if id(edge) not in dead:
+                    self._unindex_edge(edge)
+                    dead.add(id(edge))
+            self.nodes.pop(name, None)
+            self.out_edges.pop(name, None)
+            self.in_edges.pop(name, None)
+
+        if dead:
+            self.edges = [e for e in self.edges if id(e) not in dead]
+
+        for ni in diff.changed_nodes:
+            node = self.nodes.get(ni.name)
+            if node:
+                node.info = ni
+
+        for ni in diff.added_nodes:
+            self.nodes[ni.name] = Node(ni)
+            self.out_edges[ni.name] = []
+            self.in_edges[ni.name] = []
+        for ni in diff.added_nodes:
+            self._place_new_node(self.nodes[ni.name], diff.added_edges)
+
+        for name in diff.removed_groups:
+            group = self.groups.pop(name, None)
+            if group:
+                for child in group.info.children:
+                    if self.group_of.get(child.name) == name:
+                        del self.group_of[child.name]
+        for gi in diff.groups:
+            group = self.groups.get(gi.name)
+            if group:
+                for child in group.info.children:
+                    if self.group_of.get(child.name) == gi.name:
+                        del self.group_of[child.name]
+                group.info = gi
+            else:
+                group = Group(gi)
+                self.groups[gi.name] = group
+            for child in gi.children:
+                self.group_of[child.name] = gi.name
+            # Bygg connections på nytt fra nabolistene til medlemmene
+            seen: set[int] = set()
+            group.connections = []
+            for child in gi.children:
+                for edge in self.incident_edges(child.name):
+                    if id(edge) not in seen:
+                        seen.add(id(edge))
                         group.connections.append(edge)
 
-        # Apply force-directed layout
-        self._apply_force_directed_layout()
-
-    def _apply_force_directed_layout(self):
-        iterations = min(50, len(self.nodes))  # Reduce iterations for large graphs
-        width, height = 4000, 4000  # Canvas size
-        k = math.sqrt((width * height) / max(len(self.nodes), 1))  # Optimal distance between nodes
-
-        for _ in range(iterations):
-            # Calculate repulsive forces
-            for node_a in self.nodes.values():
-                for node_b in self.nodes.values():
-                    if node_a != node_b:
-                        dx = node_a.x - node_b.x
-                        dy = node_a.y - node_b.y
-                        distance = math.sqrt(dx**2 + dy**2) or 0.01
-                        force = k**2 / distance
-
-                        node_a.x += (dx / distance) * force * 0.1  # Scale down movement
-                        node_a.y += (dy / distance) * force * 0.1
-
-            # Calculate attractive forces
-            for edge in self.edges:
-                dx = edge.src.x - edge.dst.x
-                dy = edge.src.y - edge.dst.y
-                distance = math.sqrt(dx**2 + dy**2) or 0.01
-                force = (distance**2) / k
-
-                edge.src.x -= (dx / distance) * force * 0.1  # Scale down movement
-                edge.src.y -= (dy / distance) * force * 0.1
-                edge.dst.x += (dx / distance) * force * 0.1
-                edge.dst.y += (dy / distance) * force * 0.1
-
-            # Keep nodes within bounds
-            for node in self.nodes.values():
-                node.x = max(0, min(width, node.x))
-                node.y = max(0, min(height, node.y))
-
-            # Detect and resolve overlapping nodes
-            for node_a in self.nodes.values():
-                for node_b in self.nodes.values():
-                    if node_a != node_b and abs(node_a.x - node_b.x) < node_a.width and abs(node_a.y - node_b.y) < node_a.height:
-                        node_a.x += 10
-                        node_a.y += 10
+        for ei in diff.added_edges:
+            self.add_edge(ei.caller, ei.callee, ei.count)
+        self.fit_groups([self.groups[gi.name] for gi in diff.groups])
+
+    def _place_new_node(self, node, edge_infos):
+        """Plasser en ny node ved naboene sine, eller til høyre for grafen."""
+        name = node.info.name
+        neighbours = [
+            self.nodes.get(ei.callee if ei.caller == name else ei.caller)
+            for ei in edge_infos
+            if name in (ei.caller, ei.callee)
+        ]
+        placed = [n for n in neighbours if n is not None and n is not node and (n.x or n.y)]
+        if placed:
+            node.x = sum(n.x for n in placed) / len(placed) + node.width + 20
+            node.y = sum(n.y for n in placed) / len(placed)
+        else:
+            others = [n for n in self.nodes.values() if n is not node]
+            node.x = max((n.x + n.width for n in others), default=0) + 40
+            node.y = min((n.y for n in others), default=0)
+
+    def _apply_force_directed_layout(self, progress=None):
+        self.apply_layout("force", progress)
+
+    def apply_layout(self, engine="force", progress=None, warm_start=False):
+        """Legg ut hele grafen med ``engine`` og flytt nodene dit."""
+        self.set_positions(self.compute_layout(engine, progress, warm_start))
+
+    def layout_snapshot(self):
+        """Navn, posisjoner, kanter og størrelser som arrays, i rekkefølgen til ``nodes``.
+
+        Tas i tråden som eier grafen, så en layout i bakgrunnen ikke leser
+        noder og kanter mens de endres (f.eks. av ``apply_diff``).
+        """
+        nodes = list(self.nodes.values())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        names = [node.info.name for node in nodes]
+        pos = np.array([(node.x, node.y) for node in nodes], dtype=float).reshape(-1, 2)
+        src = np.array([index[id(edge.src)] for edge in self.edges], dtype=np.int64)
+        dst = np.array([index[id(edge.dst)] for edge in self.edges], dtype=np.int64)
+        sizes = np.array([(node.width, node.height) for node in nodes], dtype=float).reshape(-1, 2)
+        return names, pos, src, dst, sizes
+
+    def compute_layout(self, engine="force", progress=None, warm_start=False, snapshot=None):
+        """Nye posisjoner som (navn, array), uten å endre grafen.
+
+        Med ``warm_start`` er dagens posisjoner utgangspunktet, så en graf
+        som alt er lagt ut bare forfines. Med ``snapshot`` (fra
+        ``layout_snapshot``) leses ikke grafen i det hele tatt, og layouten
+        kan kjøres i en bakgrunnstråd mens grafen vises og endres; se
+        ``set_positions``.
+        """
+        names, pos, src, dst, sizes = snapshot or self.layout_snapshot()
+        if len(names) < 2:
+            return None
+        return names, layout_arrays(pos, src, dst, sizes, progress=progress, engine=engine, warm_start=warm_start)
+
+    def set_positions(self, layout):
+        """Flytt nodene til posisjonene fra ``compute_layout``, etter navn.
+
+        Fastlåste noder står, og noder som er fjernet siden layouten
+        startet hoppes over; noder som er lagt til beholder plassen sin.
+        """
+        if layout is None:
+            return
+        names, pos = layout
+        for name, (x, y) in zip(names, pos.tolist()):
+            node = self.nodes.get(name)
+            if node is not None and not node.pinned:
+                node.x, node.y = x, y
+        self.fit_groups()
+
+    def unpin_all(self):
+        for node in self.nodes.values():
+            node.pinned = False
+
+def layout_arrays(pos, src, dst, sizes, width=4000, height=4000, progress=None, engine="force",
+                  warm_start=False):
+    """Layout på arrays; brukes av både ``Graph``, ``CompactGraph`` og ``ClusterTree``.
+
+    ``engine="force"`` og ``"multilevel"`` gir force-layout og
+    overlappsløsning, og ``progress(fraction)`` får da 90 % til
+    force-layouten. Med ``warm_start`` er ``pos`` en tidligere layout som
+    bare forfines. ``engine="layered"`` gir en lagdelt layout, se
+    ``layered.py``; den har ingen overlapp å løse og ser bort fra ``pos``.
+    ``engine="components"`` legger ut hver sammenhengende komponent for seg
+    i en prosesspool og pakker dem etterpå, se ``components.py``.
+    """
+    if engine == "layered":
+        with instrument.stage("layout.layered"):
+            return layered_layout(src, dst, sizes, progress=progress)
+    if engine == "components":
+        with instrument.stage("layout.components"):
+            return layout_components(pos, src, dst, sizes, width=width, height=height,
+                                     warm_start=warm_start, progress=progress)
+    if engine not in LAYOUTS:
+        raise ValueError(f"Unknown layout engine: {engine}")
+    force = overlap = None
+    if progress is not None:
+        force = lambda f: progress(0.9 * f)
+        overlap = lambda f: progress(0.9 + 0.1 * f)
+    if engine == "multilevel":
+        with instrument.stage("layout.multilevel"):
+            pos = multilevel_layout(pos, src, dst, width=width, height=height, warm_start=warm_start, progress=force)
+    else:
+        # Varm start: små skritt, så layouten bare justeres
+        temperature = width / 100 if warm_start else None
+        with instrument.stage("layout.force"):
+            pos = force_directed_layout(pos, src, dst, width=width, height=height, progress=force,
+                                        temperature=temperature)
+    # Detect and resolve overlapping nodes
+    with instrument.stage("layout.overlap"):
+        return resolve_overlaps(pos, np.asarray(sizes, dtype=float), progress=overlap)
+
+def _remove_identity(items: list, item):
+    """Fjern ``item`` fra listen etter identitet (ikke likhet)."""
+    for i, other in enumerate(items):
+        if other is item:
+            del items[i]
+            return
@@ -1,6 +1,8 @@
 # gui_main.py
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, ttk
+import logging
+import math
 import sys
 from pathlib import Path
 import os
@@ -8,12 +10,31 @@ import os
 # Fixing relative import issue by ensuring the project root is on sys.path.
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from parser import parse_file  # Reverted to relative import
-from graph_model import Graph, Edge  # Reverted to relative import
-import json
-import xml.etree.ElementTree as ET
+from graph_model import Graph, Edge, Node, edge_width  # Reverted to relative import
+from bundling import BundleEdge, bundle_edges
+from clusters import Cluster, ClusterEdge, ClusterTree
+from layout_store import LayoutStore
+from parse_cache import ParseCache
+from query import QueryIndex
+from spatial import GridIndex, segment_hits_rect
+from watch import SourceWatcher
+import export
+import instrument
+import snapshot
+from jobs import Job
+
+log = logging.getLogger(__name__)
 
 PIN_R = 4  # radius på input/output-sirkler
+NODE_W, NODE_H = 100, 50  # tegnestørrelse for noder
+VIEW_MARGIN = 0.5  # forhåndstegn en halv skjerm rundt det synlige området
+LABEL_ZOOM = 0.5  # under denne zoomen tegnes ikke tekst
+PIN_ZOOM = 0.75  # under denne zoomen tegnes ikke pins
+JOB_POLL_MS = 50  # hvor ofte meldinger fra bakgrunnsjobber hentes
+CLUSTER_VIEW_MIN = 2000  # grafer med minst så mange noder åpnes som sammenfoldede klynger
+EDGE_TYPES = (Edge, ClusterEdge, BundleEdge)
+HIGHLIGHT = "#ffcc00"  # farge på markerte noder og kanter
+NODE_ACTIONS = ("Edit Node", "Marker kallere", "Marker kallede", "Vis bare berørte", "Start kallvei her", "Kallvei hit")
 
 class NodeCanvas(tk.Canvas):
     def __init__(self, master, graph):
@@ -22,118 +43,556 @@ class NodeCanvas(tk.Canvas):
         self.pack(fill="both", expand=True)
         self.bind("<ButtonPress-1>", self.on_press)
         self.bind("<B1-Motion>", self.on_drag)
+        self.bind("<ButtonRelease-1>", self.on_release)
+        self.bind("<Double-Button-1>", self.on_double_click)
         self.bind("<ButtonPress-3>", self.on_right_click)  # Right-click for context menu
         # Add zoom and pan functionality
         self.bind("<MouseWheel>", self.on_zoom)
         self.bind("<ButtonPress-2>", self.start_pan)
         self.bind("<B2-Motion>", self.on_pan)
+        self.bind("<Configure>", lambda event: self._schedule_refresh())
 
-        self.drag_item = None
-        self.offset = (0, 0)
         self.context_menu = tk.Menu(self, tearoff=0)
         self.context_menu.add_command(label="Edit Node", command=self.edit_node)
         self.context_menu.add_command(label="Delete Edge", command=self.delete_edge)
-        self.start_node = None  # For edge creation
+        self.context_menu.add_separator()
+        self.context_menu.add_command(label="Marker kallere", command=lambda: self.mark_reach("callers"))
+        self.context_menu.add_command(label="Marker kallede", command=lambda: self.mark_reach("callees"))
+        self.context_menu.add_command(label="Vis bare berørte", command=self.filter_to_reach)
+        self.context_menu.add_command(label="Start kallvei her", command=self.start_call_path)
+        self.context_menu.add_command(label="Kallvei hit", command=self.mark_call_path)
+        self.context_menu.add_command(label="Vis alt", command=self.clear_query)
+        self._init_state()
 
         # Auto pan/zoom after loading the graph
         self.after(100, self.auto_pan_zoom)
 
-    def load_graph(self, graph: Graph):
-        print("Starting to load graph...")
+    def _init_state(self):
+        """Tilstand uten Tk-avhengigheter; delt med opptakscanvaset i ``bench.py``."""
+        self.drag_item = None
+        self.offset = (0, 0)
+        self.start_node = None  # For edge creation
+        self.watcher = None
+        self.job = None  # bakgrunnsjobb som laster en ny graf
+        self.status = None  # StatusBar, settes av main()
+        self.clusters = None  # ClusterTree når grafen vises som klynger
+        self.layout_store = None  # LayoutStore, settes av main()
+        self.project = None  # stien posisjonene til grafen lagres under
+        self._dragged = None  # noden som flyttes nå
+        self.layout_engine = "force"  # se graph_model.LAYOUTS
+        self._hidden_groups: set[str] = set()  # sammenfoldede grupper i flat visning
+        self.query = None  # QueryIndex for grafen som vises
+        self.highlight: set[str] = set()  # markerte nodenavn
+        self._filter: set[str] | None = None  # nodene som vises i flat visning, None er alle
+        self.path_start = None  # startnoden for "Kallvei hit"
+        self.bundled = False  # kanter mellom moduler buntes i flat visning, se bundling.py
+        self._bundling = None  # Bundling som er indeksert nå
+        self._rebundle_pending = False
+
+        # Virtualisert tegning: bare det som er synlig finnes som canvas-elementer
+        self.zoom = 1.0
+        self.bounds = (0.0, 0.0, 4000.0, 4000.0)  # grafens utstrekning i grafkoordinater
+        self.index = GridIndex()
+        self.items: dict[object, list[int]] = {}  # Node/Edge -> canvas-elementer
+        self._owner: dict[int, object] = {}  # canvas-element -> Node/Edge
+        self._node_keys: dict[str, object] = {}  # nodenavn -> indeksert Node
+        self._edges_at: dict[str, set] = {}  # nodenavn -> indekserte kanter
+        self._free_lines: list[int] = []  # skjulte linjer som kan gjenbrukes
+        self._refresh_pending = False
+
+    def _reset(self, graph: Graph, clusters=None):
+        self.graph = graph
+        self.clusters = clusters
+        self._hidden_groups = set()
+        self.query = QueryIndex(graph)
+        self.highlight = set()
+        self._filter = None
+        self.path_start = None
+        self._bundling = None
         self.delete("all")
-        max_nodes = 1000  # Limit the number of nodes processed
-        max_edges = 2000  # Limit the number of edges processed
-
-        nodes = list(graph.nodes.values())[:max_nodes]
-        edges = graph.edges[:max_edges]
-
-        print(f"Number of nodes to process: {len(nodes)}")
-        print(f"Number of edges to process: {len(edges)}")
-
-        if len(edges) > 400:
-            print("Too many edges to render. Skipping edge rendering.")
-            edges = []
-            print("Rendering summary view with groups only.")
-            for group_name in graph.groups:
-                group = graph.groups[group_name]  # Retrieve the actual Group object
-                self._draw_node(group)
-                for connection in group.connections:
-                    self._draw_edge(connection)
-            print("Finished loading summary view.")
-            return
+        self.items.clear()
+        self._owner.clear()
+        self._free_lines.clear()
+        self._node_keys = {}
+        self._edges_at = {}
+
+    def _new_index(self):
+        extent = max(self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1])
+        self.index = GridIndex(cell=max(256.0, extent / 64))
 
-        batch_size = 100  # Render nodes and edges in batches
-        for i in range(0, len(nodes), batch_size):
-            print(f"Processing batch of nodes: {i} to {i+batch_size}")
-            for node in nodes[i:i+batch_size]:
+    def load_graph(self, graph: Graph):
+        log.debug("Loading graph into canvas")
+        self._reset(graph)
+
+        nodes = graph.nodes.values()
+        if nodes:
+            self.bounds = (
+                min(n.x for n in nodes), min(n.y for n in nodes),
+                max(n.x for n in nodes) + NODE_W, max(n.y for n in nodes) + NODE_H,
+            )
+        with instrument.stage("render.index"):
+            self._new_index()
+            for node in nodes:
                 # Reduce node dimensions and adjust scaling factor
-                node.width = 100
-                node.height = 50
-                self._draw_node(node)
-            self.update_idletasks()  # Update canvas incrementally
-
-        for i in range(0, len(edges), batch_size):
-            print(f"Processing batch of edges: {i} to {i+batch_size}")
-            for edge in edges[i:i+batch_size]:
-                self._draw_edge(edge)
-            self.update_idletasks()  # Update canvas incrementally
-
-        print("Finished loading graph.")
-
-    def toggle_group(self, group_node):
-        """Toggle visibility of a group node's children with lazy loading."""
-        if group_node.expanded:
-            for child in group_node.children:
-                self.delete(child.canvas_id)
-            group_node.expanded = False
+                node.width = NODE_W
+                node.height = NODE_H
+                self._index_node(node)
+            if self.bundled:
+                self._index_bundles(graph.edges)
+            else:
+                for edge in graph.edges:
+                    self._index_edge(edge)
+        log.info("Indexed %d nodes and %d edges.", len(graph.nodes), len(graph.edges))
+
+        self._update_scrollregion()
+        self._refresh()
+
+    def load_clusters(self, tree: ClusterTree):
+        """Vis grafen til ``tree`` som klynger; bare det synlige snittet indekseres."""
+        log.debug("Loading clusters into canvas")
+        self._reset(tree.graph, tree)
+        self.bounds = tree.bounds()
+        with instrument.stage("render.index"):
+            self._new_index()
+            items = tree.visible()
+            for key in items:
+                self._index_key(key)
+            for edge in tree.edges.values():
+                self._index_edge(edge)
+        log.info("Indexed %d clusters and nodes and %d edges.", len(items), len(tree.edges))
+
+        self._update_scrollregion()
+        self._refresh()
+
+    # ---------- kantbunting ----------
+    def set_bundled(self, bundled: bool):
+        """Slå bunting av kanter mellom moduler av eller på (flat visning)."""
+        self.bundled = bundled
+        if self.clusters is None:
+            self._rebundle()
+
+    def _index_bundles(self, edges):
+        shown = self._node_keys
+        edges = [e for e in edges if e.src.info.name in shown and e.dst.info.name in shown]
+        with instrument.stage("render.bundle"):
+            self._bundling = bundle_edges(shown.values(), edges)
+        for key in self._bundling.direct + self._bundling.lines:
+            self._index_edge(key)
+        instrument.count("render.bundled_lines", len(self._bundling.lines))
+
+    def _schedule_rebundle(self):
+        if not self._rebundle_pending:
+            self._rebundle_pending = True
+            self.after_idle(self._rebundle)
+
+    def _rebundle(self):
+        """Indekser kantene mellom de synlige nodene på nytt, buntet eller ikke."""
+        self._rebundle_pending = False
+        old = {edge for edges in self._edges_at.values() for edge in edges}
+        if self._bundling is not None:
+            old.update(self._bundling.lines)
+            self._bundling = None
+        for key in old:
+            self._forget(key)
+        if self.bundled:
+            self._index_bundles(self.graph.edges)
+        else:
+            for name in list(self._node_keys):
+                for edge in self.graph.out_edges.get(name, []):
+                    if edge.dst.info.name in self._node_keys:
+                        self._index_edge(edge)
+        self._refresh()
+
+    def toggle_group(self, group):
+        """Fold ut eller sammen en klynge (``Cluster`` eller ``Group`` fra grafen).
+
+        I klyngevisningen legges medlemmene ut og tegnes først når klyngen
+        foldes ut. I flat visning skjules eller vises medlemmene.
+        """
+        if self.clusters is not None:
+            cluster = group if isinstance(group, Cluster) else self.clusters.by_name.get(group.info.name)
+            if cluster is not None:
+                self.apply_cluster_change(self.clusters.toggle(cluster))
+            return
+        name = group.info.name
+        members = [self.graph.nodes[c.name] for c in group.info.children if c.name in self.graph.nodes]
+        if name in self._hidden_groups:
+            self._hidden_groups.discard(name)
+            for node in members:
+                if self._filter is None or node.info.name in self._filter:
+                    self._add_node(node)
         else:
-            for child in group_node.children:
-                if not hasattr(child, 'canvas_id'):
-                    self._draw_node(child)  # Lazy load child nodes
+            self._hidden_groups.add(name)
+            for node in members:
+                self._forget_node(node.info.name)
+        group.expanded = name not in self._hidden_groups
+
+    def apply_cluster_change(self, change):
+        """Fjern, tegn og flytt det ``ClusterTree.expand``/``collapse`` meldte."""
+        with instrument.stage("render.clusters"):
+            for key in change.removed + change.moved:
+                if key in self.index:
+                    self._forget(key)
+            for key in change.added + change.moved:
+                if isinstance(key, ClusterEdge):
+                    self._index_edge(key)
                 else:
-                    self.itemconfig(child.canvas_id, state='normal')
-            group_node.expanded = True
+                    self._index_key(key)
+                self._show(key)
+            self.tag_lower("frame")
+        self.bounds = self.clusters.bounds()
+        self._update_scrollregion()
+
+    # ---------- virtualisering ----------
+    def _index_key(self, key):
+        if isinstance(key, Cluster):
+            self.index.insert_box(key, key.x, key.y, key.x + key.width, key.y + key.height)
+        else:
+            self._index_node(key)
+
+    def _index_node(self, node):
+        rows = max(len(node.info.inputs), len(node.info.outputs))
+        # Marg for pin-tekster til venstre/høyre og pins under boksen
+        self.index.insert_box(node, node.x - 80, node.y, node.x + node.width + 80,
+                              node.y + max(node.height, 30 + rows * 15))
+        self._node_keys[node.info.name] = node
+
+    def _index_edge(self, edge):
+        x1, y1, x2, y2 = self._edge_coords(edge)
+        self.index.insert_segment(edge, x1, y1, x2, y2)
+        if isinstance(edge, ClusterEdge):
+            return  # kantene i klyngevisningen holdes rede på av ClusterTree
+        for end in (edge.src, edge.dst):
+            if isinstance(end, Node):  # knutepunktene i en bunt flyttes ikke
+                self._edges_at.setdefault(end.info.name, set()).add(edge)
+
+    def _forget_node(self, name):
+        """Fjern noden ``name`` og kantene dens fra indeksen og canvaset."""
+        for edge in list(self._edges_at.pop(name, ())):
+            self._forget(edge)
+        node = self._node_keys.get(name)
+        if node is not None:
+            self._forget(node)
+        if self.bundled and self.clusters is None:
+            self._schedule_rebundle()  # stammene mellom modulene endrer seg
+
+    def _add_node(self, node):
+        """Indekser noden og kantene dens, og tegn det som er synlig."""
+        node.width, node.height = NODE_W, NODE_H
+        self._index_node(node)
+        self._show(node)
+        if self.bundled and self.clusters is None:
+            self._schedule_rebundle()
+            return
+        for edge in self.graph.incident_edges(node.info.name):
+            if self._node_keys.get(edge.src.info.name) is None or self._node_keys.get(edge.dst.info.name) is None:
+                continue  # den andre enden er skjult
+            if edge not in self.index:
+                self._index_edge(edge)
+            self._show(edge)
+
+    def _incident(self, node):
+        """Kantene som er tegnet inn til og ut fra ``node``."""
+        if self.clusters is not None:
+            return list(self.clusters.edges_at(node))
+        if self.bundled:
+            return list(self._edges_at.get(node.info.name, ()))
+        return self.graph.incident_edges(node.info.name)
+
+    def _show(self, key):
+        """Tegn ``key`` hvis den ligger i det synlige området og ikke alt er tegnet."""
+        if key not in self.items and self._in_view(key):
+            self._materialize(key)
+            if isinstance(key, EDGE_TYPES):
+                self.tag_raise(self.items[key][0])
+
+    def _in_view(self, key):
+        x0, y0, x1, y1 = self._viewport()
+        if isinstance(key, EDGE_TYPES):
+            return segment_hits_rect(*self._edge_coords(key), x0, y0, x1, y1)
+        return key.x <= x1 and key.x + key.width >= x0 and key.y <= y1 and key.y + key.height >= y0
+
+    def _forget(self, key):
+        """Fjern en node eller kant fra indeksen og canvaset."""
+        self._release(key)
+        self.index.remove(key)
+        if isinstance(key, (Edge, BundleEdge)):
+            for end in (key.src, key.dst):
+                if isinstance(end, Node):
+                    self._edges_at.get(end.info.name, set()).discard(key)
+        elif isinstance(key, Node) and self._node_keys.get(key.info.name) is key:
+            del self._node_keys[key.info.name]
+
+    def _viewport(self):
+        """Synlig område i grafkoordinater, utvidet med VIEW_MARGIN."""
+        z = self.zoom
+        x0, y0 = self.canvasx(0) / z, self.canvasy(0) / z
+        x1, y1 = self.canvasx(self.winfo_width()) / z, self.canvasy(self.winfo_height()) / z
+        mx, my = (x1 - x0) * VIEW_MARGIN, (y1 - y0) * VIEW_MARGIN
+        return x0 - mx, y0 - my, x1 + mx, y1 + my
+
+    def _schedule_refresh(self):
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh)
+
+    def _refresh(self):
+        """Opprett elementer som har kommet inn i bildet og frigjør de som har forlatt det."""
+        self._refresh_pending = False
+        with instrument.stage("render.refresh"):
+            visible = self.index.query(*self._viewport())
+            gone = [k for k in self.items if k not in visible]
+            for key in gone:
+                self._release(key)
+            new = [key for key in visible if key not in self.items]
+            for key in new:
+                self._materialize(key)
+            if new:
+                self.tag_raise("edge")
+                self.tag_lower("frame")
+        instrument.count("render.created", len(new))
+        instrument.count("render.released", len(gone))
+
+    def _materialize(self, key):
+        if isinstance(key, Edge):
+            ids = [self._draw_edge(key)]
+        elif isinstance(key, ClusterEdge):
+            ids = self._draw_cluster_edge(key)
+        elif isinstance(key, BundleEdge):
+            ids = [self._draw_bundle_edge(key)]
+        elif isinstance(key, Cluster):
+            ids = self._draw_cluster(key)
+        else:
+            ids = self._draw_node(key)
+        self.items[key] = ids
+        for item in ids:
+            self._owner[item] = key
+
+    def _release(self, key):
+        ids = self.items.pop(key, None)
+        if not ids:
+            return
+        for item in ids:
+            self._owner.pop(item, None)
+        if isinstance(key, EDGE_TYPES):
+            # Kantlinjer skjules og gjenbrukes i stedet for å slettes
+            self.itemconfig(ids[0], state="hidden", tags=("pooled",))
+            self._free_lines.append(ids[0])
+            if len(ids) > 1:
+                self.delete(*ids[1:])
+        else:
+            self.delete(*ids)
+
+    def _rerender(self):
+        """Tegn alt synlig på nytt, f.eks. etter at zoomen er endret."""
+        for key in list(self.items):
+            self._release(key)
+        self._update_scrollregion()
+
+    def _update_scrollregion(self):
+        z, (x0, y0, x1, y1), pad = self.zoom, self.bounds, 200
+        self.configure(scrollregion=(x0 * z - pad, y0 * z - pad, x1 * z + pad, y1 * z + pad))
+
+    def _scroll_to(self, left, top):
+        """Rull slik at canvaskoordinaten (left, top) havner øverst til venstre."""
+        sx0, sy0, sx1, sy1 = (float(v) for v in self.cget("scrollregion").split())
+        self.xview_moveto((left - sx0) / max(sx1 - sx0, 1))
+        self.yview_moveto((top - sy0) / max(sy1 - sy0, 1))
 
     # ---------- intern ----------
     def _draw_node(self, node):
-        x, y, w, h = node.x, node.y, node.width, node.height
+        z = self.zoom
+        x, y, w, h = node.x * z, node.y * z, node.width * z, node.height * z
+        name = node.info.name
         # hovedboks
-        box = self.create_rectangle(x, y, x+w, y+h, fill="#2d2d30",
-                                    outline="#8c8c8c", width=2, tags=("node", node.info.name))
+        marked = name in self.highlight
+        box = self.create_rectangle(x, y, x+w, y+h, fill="#2d2d30", outline=HIGHLIGHT if marked else "#8c8c8c",
+                                    width=3 if marked else 2, tags=("node", name, "draggable"))
         node.canvas_id = box
-        # tekst
-        self.create_text(x+w/2, y+15, text=node.info.name, fill="white", font=("Helvetica", 10, "bold"), tags=("node",))
-        # input-pins
-        for i, inp in enumerate(node.info.inputs):
-            pin_y = y + 30 + i*15
-            self.create_oval(x-PIN_R, pin_y-PIN_R, x+PIN_R, pin_y+PIN_R,
-                             fill="#569cd6", outline="", tags=("pin",))
-            self.create_text(x-10, pin_y, text=inp, anchor="e", fill="#d4d4d4", font=("Helvetica", 8))
-        # output-pins
-        for i, outp in enumerate(node.info.outputs):
-            pin_y = y + 30 + i*15
-            self.create_oval(x+w-PIN_R, pin_y-PIN_R, x+w+PIN_R, pin_y+PIN_R,
-                             fill="#dcdcaa", outline="", tags=("pin",))
-            self.create_text(x+w+10, pin_y, text=outp, anchor="w", fill="#d4d4d4", font=("Helvetica", 8))
-        # husk taggen på hovedboksen for dragging
-        self.addtag_withtag("draggable", box)
-
-        # Add debug prints to verify node positions and dimensions
-        print(f"Drawing node: {node.info.name}, Position: ({x}, {y}), Dimensions: ({w}x{h})")
+        ids = [box]
+        if z >= LABEL_ZOOM:
+            # tekst
+            ids.append(self.create_text(x+w/2, y+15*z, text=name, fill="white", font=("Helvetica", 10, "bold"), tags=("label", name)))
+        if z >= PIN_ZOOM:
+            # input-pins
+            for i, inp in enumerate(node.info.inputs):
+                pin_y = y + (30 + i*15) * z
+                ids.append(self.create_oval(x-PIN_R, pin_y-PIN_R, x+PIN_R, pin_y+PIN_R,
+                                            fill="#569cd6", outline="", tags=("pin", name)))
+                ids.append(self.create_text(x-10, pin_y, text=inp, anchor="e", fill="#d4d4d4", font=("Helvetica", 8), tags=("label", name)))
+            # output-pins
+            for i, outp in enumerate(node.info.outputs):
+                pin_y = y + (30 + i*15) * z
+                ids.append(self.create_oval(x+w-PIN_R, pin_y-PIN_R, x+w+PIN_R, pin_y+PIN_R,
+                                            fill="#dcdcaa", outline="", tags=("pin", name)))
+                ids.append(self.create_text(x+w+10, pin_y, text=outp, anchor="w", fill="#d4d4d4", font=("Helvetica", 8), tags=("label", name)))
+        return ids
 
-    def _draw_edge(self, edge):
+    @staticmethod
+    def _edge_coords(edge):
         # fra midt-høyre på src til midt-venstre på dst
         x1 = edge.src.x + edge.src.width
         y1 = edge.src.y + edge.src.height/2
         x2 = edge.dst.x
         y2 = edge.dst.y + edge.dst.height/2
-        self.create_line(x1, y1, x2, y2, arrow=tk.LAST, fill="#c586c0", width=2)
+        return x1, y1, x2, y2
+
+    def _draw_edge(self, edge):
+        z = self.zoom
+        x1, y1, x2, y2 = (v * z for v in self._edge_coords(edge))
+        src, dst = edge.src.info.name, edge.dst.info.name
+        tags = ("edge", f"edge:{src}->{dst}", f"out:{src}", f"in:{dst}")
+        width = edge_width(edge.weight)
+        if src in self.highlight and dst in self.highlight:
+            return self._line(x1, y1, x2, y2, tags, width=width + 1, fill=HIGHLIGHT)
+        return self._line(x1, y1, x2, y2, tags, width=width)
+
+    def _draw_bundle_edge(self, edge):
+        z = self.zoom
+        x1, y1, x2, y2 = (v * z for v in self._edge_coords(edge))
+        if edge.trunk:
+            return self._line(x1, y1, x2, y2, ("edge", "bundle"), width=edge_width(edge.count), fill="#4ec9b0",
+                              arrow=tk.NONE)
+        # Pil bare inn mot noden; eikene ut fra en node ender i knutepunktet
+        arrow = tk.LAST if isinstance(edge.dst, Node) else tk.NONE
+        return self._line(x1, y1, x2, y2, ("edge", "spoke"), width=edge_width(edge.count), arrow=arrow)
+
+    def _line(self, x1, y1, x2, y2, tags, width, fill="#c586c0", arrow=tk.LAST):
+        if self._free_lines:
+            line = self._free_lines.pop()
+            self.coords(line, x1, y1, x2, y2)
+            self.itemconfig(line, state="normal", tags=tags, width=width, fill=fill, arrow=arrow)
+            return line
+        return self.create_line(x1, y1, x2, y2, arrow=arrow, fill=fill, width=width, tags=tags)
+
+    def _draw_cluster(self, cluster):
+        z = self.zoom
+        x, y, w, h = cluster.x * z, cluster.y * z, cluster.width * z, cluster.height * z
+        tags = ("cluster", cluster.name)
+        if cluster.expanded:
+            # Ramme rundt barna, navnet i toppen
+            ids = [self.create_rectangle(x, y, x+w, y+h, outline="#3c7fb1", dash=(4, 2), width=1,
+                                         tags=tags + ("frame",))]
+            if z >= LABEL_ZOOM / 4:
+                ids.append(self.create_text(x+6, y+6, text=f"▾ {cluster.label}", anchor="nw", fill="#9cdcfe",
+                                            font=("Helvetica", 10, "bold"), tags=tags))
+            return ids
+        ids = [self.create_rectangle(x, y, x+w, y+h, fill="#264f78", outline="#3c7fb1", width=2, tags=tags)]
+        if z >= LABEL_ZOOM / 4:
+            ids.append(self.create_text(x+w/2, y+h/2, text=f"▸ {cluster.label}\n{cluster.size} noder",
+                                        fill="white", justify="center", font=("Helvetica", 10, "bold"), tags=tags))
+        return ids
+
+    def _draw_cluster_edge(self, edge):
+        z = self.zoom
+        x1, y1, x2, y2 = (v * z for v in self._edge_coords(edge))
+        ids = [self._line(x1, y1, x2, y2, ("edge", "cluster-edge"), width=1 + math.log2(edge.count))]
+        if edge.count > 1 and z >= LABEL_ZOOM:
+            ids.append(self.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=str(edge.count), fill="#c586c0",
+                                        font=("Helvetica", 8), tags=("edge-label",)))
+        return ids
+
+    # ---------- inkrementell oppdatering ----------
+    def apply_diff(self, diff):
+        """Oppdater bare nodene og kantene som er endret i ``diff`` (allerede brukt på grafen)."""
+        if diff.is_empty():
+            return
+        touched = set(diff.removed_nodes) | {ni.name for ni in diff.changed_nodes}
+        touched |= {ei.caller for ei in diff.removed_edges + diff.added_edges}
+        touched |= {ni.name for ni in diff.added_nodes}
+        for name in touched:
+            self._forget_node(name)
+        for name in touched:
+            node = self.graph.nodes.get(name)
+            if node is not None:
+                self._add_node(node)
+
+    def _rebuild_clusters(self):
+        """Bygg klyngene på nytt fra grafen, med de samme klyngene utfoldet."""
+        self.load_clusters(ClusterTree(self.graph, (NODE_W, NODE_H), expanded=self.clusters.expanded_names(),
+                                       engine=self.layout_engine))
+
+    def watch(self, watcher, interval=1000):
+        """Poll ``watcher`` hvert ``interval`` ms og oppdater grafen inkrementelt."""
+        if self.watcher is not None and self.watcher is not watcher:
+            self.watcher.close()
+        self.watcher = watcher
+        self.after(interval, self._poll_watcher, watcher, interval)
+
+    def _poll_watcher(self, watcher, interval):
+        if watcher is not self.watcher:
+            return  # en ny fil er åpnet
+        try:
+            with instrument.stage("watch.poll"):
+                diff = watcher.poll()
+            if not diff.is_empty():
+                with instrument.stage("render.patch"):
+                    self.graph.apply_diff(diff)
+                    if self.clusters is not None:
+                        self._rebuild_clusters()
+                    else:
+                        self.apply_diff(diff)
+                        self.save_positions()
+        except Exception as e:
+            log.exception("Error updating graph: %s", e)
+        self.after(interval, self._poll_watcher, watcher, interval)
+
+    def save_positions(self):
+        """Lagre posisjonene i flat visning, så neste åpning slipper global layout."""
+        if self.layout_store is not None and self.project is not None and self.clusters is None:
+            self.layout_store.save(self.project, self.graph)
+
+    def unpin_all(self):
+        self.graph.unpin_all()
+        self.save_positions()
+
+    # ---------- bakgrunnsjobber ----------
+    def run_job(self, job, on_done):
+        """Start ``job`` og kall ``on_done(result)`` i GUI-tråden når den er ferdig.
+
+        En jobb som allerede kjører avbrytes; resultatet dens kastes.
+        """
+        if self.job is not None:
+            self.job.cancel()
+        self.job = job.start()
+        if self.status is not None:
+            self.status.busy(job.name)
+        self.after(JOB_POLL_MS, self._poll_job, job, on_done)
+
+    def cancel_job(self):
+        if self.job is not None:
+            self.job.cancel()
+            if self.status is not None:
+                self.status.show("Avbryter…")
+
+    def _poll_job(self, job, on_done):
+        current = job is self.job
+        for kind, value in job.poll():
+            if kind == "progress":
+                if current and self.status is not None:
+                    self.status.progress(*value)
+                continue
+            # Jobben er ferdig på en eller annen måte
+            if current:
+                self.job = None
+            if kind == "done" and current and not job.cancelled:
+                on_done(value)
+                message = ""
+            elif kind == "done":
+                if job.discard is not None:
+                    job.discard(value)  # avbrutt etter at resultatet var klart
+                message = "Avbrutt"
+            else:
+                message = "Avbrutt" if kind == "cancelled" else f"Feil: {value}"
+            if current and self.status is not None:
+                self.status.idle(message)
+            return
+        self.after(JOB_POLL_MS, self._poll_job, job, on_done)
 
     # ---------- interactivity ----------
     def edit_node(self):
-        if self.drag_item:
-            node_tag = self.gettags(self.drag_item)[1]
-            node = self.graph.nodes[node_tag]
+        node = self._owner.get(self.drag_item)
+        if isinstance(node, Node):
 
             # Open dialog to edit node properties
             edit_window = tk.Toplevel(self)
@@ -155,190 +614,461 @@ class NodeCanvas(tk.Canvas):
             outputs_entry.grid(row=2, column=1)
 
             def save_changes():
-                node.info.name = name_entry.get()
+                # Bare noden og kantene dens tegnes på nytt
+                old_name, new_name = node.info.name, name_entry.get()
+                self._forget_node(old_name)
+                if new_name != old_name and not self.graph.rename_node(old_name, new_name):
+                    log.warning("A node named %s already exists.", new_name)
                 node.info.inputs = inputs_entry.get().split(",")
                 node.info.outputs = outputs_entry.get().split(",")
-                self.load_graph(self.graph)
+                if self.clusters is not None:
+                    self._rebuild_clusters()
+                else:
+                    self._add_node(node)
                 edit_window.destroy()
 
             tk.Button(edit_window, text="Save", command=save_changes).grid(row=3, columnspan=2)
 
     def delete_edge(self):
-        if self.drag_item:
-            edge_tag = self.gettags(self.drag_item)[1]
-            edge = next((e for e in self.graph.edges if e.src.info.name == edge_tag or e.dst.info.name == edge_tag), None)
-            if edge:
-                self.graph.edges.remove(edge)
-                self.load_graph(self.graph)
+        edge = self._owner.get(self.drag_item)
+        if isinstance(edge, Edge):
+            self.graph.remove_edge(edge)
+            self._forget(edge)
+            if self.bundled:
+                self._schedule_rebundle()
+
+    def on_double_click(self, event):
+        item = self.find_closest(self.canvasx(event.x), self.canvasy(event.y))
+        key = self._owner.get(item[0]) if item else None
+        if isinstance(key, Cluster):
+            self.toggle_group(key)
 
     def on_right_click(self, event):
-        item = self.find_closest(event.x, event.y)[0]
-        if "node" in self.gettags(item):
-            self.drag_item = item
-            self.context_menu.entryconfig("Edit Node", state="normal")
-            self.context_menu.entryconfig("Delete Edge", state="disabled")
-        elif "edge" in self.gettags(item):
-            self.drag_item = item
-            self.context_menu.entryconfig("Edit Node", state="disabled")
-            self.context_menu.entryconfig("Delete Edge", state="normal")
-        else:
-            self.drag_item = None
-            self.context_menu.entryconfig("Edit Node", state="disabled")
-            self.context_menu.entryconfig("Delete Edge", state="disabled")
+        item = self.find_closest(self.canvasx(event.x), self.canvasy(event.y))[0]
+        on_node = "node" in self.gettags(item)
+        on_edge = "edge" in self.gettags(item)
+        self.drag_item = item if on_node or on_edge else None
+        for label in NODE_ACTIONS:
+            self.context_menu.entryconfig(label, state="normal" if on_node else "disabled")
+        self.context_menu.entryconfig("Delete Edge", state="normal" if on_edge else "disabled")
 
         self.context_menu.post(event.x_root, event.y_root)
 
+    # ---------- oppslag ----------
+    def _context_node(self):
+        node = self._owner.get(self.drag_item)
+        return node if isinstance(node, Node) else None
+
+    def set_highlight(self, names):
+        """Marker nodene ``names`` og kantene mellom dem; tegner det synlige på nytt."""
+        self.highlight = set(names)
+        self._rerender()
+        self._refresh()
+
+    def mark_reach(self, direction):
+        node = self._context_node()
+        if node is not None:
+            name = node.info.name
+            found = getattr(self.query, direction)(name)
+            self.set_highlight(found | {name})
+            if self.status is not None:
+                self.status.show(f"{len(found)} {'kallere' if direction == 'callers' else 'kallede'} av {name}")
+
+    def filter_to_reach(self):
+        """Vis bare noden og alt som kaller eller kalles av den, direkte eller indirekte."""
+        node = self._context_node()
+        if node is not None:
+            name = node.info.name
+            self.filter_to(self.query.callers(name) | self.query.callees(name) | {name})
+
+    def filter_to(self, names):
+        """Vis bare nodene ``names`` i flat visning; ``None`` viser alle igjen."""
+        if self.clusters is not None:
+            log.info("Filtering is only available in the flat view.")
+            return
+        self._filter = None if names is None else set(names)
+        wanted = {
+            name for name in self.graph.nodes
+            if (self._filter is None or name in self._filter)
+            and self.graph.group_of.get(name) not in self._hidden_groups
+        }
+        for name in [n for n in self._node_keys if n not in wanted]:
+            self._forget_node(name)
+        for name in wanted:
+            if name not in self._node_keys:
+                self._add_node(self.graph.nodes[name])
+
+    def start_call_path(self):
+        node = self._context_node()
+        if node is not None:
+            self.path_start = node.info.name
+
+    def mark_call_path(self):
+        node = self._context_node()
+        if node is None or self.path_start is None:
+            return
+        path = self.query.call_path(self.path_start, node.info.name)
+        self.set_highlight(path or ())
+        if self.status is not None:
+            self.status.show(" → ".join(path) if path else f"Ingen kallvei fra {self.path_start}")
+
+    def clear_query(self):
+        if self._filter is not None:
+            self.filter_to(None)
+        self.set_highlight(())
+
+    def focus_node(self, name):
+        """Sentrer på noden ``name`` og marker den; klyngene rundt den foldes ut."""
+        node = self.graph.nodes.get(name)
+        if node is None:
+            return
+        if self.clusters is not None:
+            for cluster in self.clusters.path_to(name):
+                if not cluster.expanded:
+                    self.apply_cluster_change(self.clusters.expand(cluster))
+        elif self._filter is not None and name not in self._filter:
+            self.filter_to(None)
+        self.highlight = {name}
+        self._rerender()
+        self._scroll_to((node.x + node.width / 2) * self.zoom - self.winfo_width() / 2,
+                        (node.y + node.height / 2) * self.zoom - self.winfo_height() / 2)
+        self._refresh()
+
     # ---------- dragging ----------
     def on_press(self, event):
-        closest_items = self.find_closest(event.x, event.y)
+        x, y = self.canvasx(event.x), self.canvasy(event.y)
+        closest_items = self.find_closest(x, y)
         if not closest_items:
-            print("No items found at the clicked location.")
+            log.debug("No items found at the clicked location.")
             return
         item = closest_items[0]
         if "draggable" in self.gettags(item):
             self.drag_item = item
-            self.offset = (event.x - self.coords(item)[0], event.y - self.coords(item)[1])
+            self.offset = (x - self.coords(item)[0], y - self.coords(item)[1])
         elif "node" in self.gettags(item):
             # Safeguard to check the length of tags before accessing
             if len(self.gettags(item)) > 1:
                 self.start_node = self.gettags(item)[1]
 
     def on_drag(self, event):
+        x, y = self.canvasx(event.x), self.canvasy(event.y)
         if self.drag_item:
-            new_x = event.x - self.offset[0]
-            new_y = event.y - self.offset[1]
+            new_x = x - self.offset[0]
+            new_y = y - self.offset[1]
             dx = new_x - self.coords(self.drag_item)[0]
             dy = new_y - self.coords(self.drag_item)[1]
-            # flytt hoved­rektangel + alt med samme nodenavn-tag
-            tags = self.gettags(self.drag_item)
-            node_tag = tags[1]  # andre tag er navnet
-            for item in self.find_withtag(node_tag):
+            # flytt hoved­rektangel + alle elementer registrert på noden
+            node = self._owner.get(self.drag_item)
+            if not isinstance(node, Node):
+                return
+            for item in self.items.get(node, ()):
                 self.move(item, dx, dy)
-        elif self.start_node:
-            end_node = self.find_closest(event.x, event.y)[0]
+            # Hold modellen og indeksen i takt, ellers hopper noden tilbake ved neste refresh
+            node.x += dx / self.zoom
+            node.y += dy / self.zoom
+            if self.clusters is None:
+                # Klyngevisningen har egne koordinater; de skal ikke låse noden i flat visning
+                node.pinned = True
+                self._dragged = node
+            self._index_node(node)
+            # Bare kantene inn til og ut fra noden rutes på nytt
+            for edge in self._incident(node):
+                self._index_edge(edge)
+                if edge in self.items:
+                    self.coords(self.items[edge][0], *(v * self.zoom for v in self._edge_coords(edge)))
+                else:
+                    self._show(edge)
+        elif self.start_node and self.clusters is None:
+            end_node = self.find_closest(x, y)[0]
             if "node" in self.gettags(end_node):
                 end_node_tag = self.gettags(end_node)[1]
-                self.graph.edges.append(Edge(self.graph.nodes[self.start_node], self.graph.nodes[end_node_tag]))
-                self.load_graph(self.graph)
+                edge = self.graph.add_edge(self.start_node, end_node_tag)
+                if edge and self.bundled:
+                    self._schedule_rebundle()
+                elif edge:
+                    # Fantes kanten fra før, har vekten økt: tegn den på nytt med ny bredde
+                    self._release(edge)
+                    self._index_edge(edge)
+                    self._show(edge)
                 self.start_node = None
 
+    def on_release(self, event):
+        node, self._dragged = self._dragged, None
+        if (node is not None and self.layout_store is not None and self.project is not None
+                and self.clusters is None):
+            self.layout_store.pin(self.project, node)
+
     def save_as_image(self, filename):
-        self.postscript(file=filename + ".ps")
-        try:
-            from PIL import Image
-            img = Image.open(filename + ".ps")
-            img.save(filename + ".png")
-        except ImportError:
-            print("Pillow is required to save as PNG. Install it using 'pip install pillow'.")
+        # Fra grafens koordinater, ikke canvaset: med alle noder og kanter, uten Ghostscript og Pillow
+        export.export_to_png(self.graph, filename)
 
     def export_to_json(self, filename):
-        graph_data = {
-            "nodes": [
-                {
-                    "name": node.info.name,
-                    "inputs": node.info.inputs,
-                    "outputs": node.info.outputs,
-                    "x": node.x,
-                    "y": node.y
-                } for node in self.graph.nodes.values()
-            ],
-            "edges": [
-                {
-                    "src": edge.src.info.name,
-                    "dst": edge.dst.info.name
-                } for edge in self.graph.edges
-            ]
-        }
-        with open(filename + ".json", "w") as f:
-            json.dump(graph_data, f, indent=4)
+        export.export_to_json(self.graph, filename)
 
     def export_to_xml(self, filename):
-        root = ET.Element("Graph")
-        nodes_elem = ET.SubElement(root, "Nodes")
-        for node in self.graph.nodes.values():
-            node_elem = ET.SubElement(nodes_elem, "Node", {
-                "name": node.info.name,
-                "x": str(node.x),
-                "y": str(node.y)
-            })
-            inputs_elem = ET.SubElement(node_elem, "Inputs")
-            for inp in node.info.inputs:
-                ET.SubElement(inputs_elem, "Input").text = inp
-            outputs_elem = ET.SubElement(node_elem, "Outputs")
-            for outp in node.info.outputs:
-                ET.SubElement(outputs_elem, "Output").text = outp
-
-        edges_elem = ET.SubElement(root, "Edges")
-        for edge in self.graph.edges:
-            ET.SubElement(edges_elem, "Edge", {
-                "src": edge.src.info.name,
-                "dst": edge.dst.info.name
-            })
-
-        tree = ET.ElementTree(root)
-        tree.write(filename + ".xml", encoding="utf-8", xml_declaration=True)
+        export.export_to_xml(self.graph, filename)
+
+    def export_to_jsonl(self, filename):
+        export.export_to_jsonl(self.graph, filename)
+
+    def save_snapshot(self, filename):
+        snapshot.save_snapshot(self.graph, filename)
 
     # Define zoom and pan methods
     def on_zoom(self, event):
         scale = 1.1 if event.delta > 0 else 0.9
-        self.scale("all", event.x, event.y, scale, scale)
-        self.configure(scrollregion=self.bbox("all"))
+        # Hold grafpunktet under musepekeren i ro
+        gx = self.canvasx(event.x) / self.zoom
+        gy = self.canvasy(event.y) / self.zoom
+        self.zoom *= scale
+        self._rerender()
+        self._scroll_to(gx * self.zoom - event.x, gy * self.zoom - event.y)
+        self._refresh()
 
     def start_pan(self, event):
         self.scan_mark(event.x, event.y)
 
     def on_pan(self, event):
         self.scan_dragto(event.x, event.y, gain=1)
+        self._schedule_refresh()
 
     def auto_pan_zoom(self):
         # Refine auto pan/zoom to center and scale the canvas properly
-        bbox = self.bbox("all")
-        if bbox:
+        if self.graph.nodes:
+            x0, y0, x1, y1 = self.bounds
             canvas_width, canvas_height = self.winfo_width(), self.winfo_height()
-            scale_x = canvas_width / (bbox[2] - bbox[0])
-            scale_y = canvas_height / (bbox[3] - bbox[1])
+            scale_x = canvas_width / max(x1 - x0, 1)
+            scale_y = canvas_height / max(y1 - y0, 1)
             # Update auto pan/zoom scaling factor
-            scale = min(scale_x, scale_y) * 0.9  # Slightly increase scaling factor
-            self.scale("all", 0, 0, scale, scale)
-            self.configure(scrollregion=bbox)
-            self.xview_moveto(0.5)
-            self.yview_moveto(0.5)
+            self.zoom = min(scale_x, scale_y) * 0.9  # Slightly increase scaling factor
+            self._rerender()
+            self._scroll_to((x0 + x1) / 2 * self.zoom - canvas_width / 2,
+                            (y0 + y1) / 2 * self.zoom - canvas_height / 2)
+            self._refresh()
 
 # Update main menu to include export options
-def main():
+def main(path=None):
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    # PY_VIZ_PROFILE=1 skriver en profil over tid per trinn når vinduet lukkes
+    profile = instrument.enable() if os.environ.get("PY_VIZ_PROFILE") else None
+
     root = tk.Tk()
     root.title("Python Node Visualizer")
 
     graph = Graph()
     canvas = NodeCanvas(root, graph)
+    canvas.layout_store = LayoutStore()
+    canvas.status = StatusBar(root, on_cancel=canvas.cancel_job)
+    canvas.status.pack(side="bottom", fill="x", before=canvas)
+    SearchBar(root, canvas).pack(side="top", fill="x", before=canvas)
+    root.bind("<Escape>", lambda event: canvas.cancel_job())
 
     # Meny for å åpne fil
     menubar = tk.Menu(root)
     filemenu = tk.Menu(menubar, tearoff=0)
-    filemenu.add_command(label="Åpne Python-fil…", command=lambda: open_py(canvas, graph))
+    filemenu.add_command(label="Åpne Python-fil…", command=lambda: open_py(canvas))
+    filemenu.add_command(label="Åpne prosjektmappe…", command=lambda: open_project(canvas))
     filemenu.add_separator()
     filemenu.add_command(label="Lagre som bilde…", command=lambda: canvas.save_as_image("graph"))
     filemenu.add_command(label="Eksporter til JSON…", command=lambda: canvas.export_to_json("graph"))
     filemenu.add_command(label="Eksporter til XML…", command=lambda: canvas.export_to_xml("graph"))
+    filemenu.add_command(label="Eksporter til JSON Lines…", command=lambda: canvas.export_to_jsonl("graph"))
+    filemenu.add_command(label="Lagre graf (.pvg)…", command=lambda: canvas.save_snapshot("graph"))
     filemenu.add_separator()
     filemenu.add_command(label="Avslutt", command=root.quit)
     menubar.add_cascade(label="Fil", menu=filemenu)
+
+    viewmenu = tk.Menu(menubar, tearoff=0)
+    engine = tk.StringVar(value=canvas.layout_engine)
+    for label, value in (("Kraftbasert layout", "force"), ("Flernivå-layout", "multilevel"),
+                         ("Lagdelt layout (kallhierarki)", "layered"),
+                         ("Komponentvis layout (parallell)", "components")):
+        viewmenu.add_radiobutton(label=label, variable=engine, value=value,
+                                 command=lambda: set_layout(canvas, engine.get()))
+    viewmenu.add_separator()
+    viewmenu.add_command(label="Forbedre layout", command=lambda: set_layout(canvas, "multilevel", warm_start=True))
+    viewmenu.add_command(label="Løsne alle noder", command=canvas.unpin_all)
+    bundled = tk.BooleanVar(value=canvas.bundled)
+    viewmenu.add_checkbutton(label="Bunt kanter mellom moduler", variable=bundled,
+                             command=lambda: canvas.set_bundled(bundled.get()))
+    menubar.add_cascade(label="Visning", menu=viewmenu)
     root.config(menu=menubar)
 
+    if path:
+        canvas.after(100, load_path, canvas, Path(path))
+
     root.state("zoomed")  # fullskjerm
     root.mainloop()
+    canvas.layout_store.close()
+    if profile is not None:
+        log.info("Profile:\n%s", profile.summary())
+
+def open_py(canvas):
+    path = filedialog.askopenfilename(filetypes=[("Python-filer", "*.py"), ("Lagret graf", "*.pvg")])
+    if not path:
+        log.info("No file selected.")
+        return
+    load_path(canvas, Path(path))
 
-def open_py(canvas, graph):
-    path = filedialog.askopenfilename(filetypes=[("Python-filer", "*.py")])
+def open_project(canvas):
+    path = filedialog.askdirectory()
     if not path:
-        print("No file selected.")
+        log.info("No folder selected.")
+        return
+    load_path(canvas, Path(path))
+
+def load_path(canvas, path):
+    """Parse og legg ut ``path`` i en bakgrunnstråd; GUI-et kan brukes imens."""
+    def done(result):
+        graph, watcher, clusters = result
+        # Øyeblikksbilder har posisjonene sine selv
+        canvas.project = None if path.suffix == ".pvg" else path
+        if clusters is not None:
+            canvas.load_clusters(clusters)
+        else:
+            canvas.load_graph(graph)
+        canvas.auto_pan_zoom()
+        if watcher is not None:
+            canvas.watch(watcher)
+        elif canvas.watcher is not None:
+            canvas.watcher.close()
+            canvas.watcher = None
+
+    canvas.run_job(Job(_load_work, path, canvas.layout_engine, canvas.layout_store, name=f"Laster {path.name}",
+                       discard=_discard_load), done)
+
+def set_layout(canvas, engine, warm_start=False):
+    """Legg ut grafen som vises på nytt med ``engine``, i en bakgrunnsjobb.
+
+    Med ``warm_start`` forfines dagens layout i stedet for å starte på nytt.
+    """
+    if not warm_start:
+        canvas.layout_engine = engine
+    if canvas.clusters is not None:
+        # Bare det som er utfoldet legges ut, så det holder å bygge klyngene på nytt
+        canvas._rebuild_clusters()
+        canvas.auto_pan_zoom()
         return
+    graph = canvas.graph
+    # Øyeblikksbilde her i GUI-tråden: watcheren kan endre grafen mens jobben går
+    snapshot = graph.layout_snapshot()
+
+    def done(layout):
+        if canvas.graph is graph:
+            graph.set_positions(layout)
+            canvas.load_graph(graph)
+            canvas.auto_pan_zoom()
+            canvas.save_positions()
+
+    def work(job):
+        return graph.compute_layout(engine, job.reporter("Legger ut"), warm_start, snapshot)
+
+    canvas.run_job(Job(work, name="Legger ut"), done)
+
+def _load_work(job, path, engine="force", store=None):
+    """Kjører i arbeidstråden: parse og layout, men ingen Tk-kall.
+
+    Med ``store`` hentes posisjonene fra forrige gang prosjektet var åpent,
+    og bare nye noder legges ut.
+    """
+    if path.suffix == ".pvg":
+        # Lagret graf: posisjonene er med, så verken parsing eller layout trengs
+        job.progress("Leser øyeblikksbilde")
+        return snapshot.load_snapshot(str(path)), None, None
+    job.progress("Parser", 0.0)
+    watcher = SourceWatcher(path, cache=ParseCache())
     try:
-        nodes, edges, groups = parse_file(Path(path))
-        graph.build(nodes, edges, groups)
-        canvas.load_graph(graph)
-    except Exception as e:
-        print(f"Error loading graph: {e}")
+        nodes, edges, groups = watcher.load(progress=job.reporter("Parser"))
+        job.progress("Legger ut", 0.0)
+        graph = Graph()
+        if len(nodes) < CLUSTER_VIEW_MIN:
+            positions = store.load(path) if store is not None else None
+            graph.build(nodes, edges, groups, progress=job.reporter("Legger ut"), engine=engine,
+                        positions=positions)
+            if store is not None:
+                store.save(path, graph)
+            return graph, watcher, None
+        # Stor graf: bare klyngene på toppnivået legges ut nå, resten når de foldes ut
+        graph.build(nodes, edges, groups, layout=False)
+        clusters = ClusterTree(graph, (NODE_W, NODE_H), progress=job.reporter("Legger ut"), engine=engine)
+    except BaseException:
+        watcher.close()
+        raise
+    return graph, watcher, clusters
+
+def _discard_load(result):
+    graph, watcher, clusters = result
+    if watcher is not None:
+        watcher.close()
+
+class SearchBar(tk.Frame):
+    """Søk etter funksjoner mens man skriver; valgt treff sentreres og markeres."""
+
+    def __init__(self, master, canvas):
+        super().__init__(master)
+        self.canvas = canvas
+        tk.Label(self, text="Søk:").pack(side="left")
+        self.box = ttk.Combobox(self, width=60)
+        self.box.pack(side="left", padx=4)
+        self.box.bind("<KeyRelease>", self.on_type)
+        self.box.bind("<Return>", self.on_select)
+        self.box.bind("<<ComboboxSelected>>", self.on_select)
+
+    def on_type(self, event):
+        if event.keysym in ("Return", "Up", "Down", "Escape"):
+            return
+        if self.canvas.query is not None:
+            self.box.configure(values=self.canvas.query.search(self.box.get()))
+
+    def on_select(self, event):
+        text = self.box.get()
+        if self.canvas.query is None:
+            return
+        if text not in self.canvas.graph.nodes:
+            matches = self.canvas.query.search(text, limit=1)
+            if not matches:
+                return
+            text = matches[0]
+            self.box.set(text)
+        self.canvas.focus_node(text)
+
+class StatusBar(tk.Frame):
+    """Fremdrift for bakgrunnsjobber, med avbryt-knapp."""
+
+    def __init__(self, master, on_cancel):
+        super().__init__(master, bg="#252526")
+        self.label = tk.Label(self, anchor="w", bg="#252526", fg="white")
+        self.bar = ttk.Progressbar(self, length=200, maximum=1.0)
+        self.cancel = tk.Button(self, text="Avbryt", command=on_cancel, state="disabled")
+        self.cancel.pack(side="right", padx=4, pady=2)
+        self.bar.pack(side="right", padx=4)
+        self.label.pack(side="left", fill="x", expand=True, padx=4)
+
+    def show(self, text):
+        self.label.configure(text=text)
+
+    def busy(self, text):
+        self.show(text)
+        self.cancel.configure(state="normal")
+        self.bar.configure(mode="indeterminate")
+        self.bar.start(20)
+
+    def progress(self, stage, fraction=None):
+        self.show(stage if fraction is None else f"{stage} {fraction:.0%}")
+        if fraction is None:
+            return
+        if str(self.bar.cget("mode")) != "determinate":
+            self.bar.stop()
+            self.bar.configure(mode="determinate")
+        self.bar["value"] = fraction
+
+    def idle(self, text=""):
+        self.show(text)
+        self.bar.stop()
+        self.bar.configure(mode="determinate")
+        self.bar["value"] = 0
+        self.cancel.configure(state="disabled")
 
 if __name__ == "__main__":
     main()
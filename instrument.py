@@ -0,0 +1,134 @@
+# instrument.py
+"""
+Tidtaking og tellere per trinn (parse, build, layout, render) og hooks.
+
+Instrumenteringen er av som standard. Da returnerer ``stage()`` en delt
+tom kontekst og ``count()`` returnerer med en gang, så kallstedene koster
+nesten ingenting. Med ``enable()`` samles tider og tellere i en
+``Profile`` som kan skrives ut med ``summary()``; hooks lagt til med
+``add_hook()`` får hver måling etter hvert som den skjer.
+
+    import instrument
+    profile = instrument.enable()
+    ...
+    print(profile.summary())
+"""
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from typing import Callable
+
+Hook = Callable[[str, str, float], None]  # (kind, name, value), kind er "stage" eller "count"
+
+_NULL = nullcontext()
+_profile: "Profile | None" = None
+_hooks: list[Hook] = []
+_active = False  # profil eller hooks finnes
+
+
+class Profile:
+    """Summert tid og antall kall per trinn, og tellere."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.counters: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def add_stage(self, name: str, seconds: float):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "wall": time.perf_counter() - self.started,
+            "stages": {name: {"seconds": s, "calls": self.calls[name]} for name, s in self.seconds.items()},
+            "counters": dict(self.counters),
+        }
+
+    def summary(self) -> str:
+        """Tabell over trinn sortert etter navn, så undertrinn havner under trinnet sitt."""
+        wall = time.perf_counter() - self.started
+        lines = [f"{'stage':<28}{'calls':>8}{'seconds':>12}{'% wall':>9}"]
+        for name in sorted(self.seconds):
+            s = self.seconds[name]
+            lines.append(f"{name:<28}{self.calls[name]:>8}{s:>12.4f}{100 * s / max(wall, 1e-12):>8.1f}%")
+        for name in sorted(self.counters):
+            lines.append(f"{name:<28}{self.counters[name]:>8}")
+        lines.append(f"{'wall':<28}{'':>8}{wall:>12.4f}")
+        return "\n".join(lines)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record("stage", self.name, time.perf_counter() - self.start)
+        return False
+
+
+def _record(kind: str, name: str, value: float):
+    profile = _profile
+    if profile is not None:
+        if kind == "stage":
+            profile.add_stage(name, value)
+        else:
+            profile.counters[name] += value
+    for hook in _hooks:
+        hook(kind, name, value)
+
+
+def _update_active():
+    global _active
+    _active = _profile is not None or bool(_hooks)
+
+
+def stage(name: str):
+    """Kontekst som tar tiden på trinnet ``name`` når instrumentering er på."""
+    if not _active:
+        return _NULL
+    return _Stage(name)
+
+
+def count(name: str, n: int = 1):
+    """Øk telleren ``name`` med ``n`` når instrumentering er på."""
+    if _active and n:
+        _record("count", name, n)
+
+
+def enabled() -> bool:
+    return _active
+
+
+def enable(profile: Profile | None = None) -> Profile:
+    """Start innsamling i ``profile`` (eller en ny) og returner den."""
+    global _profile
+    _profile = profile or Profile()
+    _update_active()
+    return _profile
+
+
+def disable() -> "Profile | None":
+    """Stopp innsamlingen og returner profilen som ble samlet."""
+    global _profile
+    profile, _profile = _profile, None
+    _update_active()
+    return profile
+
+
+def add_hook(hook: Hook):
+    _hooks.append(hook)
+    _update_active()
+
+
+def remove_hook(hook: Hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+    _update_active()
@@ -0,0 +1,87 @@
+# jobs.py
+"""
+Bakgrunnsjobber med fremdrift og avbrytelse, uten avhengighet til Tk.
+
+En ``Job`` kjører ``work(job, *args)`` i en egen tråd. Arbeidet melder
+fremdrift med ``job.progress()``, som også kaster ``Cancelled`` når
+jobben er avbrutt. Meldingene legges i en kø og hentes med ``poll()`` fra
+GUI-tråden, typisk fra en ``after()``-løkke, så Tk bare brukes fra
+hovedtråden.
+
+Meldinger er tupler ``(kind, value)``:
+
+    ("progress", (stage, fraction))   fraction er None når den er ukjent
+    ("done", result)
+    ("error", exception)
+    ("cancelled", None)
+"""
+import logging
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    """Kastes i arbeidstråden når jobben er avbrutt."""
+
+
+class Job:
+    def __init__(self, work, *args, name: str = "job", discard=None):
+        self.work = work
+        self.args = args
+        self.name = name
+        self.discard = discard  # rydder opp et resultat som kom etter avbrytelsen
+        self.messages: queue.Queue = queue.Queue()
+        self._cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "Job":
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Be jobben stoppe ved neste ``progress()``/``check()``."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, stage: str, fraction: float | None = None):
+        """Meld fremdrift fra arbeidstråden; kaster ``Cancelled`` hvis jobben er avbrutt."""
+        self.check()
+        self.messages.put(("progress", (stage, fraction)))
+
+    def reporter(self, stage: str):
+        """``progress``-callback med fast trinn, for ``parse_modules``, ``Graph.build`` o.l."""
+        return lambda fraction: self.progress(stage, fraction)
+
+    def poll(self) -> list[tuple]:
+        """Alle meldinger som har kommet siden forrige kall, uten å blokkere."""
+        out = []
+        while True:
+            try:
+                out.append(self.messages.get_nowait())
+            except queue.Empty:
+                return out
+
+    def _run(self):
+        try:
+            result = self.work(self, *self.args)
+            if self.cancelled:
+                if self.discard is not None:
+                    self.discard(result)
+                raise Cancelled()
+        except Cancelled:
+            log.info("%s cancelled", self.name)
+            self.messages.put(("cancelled", None))
+        except Exception as e:
+            log.exception("%s failed: %s", self.name, e)
+            self.messages.put(("error", e))
+        else:
+            self.messages.put(("done", result))
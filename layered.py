@@ -0,0 +1,249 @@
+# layered.py
+"""
+Lagdelt layout (Sugiyama) for kallgrafer, fra venstre mot høyre.
+
+Trinnene:
+
+1. Sykler brytes ved å snu bakoverkantene fra et dybde-først-søk.
+2. Lag tildeles med lengste vei fra kildene (Kahn i runder, vektorisert).
+3. Kanter som hopper over lag deles opp med dummynoder, så alle kanter
+   går mellom nabolag.
+4. Krysninger reduseres med barysenter-sortering i et begrenset antall
+   sveip ned og opp gjennom lagene.
+5. Koordinater: x fra laget, y mot snittet av naboene, med rekkefølgen og
+   avstanden i laget bevart.
+
+Alt utenom søket i trinn 1 er NumPy-operasjoner over kant-arrays, så en
+kjøring koster O((V + E) log V) for vanlige kallgrafer, og resultatet er
+deterministisk.
+"""
+import numpy as np
+
+DUMMY_HEIGHT = 10.0  # plass en dummynode tar i laget sitt
+MAX_SPAN = 8  # lengre kanter får ikke dummynoder og teller ikke i krysningsreduksjonen
+
+
+def break_cycles(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Maske over kantene som må snus for at grafen skal bli asyklisk.
+
+    Et iterativt dybde-først-søk gir hver node et postorder-nummer; en kant
+    ``u -> v`` er en bakoverkant nøyaktig når ``post[u] < post[v]``.
+    """
+    order = np.argsort(src, kind="stable")
+    starts = np.searchsorted(src[order], np.arange(n + 1)).tolist()
+    targets = dst[order].tolist()
+    post = [-1] * n
+    seen = [False] * n
+    counter = 0
+    for root in range(n):
+        if seen[root]:
+            continue
+        seen[root] = True
+        stack = [(root, starts[root])]
+        while stack:
+            node, i = stack[-1]
+            if i < starts[node + 1]:
+                stack[-1] = (node, i + 1)
+                child = targets[i]
+                if not seen[child]:
+                    seen[child] = True
+                    stack.append((child, starts[child]))
+            else:
+                stack.pop()
+                post[node] = counter
+                counter += 1
+    post = np.array(post, dtype=np.int64)
+    return post[src] < post[dst]
+
+
+def longest_path_layers(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Lag per node: lengste vei fra en kilde i en asyklisk graf."""
+    order = np.argsort(src, kind="stable")
+    starts = np.searchsorted(src[order], np.arange(n + 1))
+    targets = dst[order]
+    indegree = np.bincount(dst, minlength=n)
+    layer = np.zeros(n, dtype=np.int64)
+    frontier = np.flatnonzero(indegree == 0)
+    depth = 0
+    while len(frontier):
+        layer[frontier] = depth
+        counts = starts[frontier + 1] - starts[frontier]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        out = targets[np.repeat(starts[frontier], counts) + offsets]
+        indegree -= np.bincount(out, minlength=n)
+        frontier = np.unique(out[indegree[out] == 0])
+        depth += 1
+    return layer
+
+
+def pull_toward_callees(src: np.ndarray, dst: np.ndarray, layer: np.ndarray) -> np.ndarray:
+    """Flytt noder med flere utkanter enn innkanter så nær kalleene som mulig.
+
+    Lengste vei legger alle kilder i lag 0, også en kilde som bare kaller
+    noe dypt nede. Lagene gås bakfra, så kalleene alltid har fått sitt
+    endelige lag; det gir kortere kanter og færre dummynoder.
+    """
+    n = len(layer)
+    layer = layer.copy()
+    gain = np.bincount(src, minlength=n) - np.bincount(dst, minlength=n)
+    order = np.argsort(layer[src], kind="stable")[::-1]
+    src, dst = src[order], dst[order]
+    cut = np.searchsorted(-layer[src], -np.arange(int(layer.max()) + 1), side="left")
+    for l in range(int(layer.max()), -1, -1):
+        lo = cut[l]
+        hi = cut[l - 1] if l > 0 else len(src)
+        if lo == hi:
+            continue
+        nodes, local = np.unique(src[lo:hi], return_inverse=True)
+        limit = np.full(len(nodes), np.iinfo(np.int64).max)
+        np.minimum.at(limit, local, layer[dst[lo:hi]] - 1)
+        move = gain[nodes] > 0
+        layer[nodes[move]] = np.maximum(layer[nodes[move]], limit[move])
+    return layer
+
+
+def _split_long_edges(n: int, src: np.ndarray, dst: np.ndarray, layer: np.ndarray):
+    """Sett inn dummynoder, så hver kant går fra lag ``l`` til ``l + 1``.
+
+    Kanter som spenner over mer enn ``MAX_SPAN`` lag tas ut, så antall
+    dummynoder holder seg lineært i antall kanter.
+    """
+    span = layer[dst] - layer[src]
+    keep = span <= MAX_SPAN
+    src, dst, span = src[keep], dst[keep], span[keep]
+    long = span > 1
+    s_long, d_long = src[long], dst[long]
+    ndummy = span[long] - 1
+    total = int(ndummy.sum())
+    dummies = n + np.arange(total)
+    owner = np.repeat(np.arange(len(s_long)), ndummy)
+    first = np.cumsum(ndummy) - ndummy
+    k = np.arange(total) - first[owner]
+    prev = np.where(k == 0, s_long[owner], dummies - 1)
+    last = dummies[first + ndummy - 1] if total else dummies
+    new_src = np.concatenate([src[~long], prev, last])
+    new_dst = np.concatenate([dst[~long], dummies, d_long])
+    layers = np.concatenate([layer, layer[s_long][owner] + k + 1])
+    return new_src, new_dst, layers
+
+
+def _sweep(rank: np.ndarray, members: list, edges: list, ends: np.ndarray, others: np.ndarray,
+           reverse: bool):
+    """Én barysenter-sweep; ``edges[l]`` er kantene med ``ends`` i lag ``l``."""
+    layers = range(len(members) - 1, -1, -1) if reverse else range(len(members))
+    for l in layers:
+        nodes = members[l]
+        if len(nodes) < 2 or edges[l] is None:
+            continue
+        local, other = rank[ends[edges[l]]], others[edges[l]]
+        total = np.bincount(local, weights=rank[other], minlength=len(nodes))
+        degree = np.bincount(local, minlength=len(nodes))
+        # Noder uten naboer beholder plassen sin
+        bary = np.where(degree > 0, total / np.maximum(degree, 1), rank[nodes])
+        order = np.lexsort((rank[nodes], bary))
+        members[l] = nodes = nodes[order]
+        rank[nodes] = np.arange(len(nodes))
+
+
+def _place(center: np.ndarray, heights: np.ndarray, rank: np.ndarray, members: list, edges: list,
+           ends: np.ndarray, others: np.ndarray, gap: float, reverse: bool):
+    """Flytt hvert lag mot snittet av naboene, uten å bryte rekkefølge og avstand."""
+    layers = range(len(members) - 1, -1, -1) if reverse else range(len(members))
+    for l in layers:
+        nodes = members[l]
+        if edges[l] is None:
+            continue
+        local, other = rank[ends[edges[l]]], others[edges[l]]
+        total = np.bincount(local, weights=center[other], minlength=len(nodes))
+        degree = np.bincount(local, minlength=len(nodes))
+        desired = np.where(degree > 0, total / np.maximum(degree, 1), center[nodes])
+        h = heights[nodes]
+        # c[i] >= c[i-1] + (h[i-1] + h[i]) / 2 + gap, løst som kumulativt maksimum
+        sep = np.concatenate([[0.0], (h[:-1] + h[1:]) / 2 + gap]).cumsum()
+        placed = sep + np.maximum.accumulate(desired - sep)
+        center[nodes] = placed + (desired - placed).mean()
+
+
+def layered_layout(
+    src: np.ndarray,
+    dst: np.ndarray,
+    sizes: np.ndarray,
+    layer_gap: float = 120.0,
+    node_gap: float = 30.0,
+    sweeps: int = 4,
+    progress=None,
+) -> np.ndarray:
+    """Returner posisjoner (n × 2, øvre venstre hjørne) for en lagdelt layout.
+
+    Kallere havner til venstre for funksjonene de kaller. ``sweeps`` er
+    antall par av ned- og opp-sveip i krysningsreduksjonen.
+    ``progress(fraction)`` kalles mellom trinnene og kan avbryte ved å
+    kaste et unntak.
+    """
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    n = len(sizes)
+    if n == 0:
+        return np.zeros((0, 2))
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    def report(fraction):
+        if progress is not None:
+            progress(fraction)
+
+    report(0.0)
+    flip = break_cycles(n, src, dst)
+    src, dst = np.where(flip, dst, src), np.where(flip, src, dst)
+    # Flere kall mellom de samme nodene teller som én kant
+    if len(src):
+        pairs = np.unique(np.stack([src, dst], axis=1), axis=0)
+        src, dst = pairs[:, 0], pairs[:, 1]
+    layer = pull_toward_callees(src, dst, longest_path_layers(n, src, dst))
+    report(0.2)
+
+    src, dst, layers = _split_long_edges(n, src, dst, layer)
+    total = len(layers)
+    heights = np.concatenate([sizes[:, 1], np.full(total - n, DUMMY_HEIGHT)])
+    depth = int(layers.max()) + 1
+    by_layer = np.argsort(layers, kind="stable")
+    bounds = np.searchsorted(layers[by_layer], np.arange(depth + 1))
+    members = [by_layer[bounds[l]:bounds[l + 1]] for l in range(depth)]
+    rank = np.zeros(total, dtype=np.int64)  # plassen i laget
+    for nodes in members:
+        rank[nodes] = np.arange(len(nodes))
+
+    # Kant-indekser gruppert på laget til målet (ned-sveip) og kilden (opp-sveip)
+    down, up = [None] * depth, [None] * depth
+    for edges, ends in ((down, dst), (up, src)):
+        order = np.argsort(layers[ends], kind="stable")
+        cut = np.searchsorted(layers[ends][order], np.arange(depth + 1))
+        for l in range(depth):
+            if cut[l + 1] > cut[l]:
+                edges[l] = order[cut[l]:cut[l + 1]]
+
+    for i in range(sweeps):
+        _sweep(rank, members, down, dst, src, reverse=False)
+        _sweep(rank, members, up, src, dst, reverse=True)
+        report(0.2 + 0.6 * (i + 1) / max(sweeps, 1))
+
+    # y: start stablet, trekk så hvert lag mot naboene et par ganger
+    center = np.zeros(total)
+    for nodes in members:
+        h = heights[nodes]
+        center[nodes] = np.concatenate([[0.0], (h[:-1] + h[1:]) / 2 + node_gap]).cumsum()
+    for _ in range(2):
+        _place(center, heights, rank, members, down, dst, src, node_gap, reverse=False)
+        _place(center, heights, rank, members, up, src, dst, node_gap, reverse=True)
+    report(0.9)
+
+    widths = np.zeros(depth)
+    np.maximum.at(widths, layer, sizes[:, 0])
+    layer_x = np.concatenate([[0.0], (widths + layer_gap).cumsum()[:-1]])
+    pos = np.empty((n, 2))
+    pos[:, 0] = layer_x[layer]
+    pos[:, 1] = center[:n] - sizes[:, 1] / 2
+    pos -= pos.min(axis=0)
+    report(1.0)
+    return pos
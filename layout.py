@@ -0,0 +1,555 @@
+# layout.py
+"""
+Kraftbasert layout (Fruchterman-Reingold) med Barnes-Hut-approksimasjon.
+
+Posisjoner holdes i NumPy-arrays. Frastøtning regnes mot et quadtree som
+bygges fra Morton-koder hver iterasjon, og traverseres nivå for nivå for
+alle noder samtidig, slik at arbeidet blir O(n log n) og vektorisert.
+Tiltrekning regnes i én batch over en kant-indeks-array.
+
+``multilevel_layout`` grovkorner grafen gjentatte ganger ved å slå sammen
+noder langs kantene, legger ut det minste nivået og forfiner oppover med
+bare noen få iterasjoner per nivå.
+"""
+import logging
+import math
+
+import numpy as np
+
+import instrument
+
+log = logging.getLogger(__name__)
+
+MAX_DEPTH = 16  # Morton-koder på 2 * 16 bit
+OVERLAP_RELAX = 1.5  # overkorrigering, så kjeder av overlapp ikke låser seg
+PASSES_PER_DOUBLING = 10  # overlapp-pass per dobling av antall noder
+STALL_PASSES = 10  # så mange pass mellom hver sjekk av om overlappene faller
+STALL_DROP = 0.05  # minste andel færre overlapp per STALL_PASSES pass
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Spre de 16 laveste bitene slik at det blir en null mellom hver bit."""
+    v = v.astype(np.uint64) & np.uint64(0xFFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+
+class QuadTree:
+    """Lineært quadtree bygget fra Morton-sorterte punkter.
+
+    Hvert nivå lagres som sorterte cellenøkler med masse (antall punkter),
+    massesenter og indeksområdet til barna på nivået under.
+    """
+
+    def __init__(self, pos: np.ndarray, max_depth: int = MAX_DEPTH):
+        n = len(pos)
+        lo = pos.min(axis=0)
+        side = float(max(np.ptp(pos[:, 0]), np.ptp(pos[:, 1]), 1e-9)) * (1 + 1e-9)
+        scale = (1 << max_depth) / side
+        q = np.minimum(((pos - lo) * scale).astype(np.int64), (1 << max_depth) - 1)
+        self.codes = (_spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << np.uint64(1))).astype(np.int64)
+        self.side = side
+
+        order = np.argsort(self.codes, kind="stable")
+        codes = self.codes[order]
+        xs = pos[order, 0]
+        ys = pos[order, 1]
+
+        self.keys: list[np.ndarray] = []
+        self.mass: list[np.ndarray] = []
+        self.com: list[np.ndarray] = []
+        self.sums: list[np.ndarray] = []
+        self.shifts: list[int] = []
+        for level in range(max_depth + 1):
+            shift = 2 * (max_depth - level)
+            k = codes >> shift
+            starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+            counts = np.diff(np.r_[starts, n])
+            sums = np.column_stack((np.add.reduceat(xs, starts), np.add.reduceat(ys, starts)))
+            self.keys.append(k[starts])
+            self.mass.append(counts)
+            self.sums.append(sums)
+            self.com.append(sums / counts[:, None])
+            self.shifts.append(shift)
+            if counts.max() == 1:
+                break
+
+        self.depth = len(self.keys)
+        self.child_start: list[np.ndarray] = []
+        self.child_end: list[np.ndarray] = []
+        for level in range(self.depth - 1):
+            parents = self.keys[level + 1] >> 2
+            self.child_start.append(np.searchsorted(parents, self.keys[level], "left"))
+            self.child_end.append(np.searchsorted(parents, self.keys[level], "right"))
+
+    def repulsion(self, pos: np.ndarray, k2: float, theta: float) -> np.ndarray:
+        """Frastøtning k²/d for alle punkter, med Barnes-Hut-kriteriet size/d < theta."""
+        n = len(pos)
+        disp = np.zeros((n, 2))
+        bodies = np.arange(n)
+        cells = np.zeros(n, dtype=np.int64)
+        theta2 = theta * theta
+
+        for level in range(self.depth):
+            if len(bodies) == 0:
+                break
+            last = level == self.depth - 1
+            mass = self.mass[level][cells].astype(float)
+            com = self.com[level][cells]
+            contains = (self.codes[bodies] >> self.shifts[level]) == self.keys[level][cells]
+
+            leaf = (mass == 1) | last
+            # En celle som inneholder punktet selv regnes uten punktet.
+            own = leaf & contains
+            if own.any():
+                rest = mass[own] - 1
+                safe = np.maximum(rest, 1)
+                com[own] = (self.sums[level][cells[own]] - pos[bodies[own]]) / safe[:, None]
+                mass[own] = rest
+
+            delta = pos[bodies] - com
+            d2 = np.maximum((delta * delta).sum(axis=1), 0.01)
+            size = self.side / (1 << level)
+            accept = leaf | (~contains & (size * size < theta2 * d2))
+
+            hit = bodies[accept]
+            f = mass[accept] * k2 / d2[accept]
+            disp[:, 0] += np.bincount(hit, weights=delta[accept, 0] * f, minlength=n)
+            disp[:, 1] += np.bincount(hit, weights=delta[accept, 1] * f, minlength=n)
+
+            if last:
+                break
+            open_ = ~accept
+            bodies = bodies[open_]
+            parent = cells[open_]
+            start = self.child_start[level][parent]
+            nchild = self.child_end[level][parent] - start
+            offsets = np.arange(nchild.sum()) - np.repeat(np.cumsum(nchild) - nchild, nchild)
+            bodies = np.repeat(bodies, nchild)
+            cells = np.repeat(start, nchild) + offsets
+
+        return disp
+
+
+def force_directed_layout(
+    pos: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    width: float = 4000,
+    height: float = 4000,
+    max_iterations: int = 300,
+    theta: float = 1.0,
+    cooling: float = 0.9,
+    tolerance: float = 0.5,
+    seed: int = 0,
+    progress=None,
+    temperature: float | None = None,
+) -> np.ndarray:
+    """Returner nye posisjoner (n × 2) etter Fruchterman-Reingold med Barnes-Hut.
+
+    ``src``/``dst`` er indeks-arrays for kantene. Temperaturen (maks
+    forflytning per iterasjon) starter på en tidel av bredden, eller på
+    ``temperature``, og kjøles ned geometrisk; layouten stopper når største
+    forflytning er under ``tolerance`` piksler. ``progress(fraction)``
+    kalles før hver iterasjon og kan avbryte layouten ved å kaste et unntak.
+    """
+    pos = np.array(pos, dtype=float).reshape(-1, 2)
+    n = len(pos)
+    if n < 2:
+        return pos
+
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    k = math.sqrt((width * height) / n)  # Optimal avstand mellom noder
+    k2 = k * k
+    # Litt støy slik at sammenfallende noder kan skyves fra hverandre.
+    pos += np.random.default_rng(seed).uniform(-0.5, 0.5, pos.shape)
+    if temperature is None:
+        temperature = width / 10
+
+    for it in range(max_iterations):
+        if progress is not None:
+            progress(it / max_iterations)
+        disp = QuadTree(pos).repulsion(pos, k2, theta)
+
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt((delta * delta).sum(axis=1))
+            pull = delta * (dist / k)[:, None]  # (d / |d|) * d² / k
+            disp[:, 0] -= np.bincount(src, weights=pull[:, 0], minlength=n)
+            disp[:, 1] -= np.bincount(src, weights=pull[:, 1], minlength=n)
+            disp[:, 0] += np.bincount(dst, weights=pull[:, 0], minlength=n)
+            disp[:, 1] += np.bincount(dst, weights=pull[:, 1], minlength=n)
+
+        length = np.maximum(np.sqrt((disp * disp).sum(axis=1)), 1e-9)
+        step = np.minimum(length, temperature)
+        moved = disp * (step / length)[:, None]
+        pos += moved
+        np.clip(pos[:, 0], 0, width, out=pos[:, 0])
+        np.clip(pos[:, 1], 0, height, out=pos[:, 1])
+
+        temperature *= cooling
+        if step.max() < tolerance:
+            break
+
+    return pos
+
+
+def coarsen(n: int, src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, int]:
+    """Slå sammen noder langs kantene; returner (grov node per node, antall grove).
+
+    Hver node peker på naboen med høyest (symmetrisk, pseudotilfeldig)
+    kantvekt, og par som peker på hverandre slås sammen. Det gjentas noen
+    runder blant de som er igjen. Umatchede noder med én nabo (blader i
+    stjerner, som matching alene ikke krymper) legges til naboen sin.
+    """
+    keep = src != dst
+    a = np.concatenate([src[keep], dst[keep]])
+    b = np.concatenate([dst[keep], src[keep]])
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    weight = (lo * 0x9E3779B1) ^ (hi * 0x85EBCA6B)  # samme vekt i begge retninger
+    match = np.full(n, -1, dtype=np.int64)
+    for _ in range(3):
+        free = (match[a] < 0) & (match[b] < 0)
+        fa, fb, fw = a[free], b[free], weight[free]
+        if not len(fa):
+            break
+        order = np.lexsort((fw, fa))  # per node, tyngste kant sist
+        fa, fb = fa[order], fb[order]
+        last = np.append(fa[1:] != fa[:-1], True)
+        best = np.full(n, -1, dtype=np.int64)
+        best[fa[last]] = fb[last]
+        proposing = np.flatnonzero(best >= 0)
+        mutual = proposing[best[best[proposing]] == proposing]
+        match[mutual] = best[mutual]
+
+    nodes = np.arange(n)
+    rep = np.where(match >= 0, np.minimum(nodes, match), nodes)
+    degree = np.bincount(a, minlength=n)
+    leaves = np.flatnonzero((match < 0) & (degree == 1))
+    if len(leaves):
+        neighbour = np.full(n, -1, dtype=np.int64)
+        neighbour[a] = b
+        rep[leaves] = rep[neighbour[leaves]]
+    groups, parent = np.unique(rep, return_inverse=True)
+    return parent, len(groups)
+
+
+def multilevel_layout(
+    pos: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    width: float = 4000,
+    height: float = 4000,
+    min_nodes: int = 50,
+    refine_iterations: int = 10,
+    warm_start: bool = False,
+    seed: int = 0,
+    progress=None,
+) -> np.ndarray:
+    """Flernivå-layout: grovkorn til ``min_nodes`` noder, legg ut, forfin oppover.
+
+    Det groveste nivået får en full ``force_directed_layout``; hvert finere
+    nivå starter fra foreldrenes posisjoner med temperatur lik den optimale
+    kantlengden på nivået, og kjøres i høyst ``refine_iterations``
+    iterasjoner. Med ``warm_start`` brukes ``pos`` som de er (f.eks. en
+    tidligere layout): også det groveste nivået bare forfines, og hvert
+    nivå arver forflytningen til forelderen i stedet for posisjonen, så
+    den gamle layouten beholdes der den ikke må endres.
+    """
+    pos = np.array(pos, dtype=float).reshape(-1, 2)
+    n = len(pos)
+    if n < 2:
+        return pos
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+
+    # Grovkorning: kanter og posisjoner (snitt av medlemmene) per nivå
+    parents, edges, positions = [], [(src, dst)], [pos]
+    size = n
+    while size > min_nodes:
+        parent, coarse = coarsen(size, *edges[-1])
+        if coarse > 0.9 * size:
+            break  # matchingen krymper ikke grafen lenger
+        s, d = parent[edges[-1][0]], parent[edges[-1][1]]
+        keep = s != d
+        pairs = np.unique(np.stack([s[keep], d[keep]], axis=1), axis=0) if keep.any() else np.zeros((0, 2), np.int64)
+        count = np.bincount(parent, minlength=coarse)[:, None]
+        merged = np.stack([np.bincount(parent, weights=positions[-1][:, k], minlength=coarse) for k in (0, 1)], axis=1)
+        parents.append(parent)
+        edges.append((pairs[:, 0], pairs[:, 1]))
+        positions.append(merged / count)
+        size = coarse
+
+    levels = len(edges)
+    # Arbeidet per nivå er omtrent proporsjonalt med nodene ganger iterasjonene
+    cost = [len(p) * (refine_iterations if i < levels - 1 or warm_start else 300) for i, p in enumerate(positions)]
+    done = 0.0
+
+    def step(i):
+        if progress is None:
+            return None
+        start, share = done / sum(cost), cost[i] / sum(cost)
+        return lambda f: progress(start + share * f)
+
+    area = width * height
+    reach = 0.25 if warm_start else 1.0  # varm start: kortere skritt, layouten skal bare justeres
+    for i in range(levels - 1, -1, -1):
+        if i == levels - 1:
+            current = positions[i]
+        elif warm_start:
+            current = positions[i] + (current - positions[i + 1])[parents[i]]
+        else:
+            current = current[parents[i]]  # barna starter der forelderen ligger
+        if i == levels - 1 and not warm_start:
+            current = force_directed_layout(current, *edges[i], width=width, height=height,
+                                            seed=seed, progress=step(i))
+        else:
+            current = force_directed_layout(current, *edges[i], width=width, height=height,
+                                            max_iterations=refine_iterations, seed=seed, progress=step(i),
+                                            temperature=reach * math.sqrt(area / len(current)))
+        done += cost[i]
+    return current
+
+
+def _grid_pairs(centers: np.ndarray, cell: float) -> tuple[np.ndarray, np.ndarray]:
+    """Kandidatpar (i < j) fra et uniformt rutenett: bare samme og nabo-celler sjekkes."""
+    n = len(centers)
+    ij = np.floor(centers / cell).astype(np.int64)
+    ij -= ij.min(axis=0)
+    stride = int(ij[:, 1].max()) + 3  # plass til nabo-offset uten kollisjon
+    keys = (ij[:, 0] + 1) * stride + (ij[:, 1] + 1)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    firsts, seconds = [], []
+    for ox, oy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        target = keys + ox * stride + oy
+        lo = np.searchsorted(sorted_keys, target, "left")
+        hi = np.searchsorted(sorted_keys, target, "right")
+        count = hi - lo
+        offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        a = np.repeat(np.arange(n), count)
+        b = order[np.repeat(lo, count) + offsets]
+        if ox == 0 and oy == 0:
+            keep = a < b  # samme celle: hvert par én gang
+            a, b = a[keep], b[keep]
+        firsts.append(a)
+        seconds.append(b)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def resolve_overlaps(
+    pos: np.ndarray,
+    sizes: np.ndarray,
+    padding: float = 10.0,
+    max_passes: int | None = None,
+    max_density: float = 0.3,
+    progress=None,
+    fixed: np.ndarray | None = None,
+) -> np.ndarray:
+    """Skyv overlappende bokser fra hverandre med minste forflytning.
+
+    ``pos`` er øvre venstre hjørne og ``sizes`` (bredde, høyde) per node.
+    Overlapp finnes via et rutenett med cellestørrelse lik største boks, så
+    hvert pass er lineært i antall noder. Hvert overlappende par skyves
+    langs aksen med minst overlapp, likt fordelt på begge. Er boksene for
+    tettpakket til å få plass, strekkes layouten først ut til ``max_density``,
+    og striper som fortsatt er tettere enn det strekkes ut for seg, se
+    ``_spread_stripes``.
+
+    Passene gjentas til ingen par overlapper, men høyst ``max_passes``
+    ganger (som standard ``PASSES_PER_DOUBLING`` per dobling av n), og
+    bare så lenge antall overlappende par faller: tette klumper går i lås,
+    og skyvene flytter dem da knapt. Overlapp som er igjen løses med
+    ``_place_remaining``, så resultatet aldri har overlapp.
+
+    Noder der maska ``fixed`` er sann flyttes ikke; den andre i paret tar
+    da hele forflytningen, og layouten strekkes ikke.
+    """
+    pos = np.array(pos, dtype=float).reshape(-1, 2)
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2) + padding
+    n = len(pos)
+    if n < 2:
+        return pos
+    if max_passes is None:
+        max_passes = PASSES_PER_DOUBLING * math.ceil(math.log2(n))
+    cell = float(sizes.max())
+    half = sizes / 2
+
+    lo = pos.min(axis=0)
+    span = np.maximum(np.ptp(pos, axis=0), cell)
+    density = float(np.prod(sizes, axis=1).sum() / np.prod(span))
+    if fixed is not None and not np.any(fixed):
+        fixed = None
+    if density > max_density and fixed is None:
+        pos = lo + (pos - lo) * np.sqrt(density / max_density)
+        _spread_stripes(pos, sizes, max_density)
+
+    checkpoint = math.inf
+    for i in range(max_passes + 1):
+        if progress is not None:
+            progress(min(i / max_passes, 1.0))
+        centers = pos + half
+        a, b = _grid_pairs(centers, cell)
+        delta = centers[b] - centers[a]
+        overlap = half[a] + half[b] - np.abs(delta)
+        hit = (overlap > 0).all(axis=1)
+        if not hit.any():
+            break
+        a, b, delta, overlap = a[hit], b[hit], delta[hit], overlap[hit]
+        if i % STALL_PASSES == 0:
+            # Faller ikke antallet merkbart over STALL_PASSES pass, har skyvene gått i lås
+            stalled = len(a) > (1 - STALL_DROP) * checkpoint
+            checkpoint = len(a)
+        if i == max_passes or stalled:
+            if stalled:
+                log.debug("Overlap removal stalled after %d passes with %d overlapping pairs", i, len(a))
+            else:
+                log.warning("Overlap removal stopped after %d passes with %d overlapping pairs", i, len(a))
+            _place_remaining(pos, sizes, a, b, fixed)
+            break
+
+        # Minste forflytning: skyv langs aksen med minst overlapp.
+        axis = (overlap[:, 1] < overlap[:, 0]).astype(np.int64)
+        rows = np.arange(len(a))
+        sign = np.sign(delta[rows, axis])
+        sign[sign == 0] = 1.0  # sammenfallende sentre: b skyves i positiv retning
+        push = np.zeros((len(a), 2))
+        push[rows, axis] = sign * overlap[rows, axis] * (OVERLAP_RELAX / 2)
+        share_a = share_b = 1.0
+        if fixed is not None:
+            fa, fb = fixed[a], fixed[b]
+            share_a = np.where(fa, 0.0, np.where(fb, 2.0, 1.0))[:, None]
+            share_b = np.where(fb, 0.0, np.where(fa, 2.0, 1.0))[:, None]
+
+        for dim in (0, 1):
+            pos[:, dim] -= np.bincount(a, weights=(push * share_a)[:, dim], minlength=n)
+            pos[:, dim] += np.bincount(b, weights=(push * share_b)[:, dim], minlength=n)
+
+    instrument.count("layout.overlap_passes", i)
+    return pos
+
+
+def _spread_stripes(pos: np.ndarray, sizes: np.ndarray, max_density: float):
+    """Strekk striper tettere enn ``max_density``, langs x og y for seg.
+
+    En force-layout har en tett kjerne og glisne kanter, så å strekke hele
+    layouten likt løser ikke kjernen. Hver akse deles i striper på bredden
+    av største boks; en stripe der boksene dekker k ganger ``max_density``
+    av stripen (over hele layoutens bredde eller høyde) blir k ganger
+    bredere. Nodene flyttes stykkevis lineært med stripene sine, så
+    rekkefølgen langs aksen beholdes. Endrer ``pos`` på stedet.
+    """
+    area = np.prod(sizes, axis=1)
+    span = np.maximum(np.ptp(pos, axis=0), sizes.max(axis=0))  # før noen akse er strukket
+    for dim in (0, 1):
+        width = float(sizes[:, dim].max())
+        lo = pos[:, dim].min()
+        length = float(span[1 - dim])
+        stripe = ((pos[:, dim] - lo) // width).astype(np.int64)
+        density = np.bincount(stripe, weights=area) / (width * length)
+        stretch = np.maximum(1.0, density / max_density)
+        edges = lo + width * np.arange(len(stretch) + 1)
+        spread = lo + np.concatenate([[0.0], np.cumsum(width * stretch)])
+        pos[:, dim] = np.interp(pos[:, dim], edges, spread)
+
+
+def _ring(r: int) -> np.ndarray:
+    """Celle-offset (dx, dy) med avstand ``r`` i maks-norm; ringen rundt (0, 0)."""
+    if r == 0:
+        return np.zeros((1, 2), dtype=np.int64)
+    side = np.arange(-r, r + 1)
+    edge = np.full(len(side), r)
+    return np.concatenate([
+        np.stack([side, -edge], axis=1), np.stack([side, edge], axis=1),
+        np.stack([-edge[1:-1], side[1:-1]], axis=1), np.stack([edge[1:-1], side[1:-1]], axis=1),
+    ])
+
+
+def _place_remaining(pos: np.ndarray, sizes: np.ndarray, a: np.ndarray, b: np.ndarray, fixed=None):
+    """Flytt én node i hvert overlappende par (``a``, ``b``) til nærmeste ledige celle.
+
+    Noden med flest overlapp i paret flyttes (aldri en fastlåst; er begge
+    låst, får paret stå), så resten overlapper ikke hverandre. De flyttede
+    plasseres i et rutenett med celler på størrelse med største boks: en
+    celle er ledig når ingen annen boks dekker den, så noder i hver sin
+    ledige celle overlapper ingenting. Nodene grupperes etter cellen de
+    ligger i. Hver runde får hver gruppe de nærmeste ledige cellene i
+    ringen sin, én celle per node, og nærmeste gruppe vinner hver celle;
+    grupper uten ledig celle går én ring ut. Endrer ``pos`` på stedet.
+    """
+    n = len(pos)
+    hits = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    move_a = hits[a] > hits[b]
+    if fixed is not None:
+        move_a = np.where(fixed[b], True, np.where(fixed[a], False, move_a))
+        keep = ~(fixed[a] & fixed[b])
+        a, b, move_a = a[keep], b[keep], move_a[keep]
+    movers = np.zeros(n, dtype=bool)
+    movers[np.where(move_a, a, b)] = True
+
+    cell = sizes.max(axis=0)
+    stride = np.int64(1) << 32
+
+    def key(ij):
+        return ij[:, 0] * stride + (ij[:, 1] + (stride >> 1))
+
+    # Celler dekket av nodene som står: hver boks dekker høyst 2 × 2 celler
+    still = np.flatnonzero(~movers)
+    first = np.floor(pos[still] / cell).astype(np.int64)
+    last = np.ceil((pos[still] + sizes[still]) / cell).astype(np.int64) - 1
+    taken = np.unique(np.concatenate([
+        key(np.minimum(first + (dx, dy), last)) for dx in (0, 1) for dy in (0, 1)
+    ]))
+
+    # Grupper de flyttede etter cellen sentrum ligger i
+    moved = np.flatnonzero(movers)
+    cells = np.floor((pos[moved] + sizes[moved] / 2) / cell).astype(np.int64)
+    home, group = np.unique(cells, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    queue = moved[np.argsort(group, kind="stable")]  # de flyttede, gruppe for gruppe
+    start = np.concatenate([[0], np.cumsum(np.bincount(group))])
+    placed = np.zeros(len(home), dtype=np.int64)
+    ring = np.zeros(len(home), dtype=np.int64)
+    while True:
+        left = np.flatnonzero(placed < start[1:] - start[:-1])
+        if not len(left):
+            break
+        who, spots = [], []
+        for r in np.unique(ring[left]).tolist():
+            groups = left[ring[left] == r]
+            offsets = _ring(r)
+            who.append(np.repeat(groups, len(offsets)))
+            spots.append((home[groups][:, None, :] + offsets[None, :, :]).reshape(-1, 2))
+        who, spots = np.concatenate(who), np.concatenate(spots)
+        keys = key(spots)
+        at = np.minimum(np.searchsorted(taken, keys), len(taken) - 1)
+        free = taken[at] != keys
+        # Grupper uten ledig celle i ringen sin går én ring ut
+        ring[left[~np.isin(left, who[free])]] += 1
+        who, spots, keys = who[free], spots[free], keys[free]
+        dist = (((spots - home[who]) * cell) ** 2).sum(axis=1)
+        # Nærmeste gruppe vinner hver celle ...
+        order = np.lexsort((who, dist))
+        who, spots, keys, dist = who[order], spots[order], keys[order], dist[order]
+        _, won = np.unique(keys, return_index=True)
+        who, spots, keys, dist = who[won], spots[won], keys[won], dist[won]
+        # ... og hver gruppe tar sine nærmeste celler, så mange som den har noder igjen
+        order = np.lexsort((dist, who))
+        who, spots, keys = who[order], spots[order], keys[order]
+        rank = np.arange(len(who)) - np.searchsorted(who, who)
+        room = rank < start[who + 1] - start[who] - placed[who]
+        who, spots, keys, rank = who[room], spots[room], keys[room], rank[room]
+        nodes = queue[start[who] + placed[who] + rank]
+        pos[nodes] = spots * cell + (cell - sizes[nodes]) / 2
+        placed += np.bincount(who, minlength=len(home))
+        taken = np.union1d(taken, keys)
+    instrument.count("layout.overlap_placed", len(moved))
+    log.debug("Placed %d of %d nodes in free cells", len(moved), n)
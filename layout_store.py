@@ -0,0 +1,85 @@
+# layout_store.py
+"""
+Lagrede nodeposisjoner per prosjekt, i en SQLite-fil ved siden av
+parse-cachen.
+
+Posisjonene nøkles på prosjektets absolutte sti og nodens kvalifiserte
+navn (``modul:navn``), så de overlever omstart og at filer flyttes rundt i
+prosjektet uten å endre modulnavn. Noder brukeren har dratt er
+``pinned`` og flyttes ikke av senere layout.
+"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+Positions = dict[str, tuple[float, float, bool]]  # navn -> (x, y, pinned)
+
+
+def default_store_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "py_viz" / "layout_store.sqlite"
+
+
+def project_key(path: Path) -> str:
+    return str(Path(path).resolve())
+
+
+class LayoutStore:
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path else default_store_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Lastes i bakgrunnsjobben og oppdateres fra GUI-tråden når noder dras,
+        # og det kan overlappe; låsen holder én bruker av koblingen om gangen.
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS positions (
+                project TEXT, name TEXT, x REAL, y REAL, pinned INTEGER,
+                PRIMARY KEY (project, name)
+            )
+            """
+        )
+        self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, project: Path) -> Positions:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT name, x, y, pinned FROM positions WHERE project = ?", (project_key(project),)
+            ).fetchall()
+        return {name: (x, y, bool(pinned)) for name, x, y, pinned in rows}
+
+    def save(self, project: Path, graph) -> None:
+        """Erstatt de lagrede posisjonene for prosjektet med nodene i ``graph``."""
+        key = project_key(project)
+        rows = [(key, name, float(node.x), float(node.y), int(getattr(node, "pinned", False)))
+                for name, node in graph.nodes.items()]
+        with self.lock:
+            self.db.execute("DELETE FROM positions WHERE project = ?", (key,))
+            self.db.executemany("INSERT INTO positions VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+
+    def pin(self, project: Path, node) -> None:
+        """Lagre posisjonen til en node brukeren har flyttet."""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, 1)",
+                (project_key(project), node.info.name, float(node.x), float(node.y)),
+            )
+            self.db.commit()
+
+    def forget(self, project: Path) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM positions WHERE project = ?", (project_key(project),))
+            self.db.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,173 @@
+# parse_cache.py
+"""
+Persistent cache for parse-resultater, lagret i en SQLite-fil.
+
+Oppføringer nøkles på absolutt filsti og parse-opsjoner. Mtime og
+størrelse brukes som rask forhåndssjekk; stemmer de ikke, sammenlignes en
+hash av innholdet før filen parses på nytt. Stempelet (mtime, størrelse og
+hash) tas med ``stamp()`` før filen parses og lagres sammen med
+resultatet, så en fil som endres under parsingen ikke får det gamle
+resultatet med det nye stempelet. Cachen har en øvre grense i
+bytes med LRU-utkastelse, og tømmes når ``PARSER_VERSION`` endres.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from parser import PARSER_VERSION, EdgeInfo, GroupInfo, NodeInfo
+
+Result = tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]
+Stamp = tuple[int, int, str]  # (mtime_ns, størrelse, hash)
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "py_viz" / "parse_cache.sqlite"
+
+
+def encode_result(result: Result) -> bytes:
+    nodes, edges, groups = result
+    return json.dumps(
+        {
+            "nodes": [asdict(n) for n in nodes],
+            "edges": [asdict(e) for e in edges],
+            "groups": [asdict(g) for g in groups],
+        },
+        separators=(",", ":"),
+    ).encode("utf8")
+
+
+def decode_result(data: bytes) -> Result:
+    raw = json.loads(data)
+    nodes = [NodeInfo(**n) for n in raw["nodes"]]
+    by_name = {n.name: n for n in nodes}
+    edges = [EdgeInfo(**e) for e in raw["edges"]]
+    groups = [
+        GroupInfo(
+            name=g["name"],
+            children=[by_name.get(c["name"]) or NodeInfo(**c) for c in g["children"]],
+            connections=[EdgeInfo(**e) for e in g["connections"]],
+        )
+        for g in raw["groups"]
+    ]
+    return nodes, edges, groups
+
+
+def _digest(py_path: Path) -> str:
+    return hashlib.blake2b(py_path.read_bytes(), digest_size=16).hexdigest()
+
+
+class ParseCache:
+    """LRU-begrenset diskcache for ``parse_file``.
+
+    Endringer samles i en transaksjon og skrives ved ``flush()`` (kalles
+    også av ``close()`` og ved utgang av ``with``-blokk).
+    """
+
+    def __init__(self, path: Path | None = None, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Cachen kan opprettes i en bakgrunnstråd og brukes videre fra GUI-tråden
+        # (se jobs.py); bruken er aldri samtidig, så trådsjekken slås av.
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT, options TEXT, mtime_ns INTEGER, size INTEGER,
+                digest TEXT, data BLOB, nbytes INTEGER, last_used REAL,
+                PRIMARY KEY (path, options)
+            );
+            """
+        )
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(PARSER_VERSION):
+            self.db.execute("DELETE FROM entries")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(PARSER_VERSION),))
+            self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, py_path: Path, options: str = "") -> Result | None:
+        """Returner cachet resultat hvis filen er uendret, ellers None."""
+        key = str(Path(py_path).resolve())
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        row = self.db.execute(
+            "SELECT mtime_ns, size, digest, data FROM entries WHERE path = ? AND options = ?",
+            (key, options),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        mtime_ns, size, digest, data = row
+        if (mtime_ns, size) != (st.st_mtime_ns, st.st_size):
+            # Bare stat-endring (f.eks. touch/checkout): sammenlign innholdet.
+            if _digest(Path(key)) != digest:
+                self.misses += 1
+                return None
+            self.db.execute(
+                "UPDATE entries SET mtime_ns = ?, size = ? WHERE path = ? AND options = ?",
+                (st.st_mtime_ns, st.st_size, key, options),
+            )
+        self.db.execute(
+            "UPDATE entries SET last_used = ? WHERE path = ? AND options = ?",
+            (time.time(), key, options),
+        )
+        self.hits += 1
+        return decode_result(data)
+
+    def stamp(self, py_path: Path) -> Stamp | None:
+        """Stempel for filen slik den er nå; ta det før filen parses. None hvis den mangler."""
+        path = Path(py_path).resolve()
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size, _digest(path)
+        except OSError:
+            return None
+
+    def put(self, py_path: Path, stamp: Stamp | None, result: Result, options: str = "") -> None:
+        """Lagre ``result`` for filen med ``stamp`` fra før parsingen.
+
+        Er filen endret etter at stempelet ble tatt, stemmer ikke hashen ved
+        neste ``get``, og filen parses på nytt.
+        """
+        if stamp is None:
+            return
+        key = str(Path(py_path).resolve())
+        mtime_ns, size, digest = stamp
+        data = encode_result(result)
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, options, mtime_ns, size, digest, data, len(data), time.time()),
+        )
+
+    def flush(self) -> None:
+        """Skriv ventende endringer og kast eldste oppføringer over grensen."""
+        total = 0
+        stale = []
+        for path, options, nbytes in self.db.execute(
+            "SELECT path, options, nbytes FROM entries ORDER BY last_used DESC"
+        ):
+            total += nbytes
+            if total > self.max_bytes:
+                stale.append((path, options))
+        self.db.executemany("DELETE FROM entries WHERE path = ? AND options = ?", stale)
+        self.db.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
@@ -4,9 +4,18 @@ Parserer en Python-fil og returnerer en liste av NodeInfo-objekter
 samt en liste av EdgeInfo-objekter (funksjonskall).
 """
 import ast
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import partial
 from pathlib import Path
-from dataclasses import dataclass, field
-from typing import List
+
+import instrument
+
+log = logging.getLogger(__name__)
+SKIP_DIRS = {"__pycache__", "venv", "site-packages", "node_modules"}
+PARSER_VERSION = 3  # Øk når parse-resultatet endres, så gamle cache-oppføringer forkastes
 
 @dataclass
 class NodeInfo:
@@ -18,6 +27,7 @@ class NodeInfo:
 class EdgeInfo:
     caller: str  # source-funksjon
     callee: str  # target-funksjon
+    count: int = 1  # antall kallsteder
 
 @dataclass
 class GroupInfo:
@@ -30,27 +40,49 @@ def parse_file(
     parse_classes: bool = True,
     parse_functions: bool = True,
     verbose: bool = False,
+    cache=None,
 ) -> tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]:
+    """Parser én fil. Med ``cache`` (en ``ParseCache``) hentes uendrede filer fra disk."""
+    if cache is not None:
+        options = _options_key(parse_classes, parse_functions)
+        result = cache.get(py_path, options)
+        if result is None:
+            stamp = cache.stamp(py_path)
+            result = parse_file(py_path, parse_classes, parse_functions, verbose)
+            cache.put(py_path, stamp, result, options)
+        return result
+
+    with instrument.stage("parse.file"):
+        return _parse_file(py_path, parse_classes, parse_functions, verbose)
+
+def _parse_file(py_path, parse_classes, parse_functions, verbose):
     try:
         source = py_path.read_text(encoding="utf8")
         tree = ast.parse(source)
-    except (FileNotFoundError, SyntaxError) as e:
-        with open("error_log.txt", "a") as log_file:
-            log_file.write(f"Error parsing file {py_path}: {e}\n")
+    except (FileNotFoundError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+        log.warning("Error parsing file %s: %s", py_path, e)
         return [], [], []
 
     funcs: dict[str, NodeInfo] = {}
-    edges: list[EdgeInfo] = []
     groups: list[GroupInfo] = []
+    classes: set[str] = set()
+    imports: dict[str, str] = {}  # lokalt navn -> punktnotert mål, relative med ledende punktum
+    calls: list[tuple[str, list[str], str | None]] = []  # (kaller, navnekjede, klassen til self)
 
     class Visitor(ast.NodeVisitor):
-        """Collect function definitions, call edges and classes."""
+        """Collect function definitions, call sites, imports and classes.
+
+        Metoder får navn som ``Klasse.metode``; nestede funksjoner beholder
+        det bare navnet sitt. Kall slås opp først når hele filen er lest,
+        så definisjoner lenger ned i filen også er kjent.
+        """
 
         def __init__(self):
             super().__init__()
-            self.func_stack: list[str] = []
+            self.func_stack: list[tuple[str, str | None]] = []  # (navn, klassen metoden tilhører)
+            self.class_stack: list[str] = []
 
-        def visit_FunctionDef(self, node: ast.FunctionDef):
+        def visit_FunctionDef(self, node):
             if not parse_functions:
                 return
             inputs = [arg.arg for arg in node.args.args]
@@ -61,32 +93,345 @@ def parse_file(
                     if isinstance(child.value, ast.Name):
                         returns.add(child.value.id)
 
-            funcs[node.name] = NodeInfo(name=node.name, inputs=inputs, outputs=list(returns))
+            owner = self.class_stack[-1] if self.class_stack and not self.func_stack else None
+            name = f"{owner}.{node.name}" if owner else node.name
+            funcs[name] = NodeInfo(name=name, inputs=inputs, outputs=list(returns))
 
-            self.func_stack.append(node.name)
+            self.func_stack.append((name, owner))
             self.generic_visit(node)
             self.func_stack.pop()
 
+        visit_AsyncFunctionDef = visit_FunctionDef
+
         def visit_Call(self, node: ast.Call):
-            if isinstance(node.func, ast.Name) and self.func_stack:
-                edges.append(EdgeInfo(caller=self.func_stack[-1], callee=node.func.id))
+            if self.func_stack:
+                chain = _name_chain(node.func)
+                if chain:
+                    owner = next((o for _, o in reversed(self.func_stack) if o), None)
+                    calls.append((self.func_stack[-1][0], chain, owner))
             self.generic_visit(node)
 
+        def visit_Import(self, node: ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    head = alias.name.partition(".")[0]
+                    imports[head] = head
+
+        def visit_ImportFrom(self, node: ast.ImportFrom):
+            base = "." * node.level + (node.module or "")
+            for alias in node.names:
+                if alias.name != "*":
+                    target = f"{base}.{alias.name}" if node.module else base + alias.name
+                    imports[alias.asname or alias.name] = target
+
         def visit_ClassDef(self, node: ast.ClassDef):
             if not parse_classes:
                 return
-            group = GroupInfo(name=node.name)
+            name = ".".join(self.class_stack[-1:] + [node.name])
+            classes.add(name)
+            # En klasse inne i en funksjon får metodene sine som om den lå i modulen
+            outer, self.func_stack = self.func_stack, []
+            self.class_stack.append(name)
+            self.generic_visit(node)
+            self.class_stack.pop()
+            self.func_stack = outer
+            group = GroupInfo(name=name)
             for child in node.body:
-                if isinstance(child, ast.FunctionDef):
-                    group.children.append(funcs.get(child.name, NodeInfo(name=child.name)))
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    method = f"{name}.{child.name}"
+                    group.children.append(funcs.get(method, NodeInfo(name=method)))
             groups.append(group)
 
     Visitor().visit(tree)
 
-    # Debugging logs
-    if verbose:
-        print(f"Parsed nodes: {funcs}")
-        print(f"Parsed edges: {edges}")
-        print(f"Parsed groups: {groups}")
+    # Én runde over kallstedene med alle definisjoner og importer kjent
+    edges: list[EdgeInfo] = []
+    for caller, chain, owner in calls:
+        callee = _resolve_local(chain, owner, funcs, classes, imports)
+        if callee is not None:
+            edges.append(EdgeInfo(caller=caller, callee=callee))
+    edges = merge_edges(edges)
+
+    # Hele strukturene logges bare når noen faktisk lytter
+    level = logging.INFO if verbose else logging.DEBUG
+    if log.isEnabledFor(level):
+        log.log(level, "Parsed nodes: %s", funcs)
+        log.log(level, "Parsed edges: %s", edges)
+        log.log(level, "Parsed groups: %s", groups)
 
     return list(funcs.values()), edges, groups
+
+def merge_edges(edges: list[EdgeInfo]) -> list[EdgeInfo]:
+    """Slå sammen kanter med samme kaller og kallmål; ``count`` summeres.
+
+    Rekkefølgen følger første forekomst, så resultatet er deterministisk.
+    """
+    merged: dict[tuple[str, str], EdgeInfo] = {}
+    for e in edges:
+        key = (e.caller, e.callee)
+        seen = merged.get(key)
+        if seen is None:
+            merged[key] = e
+        else:
+            merged[key] = replace(seen, count=seen.count + e.count)
+    return list(merged.values())
+
+def _name_chain(node) -> list[str] | None:
+    """``a.b.c`` som ``["a", "b", "c"]``; None hvis uttrykket ikke er en ren navnekjede."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return parts[::-1]
+
+def _resolve_local(chain, owner, funcs, classes, imports) -> str | None:
+    """Kallmålet for en navnekjede, så langt filen selv kan avgjøre det.
+
+    Lokale funksjoner og metoder gir lokale navn (``f``, ``Klasse.m``),
+    importerte navn gir punktnoterte stier som ``pkg.mod.f`` eller
+    ``.mod.f``, som kvalifiseres i ``qualify`` og slås opp i
+    ``SymbolTable``. Metodekall på andre objekter enn ``self``/``cls``
+    kan ikke avgjøres statisk og tas ikke med.
+    """
+    head, rest = chain[0], chain[1:]
+    if head in ("self", "cls") and owner and len(rest) == 1:
+        target = f"{owner}.{rest[0]}"
+    elif head in funcs and not rest:
+        target = head
+    elif head in classes:
+        target = ".".join(chain)
+    elif head in imports:
+        return ".".join([imports[head]] + rest)
+    elif not rest:
+        return head  # innebygd eller ukjent; beholdes som før
+    else:
+        return None
+    if target in classes:
+        # Et kall til en klasse er et kall til konstruktøren
+        init = f"{target}.__init__"
+        return init if init in funcs else target
+    return target
+
+def _options_key(parse_classes: bool, parse_functions: bool) -> str:
+    return f"classes={int(parse_classes)},functions={int(parse_functions)}"
+
+
+def module_name(py_path: Path, root: Path) -> str:
+    """Punktnotert modulnavn for en fil relativt til prosjektroten."""
+    parts = list(py_path.relative_to(root).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts) or py_path.stem
+
+def find_sources(root: Path) -> list[Path]:
+    """Alle .py-filer under root, uten skjulte mapper, cache og virtualenv."""
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS)
+        sources.extend(Path(dirpath) / f for f in sorted(filenames) if f.endswith(".py"))
+    return sources
+
+def qualify(
+    module: str,
+    nodes: list[NodeInfo],
+    edges: list[EdgeInfo],
+    groups: list[GroupInfo],
+    package: bool = False,
+) -> tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]:
+    """Gi funksjoner og klasser navn på formen ``modul:navn``.
+
+    Kall til funksjoner definert i samme modul kvalifiseres, og relative
+    importstier gjøres absolutte (``package`` er sann for ``__init__.py``).
+    Andre kall beholder navnet sitt, slik at de ikke kobles til feil modul;
+    importerte stier slås opp i ``SymbolTable`` når hele prosjektet er lest.
+    """
+    local = {n.name for n in nodes}
+    parts = module.split(".")
+    base = parts if package else parts[:-1]
+
+    def q(name: str) -> str:
+        return f"{module}:{name}"
+
+    def callee(name: str) -> str:
+        if name in local:
+            return q(name)
+        if not name.startswith("."):
+            return name
+        rest = name.lstrip(".")
+        level = len(name) - len(rest)
+        return ".".join(base[:len(base) - level + 1] + ([rest] if rest else []))
+
+    qualified = {n.name: replace(n, name=q(n.name)) for n in nodes}
+    q_edges = [replace(e, caller=q(e.caller), callee=callee(e.callee)) for e in edges]
+    q_groups = [
+        replace(
+            g,
+            name=q(g.name),
+            children=[qualified.get(c.name) or replace(c, name=q(c.name)) for c in g.children],
+        )
+        for g in groups
+    ]
+    return list(qualified.values()), q_edges, q_groups
+
+class SymbolTable:
+    """Alle definisjoner i prosjektet, slått opp på punktnotert sti.
+
+    ``pkg.mod.f`` og ``pkg.mod.Klasse.m`` peker på ``pkg.mod:f`` og
+    ``pkg.mod:Klasse.m``; en klasse peker på ``__init__`` sin. Navn som
+    importeres via en pakke (``from pkg import f`` der ``pkg/__init__.py``
+    henter ``f`` fra en undermodul) finnes gjennom pakken når navnet er
+    entydig i den. Oppbygging og oppslag er hash-oppslag, lineært i antall
+    definisjoner og kall.
+    """
+
+    def __init__(self, results):
+        self.symbols: dict[str, str] = {}
+        self.by_package: dict[tuple[str, str], str | None] = {}  # None: flertydig
+        for nodes, _, groups in results:
+            for node in nodes:
+                self._add(node.name, node.name)
+            for group in groups:
+                init = f"{group.name}.__init__"
+                if any(c.name == init for c in group.children):
+                    self._add(group.name, init)
+
+    def _add(self, name: str, target: str):
+        module, _, local = name.partition(":")
+        self.symbols[f"{module}.{local}"] = target
+        parts = module.split(".")
+        for i in range(1, len(parts)):
+            key = (".".join(parts[:i]), local)
+            self.by_package[key] = target if self.by_package.get(key, target) == target else None
+
+    def lookup(self, path: str) -> str | None:
+        """Kvalifisert navn for den punktnoterte stien, eller None."""
+        found = self.symbols.get(path)
+        if found is not None:
+            return found
+        parts = path.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            found = self.by_package.get((".".join(parts[:i]), ".".join(parts[i:])))
+            if found is not None:
+                return found
+        return None
+
+    def resolve(self, result):
+        """``result`` med importerte kallmål byttet ut med kvalifiserte navn."""
+        nodes, edges, groups = result
+        out = []
+        renamed = False
+        for e in edges:
+            if ":" not in e.callee and "." in e.callee:
+                target = self.lookup(e.callee)
+                if target is not None:
+                    e = replace(e, callee=target)
+                    renamed = True
+            out.append(e)
+        # To importnavn for samme funksjon blir nå samme kant
+        return nodes, merge_edges(out) if renamed else out, groups
+
+def parse_modules(
+    root: Path,
+    sources: list[Path],
+    workers: int | None = None,
+    parse_classes: bool = True,
+    parse_functions: bool = True,
+    cache=None,
+    progress=None,
+    resolve: bool = True,
+) -> dict[Path, tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]]:
+    """Parser gitte filer under root og returnerer kvalifisert resultat per fil.
+
+    Filene fordeles på en ``ProcessPoolExecutor`` med ``workers`` prosesser
+    (standard: antall kjerner); ``workers=1`` parser serielt i denne
+    prosessen. Med ``cache`` slås filene opp i denne prosessen først, og
+    bare cache-bom sendes til arbeiderne. Navn kvalifiseres med
+    modulnavnet, se ``qualify``, og med ``resolve`` kobles importerte kall
+    til definisjonene sine i de gitte filene, se ``SymbolTable``.
+    ``progress(fraction)`` kalles etter hver parsede fil; kaster den et
+    unntak, avbrytes filene som ikke er startet.
+    """
+    root = Path(root)
+    parse = partial(parse_file, parse_classes=parse_classes, parse_functions=parse_functions)
+    options = _options_key(parse_classes, parse_functions)
+    workers = workers or os.cpu_count() or 1
+
+    results = {}
+    stamps = {}
+    if cache is not None:
+        with instrument.stage("parse.cache_lookup"):
+            for path in sources:
+                hit = cache.get(path, options)
+                if hit is not None:
+                    results[path] = hit
+                else:
+                    stamps[path] = cache.stamp(path)  # før parsingen, se ``ParseCache.put``
+    missing = [path for path in sources if path not in results]
+    instrument.count("parse.cache_hits", len(results))
+    instrument.count("parse.files_parsed", len(missing))
+    log.debug("Parsing %d of %d modules under %s", len(missing), len(sources), root)
+
+    with instrument.stage("parse"):
+        if workers <= 1 or len(missing) < 2:
+            parsed = map(parse, missing)
+            pool = None
+        else:
+            chunksize = max(1, len(missing) // (workers * 4))
+            pool = ProcessPoolExecutor(max_workers=workers)
+            parsed = pool.map(parse, missing, chunksize=chunksize)
+        try:
+            for done, (path, result) in enumerate(zip(missing, parsed), 1):
+                results[path] = result
+                if progress is not None:
+                    progress(done / len(missing))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    if cache is not None:
+        with instrument.stage("parse.cache_store"):
+            for path in missing:
+                cache.put(path, stamps[path], results[path], options)
+            cache.flush()
+    qualified = {
+        path: qualify(module_name(path, root), *results[path], package=path.name == "__init__.py")
+        for path in sources
+    }
+    if not resolve:
+        return qualified
+    with instrument.stage("parse.resolve"):
+        table = SymbolTable(qualified.values())
+        return {path: table.resolve(result) for path, result in qualified.items()}
+
+def merge_results(
+    results,
+) -> tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]:
+    """Slå sammen (nodes, edges, groups) fra flere moduler til ett resultat."""
+    nodes: list[NodeInfo] = []
+    edges: list[EdgeInfo] = []
+    groups: list[GroupInfo] = []
+    for n, e, g in results:
+        nodes.extend(n)
+        edges.extend(e)
+        groups.extend(g)
+    return nodes, edges, groups
+
+def parse_project(
+    root: Path,
+    workers: int | None = None,
+    parse_classes: bool = True,
+    parse_functions: bool = True,
+    cache=None,
+) -> tuple[list[NodeInfo], list[EdgeInfo], list[GroupInfo]]:
+    """Parser alle moduler under root parallelt og slår sammen resultatet.
+
+    Se ``parse_modules`` for fordeling på prosesser og bruk av cache.
+    """
+    root = Path(root)
+    modules = parse_modules(root, find_sources(root), workers, parse_classes, parse_functions, cache)
+    return merge_results(modules.values())
@@ -0,0 +1,157 @@
+# query.py
+"""
+Oppslag i en ``Graph``: navnesøk og nåbarhet.
+
+``QueryIndex`` bygger to indekser ved første bruk:
+
+* en sortert liste over søkenøkler (hele navnet, navnet etter ``:`` og
+  siste ledd etter ``.``, uten store bokstaver), så prefikssøk er et
+  binærsøk pluss antall treff;
+* nabolister på CSR-form (NumPy), så transitive kallere og kallede finnes
+  med et bredde-først-søk der hvert nivå er noen få array-operasjoner.
+
+Svarene huskes i en LRU-cache. ``Graph.version`` økes ved hver endring av
+noder og kanter, og indeksen og cachen bygges da på nytt ved neste oppslag.
+"""
+import bisect
+from collections import OrderedDict
+
+import numpy as np
+
+import instrument
+
+CACHE_SIZE = 256  # antall nåbarhetssvar som huskes
+
+
+def search_keys(name: str) -> set[str]:
+    """Nøklene ``name`` kan finnes under: ``pkg.mod:Cls.f`` gir også ``cls.f`` og ``f``."""
+    name = name.lower()
+    keys = {name}
+    short = name.rpartition(":")[2]
+    keys.add(short)
+    keys.add(short.rpartition(".")[2])
+    return keys
+
+
+class QueryIndex:
+    def __init__(self, graph, cache_size: int = CACHE_SIZE):
+        self.graph = graph
+        self.cache_size = cache_size
+        self._version = None
+        self._cache: OrderedDict = OrderedDict()
+
+    # ---------- indekser ----------
+    def _sync(self):
+        if self._version == self.graph.version:
+            return
+        with instrument.stage("query.index"):
+            self.names = list(self.graph.nodes)
+            self.index = {name: i for i, name in enumerate(self.names)}
+            self._keys = sorted((key, name) for name in self.names for key in search_keys(name))
+            n = len(self.names)
+            src = np.array([self.index[e.src.info.name] for e in self.graph.edges], dtype=np.int64)
+            dst = np.array([self.index[e.dst.info.name] for e in self.graph.edges], dtype=np.int64)
+            # (start, mål) per retning: "out" gir kallede, "in" gir kallere
+            self._adjacency = {}
+            for direction, ends, others in (("out", src, dst), ("in", dst, src)):
+                order = np.argsort(ends, kind="stable")
+                starts = np.searchsorted(ends[order], np.arange(n + 1))
+                self._adjacency[direction] = (starts, others[order])
+        self._cache.clear()
+        self._version = self.graph.version
+
+    def _remember(self, key, compute):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            instrument.count("query.hits")
+            return self._cache[key]
+        value = compute()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    # ---------- navnesøk ----------
+    def search(self, prefix: str, limit: int = 50) -> list[str]:
+        """Nodenavn med en søkenøkkel som starter med ``prefix``, korteste først."""
+        self._sync()
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        found: dict[str, None] = {}
+        i = bisect.bisect_left(self._keys, (prefix, ""))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            found[self._keys[i][1]] = None
+            i += 1
+        return sorted(found, key=lambda name: (len(name), name))[:limit]
+
+    # ---------- nåbarhet ----------
+    def _neighbours(self, direction: str, frontier: np.ndarray) -> np.ndarray:
+        starts, targets = self._adjacency[direction]
+        counts = starts[frontier + 1] - starts[frontier]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return targets[np.repeat(starts[frontier], counts) + offsets]
+
+    def _reach(self, name: str, direction: str, depth: int | None) -> frozenset[str]:
+        start = self.index.get(name)
+        if start is None:
+            return frozenset()
+        seen = np.zeros(len(self.names), dtype=bool)
+        seen[start] = True
+        frontier = np.array([start])
+        level = 0
+        while len(frontier) and (depth is None or level < depth):
+            nxt = np.unique(self._neighbours(direction, frontier))
+            frontier = nxt[~seen[nxt]]
+            seen[frontier] = True
+            level += 1
+        seen[start] = False
+        return frozenset(self.names[i] for i in np.flatnonzero(seen).tolist())
+
+    def callees(self, name: str, depth: int | None = None) -> frozenset[str]:
+        """Alt ``name`` kaller, direkte eller indirekte (høyst ``depth`` ledd)."""
+        self._sync()
+        with instrument.stage("query.reach"):
+            return self._remember(("out", name, depth), lambda: self._reach(name, "out", depth))
+
+    def callers(self, name: str, depth: int | None = None) -> frozenset[str]:
+        """Alt som kaller ``name``, direkte eller indirekte: hva som påvirkes av en endring."""
+        self._sync()
+        with instrument.stage("query.reach"):
+            return self._remember(("in", name, depth), lambda: self._reach(name, "in", depth))
+
+    def call_path(self, src: str, dst: str) -> list[str] | None:
+        """Korteste kallkjede fra ``src`` til ``dst`` (begge med), eller None."""
+        self._sync()
+        with instrument.stage("query.path"):
+            return self._remember(("path", src, dst), lambda: self._path(src, dst))
+
+    def _path(self, src: str, dst: str) -> list[str] | None:
+        a, b = self.index.get(src), self.index.get(dst)
+        if a is None or b is None:
+            return None
+        parent = np.full(len(self.names), -1, dtype=np.int64)
+        parent[a] = a
+        frontier = np.array([a])
+        starts, _ = self._adjacency["out"]
+        while len(frontier) and parent[b] < 0:
+            counts = starts[frontier + 1] - starts[frontier]
+            nxt = self._neighbours("out", frontier)
+            owner = np.repeat(frontier, counts)
+            new = parent[nxt] < 0
+            nxt, owner = nxt[new], owner[new]
+            # Første forelder vinner når flere noder i fronten kaller samme node
+            nxt, first = np.unique(nxt, return_index=True)
+            parent[nxt] = owner[first]
+            frontier = nxt
+        if parent[b] < 0:
+            return None
+        path = [b]
+        while path[-1] != a:
+            path.append(int(parent[path[-1]]))
+        return [self.names[i] for i in reversed(path)]
+
+    def subgraph_edges(self, names) -> list:
+        """Kantene i grafen som har begge ender i ``names``."""
+        names = set(names)
+        return [e for name in names for e in self.graph.out_edges.get(name, []) if e.dst.info.name in names]
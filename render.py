@@ -0,0 +1,399 @@
+# render.py
+"""
+Tegning av en graf uten Tk: SVG, PNG og en pyramide av PNG-fliser.
+
+``NodeCanvas`` tegner bare det som er synlig, og hopper over noder og
+kanter når det blir for mange, så et bilde av canvaset mangler deler av
+store grafer. Her tegnes alt rett fra nodenes og kantenes koordinater i
+``Graph`` (eller ``CompactGraph``), med samme farger som canvaset.
+
+* ``write_svg`` skriver SVG fortløpende til en åpen fil.
+* ``render_png`` lager ett PNG-bilde, bånd for bånd, og komprimerer hvert
+  bånd før neste tegnes.
+* ``render_tiles`` lager en flispyramide (``z/x/y.png``, som i Leaflet og
+  OpenLayers) der nivå ``max_zoom`` er i full størrelse og hvert nivå
+  under har halve skalaen. Én flis tegnes om gangen.
+
+PNG-filene kodes med ``zlib`` og ``struct``, uten Pillow. Minnebruken er
+ett bånd eller én flis pluss en liste over hvilke noder og kanter som
+berører hver flis på nivået. Rasterbildene har ikke nodenavn; de finnes i
+SVG-en.
+"""
+import json
+import logging
+import math
+import struct
+import zlib
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+import instrument
+from compact_graph import CompactGraph
+from graph_model import edge_width
+
+log = logging.getLogger(__name__)
+
+TILE_SIZE = 256  # piksler per flis, og høyden på båndene i ``render_png``
+MAX_IMAGE = 8192  # største bredde/høyde ``render_png`` velger selv
+MARGIN = 20
+CHUNK = 1 << 18  # punkter eller cellekryssinger som regnes ut om gangen
+COMPRESSION = 1  # zlib-nivå; flisene blir små uansett, og nivå 1 er omtrent dobbelt så raskt som 6
+ARROW = 10  # pillengde i grafkoordinater, som Tk sin standardpil
+BACKGROUND = (0x1E, 0x1E, 0x1E)
+NODE_FILL = (0x2D, 0x2D, 0x30)
+NODE_OUTLINE = (0x8C, 0x8C, 0x8C)
+EDGE_COLOR = (0xC5, 0x86, 0xC0)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+# ---------- SVG ----------
+def write_svg(graph, out, margin: int = MARGIN, batch: int = 4096):
+    """Skriv grafen som SVG til tekstfila ``out``, ``batch`` elementer om gangen."""
+    nodes = graph.nodes.values()
+    x0 = min((n.x for n in nodes), default=0) - margin
+    y0 = min((n.y for n in nodes), default=0) - margin
+    x1 = max((n.x + n.width for n in nodes), default=0) + margin
+    y1 = max((n.y + n.height for n in nodes), default=0) + margin
+
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{x0} {y0} {x1 - x0} {y1 - y0}">\n')
+    out.write('<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" '
+              'markerWidth="6" markerHeight="6" orient="auto">'
+              '<path d="M0,0 L10,5 L0,10 z" fill="#c586c0"/></marker></defs>\n')
+    out.write(f'<rect x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}" fill="#1e1e1e"/>\n')
+    pending = []
+    for node in nodes:
+        pending.append(f'<rect x="{node.x}" y="{node.y}" width="{node.width}" height="{node.height}" '
+                       'fill="#2d2d30" stroke="#8c8c8c" stroke-width="2"/>\n')
+        pending.append(f'<text x="{node.x + node.width / 2}" y="{node.y + 15}" fill="white" '
+                       f'font-family="Helvetica" font-size="10" font-weight="bold" '
+                       f'text-anchor="middle" dominant-baseline="middle">{escape(node.info.name)}</text>\n')
+        if len(pending) >= batch:
+            out.write("".join(pending))
+            pending.clear()
+    for edge in graph.edges:
+        # fra midt-høyre på src til midt-venstre på dst, som i NodeCanvas
+        pending.append(f'<line x1="{edge.src.x + edge.src.width}" y1="{edge.src.y + edge.src.height / 2}" '
+                       f'x2="{edge.dst.x}" y2="{edge.dst.y + edge.dst.height / 2}" '
+                       f'stroke="#c586c0" stroke-width="{edge_width(edge.weight)}" marker-end="url(#arrow)" '
+                       f'data-src={quoteattr(edge.src.info.name)} data-dst={quoteattr(edge.dst.info.name)}/>\n')
+        if len(pending) >= batch:
+            out.write("".join(pending))
+            pending.clear()
+    out.write("".join(pending))
+    out.write("</svg>\n")
+
+
+# ---------- PNG-koding ----------
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _header(width: int, height: int) -> bytes:
+    # 8 bit RGB, uten interlacing
+    return PNG_SIGNATURE + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+
+def _scanlines(image: np.ndarray) -> bytes:
+    """Radene med filtertype 0 (ingen) foran hver."""
+    rows = np.zeros((image.shape[0], image.shape[1] * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(image.shape[0], -1)
+    return rows.tobytes()
+
+
+def encode_png(image: np.ndarray, level: int = COMPRESSION) -> bytes:
+    """PNG-bytene for et RGB-bilde (høyde × bredde × 3, uint8)."""
+    height, width = image.shape[:2]
+    return (_header(width, height) + _chunk(b"IDAT", zlib.compress(_scanlines(image), level))
+            + _chunk(b"IEND", b""))
+
+
+# ---------- geometri ----------
+def graph_arrays(graph):
+    """(pos, size, segmenter) som arrays; segmentene er (x1, y1, x2, y2, bredde) per kant."""
+    if isinstance(graph, CompactGraph):
+        pos, size = graph.pos, graph.size.astype(float)
+        src, dst, weight = graph.src, graph.dst, graph.weight
+    else:
+        nodes = list(graph.nodes.values())
+        index = {id(node): i for i, node in enumerate(nodes)}
+        pos = np.array([(n.x, n.y) for n in nodes], dtype=float).reshape(-1, 2)
+        size = np.array([(n.width, n.height) for n in nodes], dtype=float).reshape(-1, 2)
+        src = np.array([index[id(e.src)] for e in graph.edges], dtype=np.int64)
+        dst = np.array([index[id(e.dst)] for e in graph.edges], dtype=np.int64)
+        weight = np.array([e.weight for e in graph.edges], dtype=np.int64)
+    # fra midt-høyre på src til midt-venstre på dst, som i NodeCanvas
+    segments = np.column_stack([
+        pos[src, 0] + size[src, 0], pos[src, 1] + size[src, 1] / 2,
+        pos[dst, 0], pos[dst, 1] + size[dst, 1] / 2,
+        2 + np.log2(np.maximum(weight, 1)),  # edge_width
+    ]).reshape(-1, 5)
+    return pos, size, segments
+
+
+def _arrow_wings(segments: np.ndarray) -> np.ndarray:
+    """To korte streker bakover fra tuppen av hver kant, så kanten får en pil."""
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    length = np.hypot(dx, dy)
+    length[length == 0] = 1
+    ux, uy = dx / length, dy / length
+    wings = []
+    for side in (1, -1):
+        # tilbake langs kanten, ut til siden med forholdet 10:4 som Tk sin pil
+        bx = segments[:, 2] - ARROW * ux - 0.4 * ARROW * uy * side
+        by = segments[:, 3] - ARROW * uy + 0.4 * ARROW * ux * side
+        wings.append(np.column_stack([segments[:, 2], segments[:, 3], bx, by, segments[:, 4]]))
+    return np.concatenate(wings)
+
+
+def _csr(keys: np.ndarray, ids: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(keys, kind="stable")
+    starts = np.searchsorted(keys[order], np.arange(count + 1))
+    return starts, ids[order]
+
+
+def _box_cells(lo: np.ndarray, hi: np.ndarray, cell: tuple[float, float], grid: tuple[int, int]):
+    """(celle, boks) for hver celle en boks (i piksler) berører."""
+    cols, rows = grid
+    c0 = np.clip(np.floor(lo[:, 0] / cell[0]).astype(np.int64), 0, cols - 1)
+    c1 = np.clip(np.floor(hi[:, 0] / cell[0]).astype(np.int64), 0, cols - 1)
+    r0 = np.clip(np.floor(lo[:, 1] / cell[1]).astype(np.int64), 0, rows - 1)
+    r1 = np.clip(np.floor(hi[:, 1] / cell[1]).astype(np.int64), 0, rows - 1)
+    across, down = c1 - c0 + 1, r1 - r0 + 1
+    count = across * down
+    ids = np.repeat(np.arange(len(lo)), count)
+    k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    col = c0[ids] + k % across[ids]
+    row = r0[ids] + k // across[ids]
+    return row * cols + col, ids
+
+
+def _chunks(counts: np.ndarray, limit: int):
+    """Skiver av ``counts`` med sum høyst ``limit``, eller ett element om det alene er større."""
+    total = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        done = total[start - 1] if start else 0
+        end = max(start + 1, int(np.searchsorted(total, done + limit, "right")))
+        yield slice(start, end)
+        start = end
+
+
+def _segment_cells(seg: np.ndarray, cell: tuple[float, float], grid: tuple[int, int]):
+    """(celle, strek) for hver celle et linjestykke (i piksler) går gjennom.
+
+    Parameterne der streken krysser en cellegrense sorteres per strek;
+    midtpunktet mellom to kryssinger ligger i én celle. Strekene tas i
+    blokker på rundt ``CHUNK`` kryssinger, så mellomresultatene holdes små.
+    """
+    cols, rows = grid
+    u0, v0 = seg[:, 0] / cell[0], seg[:, 1] / cell[1]
+    u1, v1 = seg[:, 2] / cell[0], seg[:, 3] / cell[1]
+    crossings = np.abs(np.floor(u1) - np.floor(u0)) + np.abs(np.floor(v1) - np.floor(v0)) + 1
+    cells, owners = [], []
+    for part in _chunks(crossings, CHUNK):
+        base = part.start
+        a0, b0, a1, b1 = u0[part], v0[part], u1[part], v1[part]
+        n = len(a0)
+        ts, owner = [np.zeros(n), np.ones(n)], [np.arange(n)] * 2
+        for a, b in ((a0, a1), (b0, b1)):
+            first = np.floor(np.minimum(a, b)).astype(np.int64) + 1
+            count = np.maximum(np.floor(np.maximum(a, b)).astype(np.int64) - first + 1, 0)
+            ids = np.repeat(np.arange(n), count)
+            k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            ts.append((first[ids] + k - a[ids]) / (b[ids] - a[ids]))
+            owner.append(ids)
+        t, owner = np.concatenate(ts), np.concatenate(owner)
+        order = np.lexsort((t, owner))
+        t, owner = t[order], owner[order]
+        same = owner[1:] == owner[:-1]
+        mid, ids = ((t[1:] + t[:-1]) / 2)[same], owner[1:][same]
+        col = np.clip(np.floor(a0[ids] + mid * (a1[ids] - a0[ids])).astype(np.int64), 0, cols - 1)
+        row = np.clip(np.floor(b0[ids] + mid * (b1[ids] - b0[ids])).astype(np.int64), 0, rows - 1)
+        # Samme celle kan komme to ganger når streken går gjennom et hjørne
+        key = np.unique(ids * (cols * rows) + row * cols + col)
+        cells.append((key % (cols * rows)).astype(np.int32))
+        owners.append((key // (cols * rows) + base).astype(np.int32))
+    if not cells:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    return np.concatenate(cells), np.concatenate(owners)
+
+
+class _Scene:
+    """Grafen i piksler for én skala, med noder og streker fordelt på celler (fliser eller bånd)."""
+
+    def __init__(self, pos, size, segments, origin, scale, cell, grid):
+        self.scale = scale
+        self.lo = (pos - origin) * scale
+        self.hi = self.lo + size * scale
+        lines = segments
+        if ARROW * scale >= 3:  # mindre piler enn et par piksler er bare støy
+            lines = np.concatenate([segments, _arrow_wings(segments)])
+        self.lines = np.column_stack([(lines[:, :2] - origin) * scale, (lines[:, 2:4] - origin) * scale,
+                                      np.maximum(1, np.rint(lines[:, 4] * scale))]).reshape(-1, 5)
+        count = grid[0] * grid[1]
+        self.nodes = _csr(*_box_cells(self.lo, self.hi, cell, grid), count)
+        self.edges = _csr(*_segment_cells(self.lines, cell, grid), count)
+
+    def draw(self, key: int, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """Cellen ``key`` med øvre venstre hjørne i (``x``, ``y``) piksler, som et RGB-bilde."""
+        image = np.empty((height, width, 3), dtype=np.uint8)
+        image[:] = BACKGROUND
+        starts, ids = self.edges
+        _draw_lines(image, self.lines[ids[starts[key]:starts[key + 1]]], x, y)
+        starts, ids = self.nodes
+        inside = ids[starts[key]:starts[key + 1]]
+        _draw_boxes(image, self.lo[inside], self.hi[inside], x, y, self.scale)
+        return image
+
+
+def _draw_lines(image: np.ndarray, lines: np.ndarray, x: int, y: int):
+    """Tegn strekene (x1, y1, x2, y2, bredde), klippet mot bildet med øvre venstre hjørne i (``x``, ``y``).
+
+    Punktene langs en strek ligger fast i forhold til hele streken, så
+    fliser og bånd som deler en strek tegner nøyaktig de samme pikslene.
+    """
+    height, width = image.shape[:2]
+    for thickness in np.unique(lines[:, 4]).tolist():
+        seg = lines[lines[:, 4] == thickness]
+        pad = thickness
+        # Liang-Barsky for alle strekene samtidig
+        dx, dy = seg[:, 2] - seg[:, 0], seg[:, 3] - seg[:, 1]
+        lo, hi = np.zeros(len(seg)), np.ones(len(seg))
+        outside = np.zeros(len(seg), dtype=bool)
+        for p, q in ((-dx, seg[:, 0] - x + pad), (dx, x + width + pad - seg[:, 0]),
+                     (-dy, seg[:, 1] - y + pad), (dy, y + height + pad - seg[:, 1])):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = q / p
+            outside |= (p == 0) & (q < 0)
+            lo = np.where(p < 0, np.maximum(lo, t), lo)
+            hi = np.where(p > 0, np.minimum(hi, t), hi)
+        keep = ~outside & (lo <= hi)
+        seg, dx, dy, lo, hi = seg[keep], dx[keep], dy[keep], lo[keep], hi[keep]
+        # Ett punkt per piksel langs hele streken; bare de mellom lo og hi tegnes
+        steps = np.ceil(np.hypot(dx, dy)).astype(np.int64) + 1
+        first = np.floor(lo * (steps - 1)).astype(np.int64)
+        counts = np.ceil(hi * (steps - 1)).astype(np.int64) - first + 1
+        # Pennen: thickness × thickness piksler rundt hvert punkt
+        pen = np.arange(int(thickness)) - int(thickness) // 2
+        for part in _chunks(counts, max(1, CHUNK // len(pen) ** 2)):
+            count = counts[part]
+            ids = np.repeat(np.arange(part.start, part.stop), count)
+            k = first[ids] + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            t = k / np.maximum(steps[ids] - 1, 1)
+            xs = np.floor(seg[ids, 0] + t * dx[ids]).astype(np.int64) - x
+            ys = np.floor(seg[ids, 1] + t * dy[ids]).astype(np.int64) - y
+            px = (xs[:, None, None] + pen[None, :, None]).repeat(len(pen), axis=2).ravel()
+            py = (ys[:, None, None] + pen[None, None, :]).repeat(len(pen), axis=1).ravel()
+            ok = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            image[py[ok], px[ok]] = EDGE_COLOR
+
+
+def _draw_boxes(image: np.ndarray, lo: np.ndarray, hi: np.ndarray, x: int, y: int, scale: float):
+    """Tegn nodene som bokser med kant; bokser på et par piksler blir prikker i kantfargen."""
+    height, width = image.shape[:2]
+    left, top = np.floor(lo[:, 0]).astype(np.int64) - x, np.floor(lo[:, 1]).astype(np.int64) - y
+    right, bottom = np.ceil(hi[:, 0]).astype(np.int64) - x, np.ceil(hi[:, 1]).astype(np.int64) - y
+    tiny = (hi[:, 0] - lo[:, 0] < 3) | (hi[:, 1] - lo[:, 1] < 3)
+    if tiny.any():
+        ok = tiny & (left >= 0) & (left < width) & (top >= 0) & (top < height)
+        image[top[ok], left[ok]] = NODE_OUTLINE
+    border = max(1, round(2 * scale))
+    for i in np.flatnonzero(~tiny).tolist():
+        a, b = max(left[i], 0), max(top[i], 0)
+        c, d = min(right[i], width), min(bottom[i], height)
+        if a >= c or b >= d:
+            continue
+        image[b:d, a:c] = NODE_OUTLINE
+        # innsiden av den uklippede boksen, klippet mot bildet
+        ia, ib = max(a, left[i] + border), max(b, top[i] + border)
+        ic, id_ = min(c, right[i] - border), min(d, bottom[i] - border)
+        if ia < ic and ib < id_:
+            image[ib:id_, ia:ic] = NODE_FILL
+
+
+def _bounds(pos: np.ndarray, size: np.ndarray, margin: float) -> tuple[np.ndarray, np.ndarray]:
+    if not len(pos):
+        return np.zeros(2), np.full(2, 2.0 * margin)
+    return pos.min(axis=0) - margin, (pos + size).max(axis=0) + margin
+
+
+# ---------- PNG ----------
+def render_png(graph, filename, scale: float | None = None, margin: int = MARGIN, progress=None):
+    """Skriv hele grafen som ett PNG-bilde.
+
+    Standardskalaen er 1, eller mindre slik at bildet er høyst
+    ``MAX_IMAGE`` piksler på den lengste siden. Bildet tegnes i bånd på
+    ``TILE_SIZE`` rader, og hvert bånd komprimeres og skrives før neste.
+    """
+    pos, size, segments = graph_arrays(graph)
+    origin, far = _bounds(pos, size, margin)
+    extent = far - origin
+    if scale is None:
+        scale = min(1.0, MAX_IMAGE / float(extent.max()))
+    width, height = (max(1, math.ceil(v)) for v in extent * scale)
+    bands = math.ceil(height / TILE_SIZE)
+    with instrument.stage("render.png"):
+        scene = _Scene(pos, size, segments, origin, scale, (width, TILE_SIZE), (1, bands))
+        compressor = zlib.compressobj(COMPRESSION)
+        with open(filename, "wb") as f:
+            f.write(_header(width, height))
+            for band in range(bands):
+                rows = min(TILE_SIZE, height - band * TILE_SIZE)
+                data = compressor.compress(_scanlines(scene.draw(band, 0, band * TILE_SIZE, width, rows)))
+                if data:
+                    f.write(_chunk(b"IDAT", data))
+                if progress is not None:
+                    progress((band + 1) / bands)
+            f.write(_chunk(b"IDAT", compressor.flush()))
+            f.write(_chunk(b"IEND", b""))
+    log.info("Rendered %dx%d PNG of %d nodes to %s", width, height, len(pos), filename)
+
+
+# ---------- flispyramide ----------
+def render_tiles(graph, directory, tile_size: int = TILE_SIZE, margin: int = MARGIN, progress=None) -> int:
+    """Skriv grafen som fliser ``directory/z/x/y.png``; returner høyeste nivå.
+
+    Nivå 0 har hele grafen i én flis, og det høyeste nivået har skala 1.
+    ``directory/tiles.json`` beskriver pyramiden (flisstørrelse, nivåer og
+    grafens utstrekning), slik at en viser kan regne om til grafkoordinater.
+    """
+    directory = Path(directory)
+    pos, size, segments = graph_arrays(graph)
+    origin, far = _bounds(pos, size, margin)
+    extent = far - origin
+    max_zoom = max(0, math.ceil(math.log2(float(extent.max()) / tile_size)))
+    grids = [tuple(max(1, math.ceil(v * 2.0 ** (z - max_zoom) / tile_size)) for v in extent)
+             for z in range(max_zoom + 1)]
+    total = sum(cols * rows for cols, rows in grids)
+    empty = None
+    done = 0
+    with instrument.stage("render.tiles"):
+        for z, (cols, rows) in enumerate(grids):
+            scene = _Scene(pos, size, segments, origin, 2.0 ** (z - max_zoom), (tile_size, tile_size), (cols, rows))
+            node_starts, edge_starts = scene.nodes[0], scene.edges[0]
+            for col in range(cols):
+                folder = directory / str(z) / str(col)
+                folder.mkdir(parents=True, exist_ok=True)
+                for row in range(rows):
+                    key = row * cols + col
+                    if node_starts[key] == node_starts[key + 1] and edge_starts[key] == edge_starts[key + 1]:
+                        # Tomme fliser er like; kod én gang
+                        if empty is None:
+                            empty = encode_png(np.full((tile_size, tile_size, 3), BACKGROUND, dtype=np.uint8))
+                        data = empty
+                    else:
+                        data = encode_png(scene.draw(key, col * tile_size, row * tile_size, tile_size, tile_size))
+                    (folder / f"{row}.png").write_bytes(data)
+                    done += 1
+                    if progress is not None:
+                        progress(done / total)
+    instrument.count("render.tiles", total)
+    meta = {"tile_size": tile_size, "min_zoom": 0, "max_zoom": max_zoom,
+            "origin": origin.tolist(), "extent": extent.tolist(),
+            "nodes": len(pos), "edges": len(segments)}
+    (directory / "tiles.json").write_text(json.dumps(meta, indent=4))
+    log.info("Rendered %d tiles in %d levels to %s", total, max_zoom + 1, directory)
+    return max_zoom
@@ -0,0 +1,179 @@
+# snapshot.py
+"""
+Kompakt binært øyeblikksbilde (.pvg) av en ``Graph``, posisjoner inkludert.
+
+Formatet er en strengtabell (alle navn internert, NUL-separert UTF-8)
+etterfulgt av pakkede heltalls- og flyttallsarrays:
+
+    magic "PYVZ", versjon (u32)
+    antall: strenger, noder, kanter, grupper, inputs, outputs, barn, blob-lengde (u64)
+    strengblob
+    noder: navn (u32), x, y (f64), bredde, høyde (i32)
+    inputs/outputs: offset per node (u64, n+1) og strengindekser (u32)
+    kanter: src, dst (u32, nodeindekser), antall kallsteder (u32, fra versjon 2)
+    grupper: navn (u32), offset for barn (u64, g+1), barnenavn (u32)
+
+Alle tall er little-endian. Å åpne et øyeblikksbilde krever ingen parsing
+eller layout.
+"""
+import struct
+
+import numpy as np
+
+from compact_graph import CompactGraph
+from graph_model import Graph
+from parser import EdgeInfo, GroupInfo, NodeInfo
+
+MAGIC = b"PYVZ"
+VERSION = 2  # versjon 1 mangler kantvektene og leses med vekt 1
+_COUNTS = struct.Struct("<8Q")
+
+
+class _Strings:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def __call__(self, s: str) -> int:
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.index)
+        return i
+
+
+def _csr(lists, intern):
+    offsets = np.zeros(len(lists) + 1, dtype="<u8")
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    values = np.fromiter((intern(v) for vs in lists for v in vs), dtype="<u4", count=int(offsets[-1]))
+    return offsets, values
+
+
+def _compact_arrays(graph: CompactGraph, intern: _Strings):
+    """Arrayene til en ``CompactGraph`` i snapshot-rekkefølge, uten å gå via visninger."""
+    names = np.array([intern(name) for name in graph.names], dtype="<u4")
+    remap = np.array([intern(s) for s in graph.strings] or [0], dtype="<u4")
+    group_names = np.array([intern(name) for name in graph.group_names], dtype="<u4")
+    return (names, graph.pos[:, 0].astype("<f8"), graph.pos[:, 1].astype("<f8"),
+            graph.size[:, 0].astype("<i4"), graph.size[:, 1].astype("<i4"),
+            graph.input_start.astype("<u8"), remap[graph.inputs],
+            graph.output_start.astype("<u8"), remap[graph.outputs],
+            graph.src.astype("<u4"), graph.dst.astype("<u4"), graph.weight.astype("<u4"),
+            group_names, graph.member_start.astype("<u8"), names[graph.members])
+
+
+def _graph_arrays(graph: Graph, intern: _Strings):
+    nodes = list(graph.nodes.values())
+    position = {id(node): i for i, node in enumerate(nodes)}
+
+    names = np.fromiter((intern(n.info.name) for n in nodes), dtype="<u4", count=len(nodes))
+    xs = np.fromiter((n.x for n in nodes), dtype="<f8", count=len(nodes))
+    ys = np.fromiter((n.y for n in nodes), dtype="<f8", count=len(nodes))
+    widths = np.fromiter((n.width for n in nodes), dtype="<i4", count=len(nodes))
+    heights = np.fromiter((n.height for n in nodes), dtype="<i4", count=len(nodes))
+    in_off, in_val = _csr([n.info.inputs for n in nodes], intern)
+    out_off, out_val = _csr([n.info.outputs for n in nodes], intern)
+
+    src = np.fromiter((position[id(e.src)] for e in graph.edges), dtype="<u4", count=len(graph.edges))
+    dst = np.fromiter((position[id(e.dst)] for e in graph.edges), dtype="<u4", count=len(graph.edges))
+    weight = np.fromiter((e.weight for e in graph.edges), dtype="<u4", count=len(graph.edges))
+
+    groups = list(graph.groups.values())
+    group_names = np.fromiter((intern(g.info.name) for g in groups), dtype="<u4", count=len(groups))
+    child_off, child_val = _csr([[c.name for c in g.info.children] for g in groups], intern)
+    return (names, xs, ys, widths, heights, in_off, in_val, out_off, out_val,
+            src, dst, weight, group_names, child_off, child_val)
+
+
+def save_snapshot(graph: Graph | CompactGraph, filename: str):
+    """Skriv grafen til ``filename + ".pvg"``."""
+    intern = _Strings()
+    if isinstance(graph, CompactGraph):
+        arrays = _compact_arrays(graph, intern)
+    else:
+        arrays = _graph_arrays(graph, intern)
+    names, src, child_val = arrays[0], arrays[9], arrays[14]
+
+    blob = "\0".join(intern.index).encode("utf8")
+    with open(filename + ".pvg", "wb") as f:
+        f.write(MAGIC + struct.pack("<I", VERSION))
+        f.write(_COUNTS.pack(len(intern.index), len(names), len(src), len(arrays[12]),
+                             len(arrays[6]), len(arrays[8]), len(child_val), len(blob)))
+        f.write(blob)
+        for arr in arrays:
+            f.write(arr.tobytes())
+
+
+def load_snapshot(path: str, compact: bool = False) -> Graph | CompactGraph:
+    """Les et .pvg-øyeblikksbilde rett inn i en ny ``Graph`` uten layout.
+
+    Med ``compact=True`` fylles arrayene i en ``CompactGraph`` direkte.
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if head[:4] != MAGIC:
+            raise ValueError(f"{path} is not a graph snapshot")
+        version, = struct.unpack("<I", head[4:])
+        if version not in (1, VERSION):
+            raise ValueError(f"Unsupported snapshot version {version} in {path}")
+        n_str, n, n_edges, n_groups, n_in, n_out, n_child, blob_len = _COUNTS.unpack(f.read(_COUNTS.size))
+        strings = f.read(blob_len).decode("utf8").split("\0") if n_str else []
+
+        def read(dtype, count):
+            dtype = np.dtype(dtype)
+            return np.frombuffer(f.read(dtype.itemsize * count), dtype=dtype, count=count)
+
+        names, xs, ys = read("<u4", n), read("<f8", n), read("<f8", n)
+        widths, heights = read("<i4", n), read("<i4", n)
+        in_off, in_val = read("<u8", n + 1), read("<u4", n_in)
+        out_off, out_val = read("<u8", n + 1), read("<u4", n_out)
+        src, dst = read("<u4", n_edges), read("<u4", n_edges)
+        weight = read("<u4", n_edges) if version >= 2 else np.ones(n_edges, dtype="<u4")
+        group_names, child_off, child_val = read("<u4", n_groups), read("<u8", n_groups + 1), read("<u4", n_child)
+
+    if compact:
+        return _compact_from_arrays(strings, names, xs, ys, widths, heights, in_off, in_val,
+                                    out_off, out_val, src, dst, weight, group_names, child_off, child_val)
+
+    in_off, out_off, child_off = in_off.tolist(), out_off.tolist(), child_off.tolist()
+    in_val, out_val, child_val = in_val.tolist(), out_val.tolist(), child_val.tolist()
+    infos = [
+        NodeInfo(
+            strings[name],
+            [strings[s] for s in in_val[in_off[i]:in_off[i + 1]]],
+            [strings[s] for s in out_val[out_off[i]:out_off[i + 1]]],
+        )
+        for i, name in enumerate(names.tolist())
+    ]
+    by_name = {ni.name: ni for ni in infos}
+    group_infos = [
+        GroupInfo(strings[name], children=[
+            by_name.get(strings[c]) or NodeInfo(strings[c]) for c in child_val[child_off[i]:child_off[i + 1]]
+        ])
+        for i, name in enumerate(group_names.tolist())
+    ]
+
+    edge_infos = [EdgeInfo(infos[s].name, infos[d].name, w)
+                  for s, d, w in zip(src.tolist(), dst.tolist(), weight.tolist())]
+
+    graph = Graph()
+    graph.build(infos, edge_infos, group_infos, layout=False)
+    for node, x, y, w, h in zip(graph.nodes.values(), xs.tolist(), ys.tolist(), widths.tolist(), heights.tolist()):
+        node.x, node.y, node.width, node.height = x, y, w, h
+    return graph
+
+
+def _compact_from_arrays(strings, names, xs, ys, widths, heights, in_off, in_val,
+                         out_off, out_val, src, dst, weight, group_names, child_off, child_val):
+    node_names = [strings[i] for i in names.tolist()]
+    ids = {name: i for i, name in enumerate(node_names)}
+    node_group = np.full(len(node_names), -1, dtype=np.int32)
+    child_off = child_off.tolist()
+    child_val = child_val.tolist()
+    for k in range(len(group_names)):
+        members = [ids[strings[c]] for c in child_val[child_off[k]:child_off[k + 1]] if strings[c] in ids]
+        node_group[members] = k
+
+    return CompactGraph.from_arrays(
+        node_names, strings, np.column_stack([xs, ys]), np.column_stack([widths, heights]),
+        (in_off, in_val), (out_off, out_val), src, dst,
+        [strings[g] for g in group_names.tolist()], node_group, weight,
+    )
@@ -0,0 +1,125 @@
+# spatial.py
+"""
+Hierarkisk uniformt rutenett som romlig indeks over bokser og linjestykker.
+
+Brukes av ``NodeCanvas`` for å finne hvilke noder og kanter som ligger i
+det synlige området, uten å se på hele grafen. Hver nøkkel legges på det
+nivået der cellene er store nok til at den bare berører noen få celler,
+slik at også lange kanter er billige å sette inn.
+"""
+import math
+from collections import defaultdict
+
+
+def segment_cells(x0: float, y0: float, x1: float, y1: float, cell: float):
+    """Cellene (cx, cy) et linjestykke går gjennom, kolonne for kolonne."""
+    if x0 > x1:
+        x0, y0, x1, y1 = x1, y1, x0, y0
+    first, last = math.floor(x0 / cell), math.floor(x1 / cell)
+    slope = (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+    for cx in range(first, last + 1):
+        xa = max(x0, cx * cell)
+        xb = min(x1, (cx + 1) * cell)
+        ya = y0 + (xa - x0) * slope if x1 != x0 else y0
+        yb = y0 + (xb - x0) * slope if x1 != x0 else y1
+        for cy in range(math.floor(min(ya, yb) / cell), math.floor(max(ya, yb) / cell) + 1):
+            yield cx, cy
+
+
+def segment_hits_rect(x0, y0, x1, y1, rx0, ry0, rx1, ry1) -> bool:
+    """Liang-Barsky: skjærer linjestykket rektangelet?"""
+    dx, dy = x1 - x0, y1 - y0
+    lo, hi = 0.0, 1.0
+    for p, q in ((-dx, x0 - rx0), (dx, rx1 - x0), (-dy, y0 - ry0), (dy, ry1 - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                lo = max(lo, t)
+            else:
+                hi = min(hi, t)
+            if lo > hi:
+                return False
+    return True
+
+
+class GridIndex:
+    """Nøkler lagres i cellene de berører, på nivå ``k`` med cellestørrelse ``cell * 2**k``."""
+
+    def __init__(self, cell: float = 256.0):
+        self.cell = cell
+        self.levels: dict[int, dict[tuple[int, int], set]] = {}
+        self.where: dict[object, tuple[int, list[tuple[int, int]]]] = {}
+        self.segments: dict[object, tuple[float, float, float, float]] = {}
+
+    def __contains__(self, key) -> bool:
+        return key in self.where
+
+    def __len__(self) -> int:
+        return len(self.where)
+
+    def _level(self, span: float) -> int:
+        """Minste nivå der utstrekningen dekker høyst to celler."""
+        if span <= 2 * self.cell:
+            return 0
+        return math.ceil(math.log2(span / (2 * self.cell)))
+
+    def insert_box(self, key, x0: float, y0: float, x1: float, y1: float):
+        level = self._level(max(x1 - x0, y1 - y0))
+        c = self.cell * (1 << level)
+        cells = [
+            (cx, cy)
+            for cx in range(math.floor(x0 / c), math.floor(x1 / c) + 1)
+            for cy in range(math.floor(y0 / c), math.floor(y1 / c) + 1)
+        ]
+        self.segments.pop(key, None)
+        self._insert(key, level, cells)
+
+    def insert_segment(self, key, x0: float, y0: float, x1: float, y1: float):
+        level = self._level(max(abs(x1 - x0), abs(y1 - y0)))
+        cells = list(segment_cells(x0, y0, x1, y1, self.cell * (1 << level)))
+        self._insert(key, level, cells)
+        self.segments[key] = (x0, y0, x1, y1)
+
+    def _insert(self, key, level, cells):
+        self.remove(key)
+        self.where[key] = (level, cells)
+        grid = self.levels.setdefault(level, defaultdict(set))
+        for cell in cells:
+            grid[cell].add(key)
+
+    def remove(self, key):
+        level, cells = self.where.pop(key, (0, ()))
+        self.segments.pop(key, None)
+        grid = self.levels.get(level)
+        for cell in cells:
+            bucket = grid[cell]
+            bucket.discard(key)
+            if not bucket:
+                del grid[cell]
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> set:
+        """Nøkler i rektangelet. Bokser kan gi noen ekstra treff nær kanten; linjestykker sjekkes eksakt."""
+        found = set()
+        for level, grid in self.levels.items():
+            c = self.cell * (1 << level)
+            cx0, cx1 = math.floor(x0 / c), math.floor(x1 / c)
+            cy0, cy1 = math.floor(y0 / c), math.floor(y1 / c)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(grid):
+                # Stort område: billigere å gå gjennom de ikke-tomme cellene.
+                for (cx, cy), bucket in grid.items():
+                    if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                        found |= bucket
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    bucket = grid.get((cx, cy))
+                    if bucket:
+                        found |= bucket
+        segments = self.segments
+        return {
+            key for key in found
+            if key not in segments or segment_hits_rect(*segments[key], x0, y0, x1, y1)
+        }
@@ -0,0 +1,31 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import bench
+
+def test_generated_source_has_requested_shape():
+    source = bench.generate_source(20, classes=2, fanout=4, depth=3, methods=2)
+    tree = ast.parse(source)
+    defs = [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
+    # 20 funksjoner og 4 metoder, hver med to nøstede nivåer
+    assert len(defs) == (20 + 4) * 3
+    assert sum(isinstance(n, ast.ClassDef) for n in tree.body) == 2
+
+def test_bench_writes_one_record_per_stage():
+    # Egen prosess, så gui_main ikke lastes inn i testprosessen (se test_cli)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "bench.jsonl"
+        subprocess.run([sys.executable, bench.__file__, "--sizes", "10", "30", "-o", str(out)],
+                       check=True, capture_output=True)
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(records) == 2 * len(bench.STAGES)
+    assert {r["stage"] for r in records} == set(bench.STAGES)
+    assert all(r["seconds"] >= 0 and r["nodes"] > 0 for r in records)
@@ -0,0 +1,40 @@
+import os
+import sys
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from bundling import bundle_edges
+from compact_graph import CompactGraph
+from graph_model import Graph
+from parser import EdgeInfo, NodeInfo
+
+def _graph(cls=Graph):
+    names = ["a:f", "a:g", "a:h", "b:x", "b:y", "c:z"]
+    edges = [EdgeInfo("a:f", "b:x", 3), EdgeInfo("a:g", "b:x"), EdgeInfo("a:g", "b:y"), EdgeInfo("a:f", "a:g"),
+             EdgeInfo("a:h", "c:z"), EdgeInfo("a:f", "b:x", 2)]
+    graph = cls()
+    graph.build([NodeInfo(n) for n in names], edges, [], layout=False)
+    return graph
+
+def test_repeated_edges_are_one_weighted_edge():
+    for cls in (Graph, CompactGraph):
+        graph = _graph(cls)
+        assert [(e.src.info.name, e.dst.info.name, e.weight) for e in graph.edges] == [
+            ("a:f", "b:x", 5), ("a:g", "b:x", 1), ("a:g", "b:y", 1), ("a:f", "a:g", 1), ("a:h", "c:z", 1)]
+    graph = _graph()
+    assert graph.add_edge("a:g", "b:y").weight == 2 and len(graph.edges) == 5
+
+def test_edges_between_modules_share_one_trunk():
+    graph = _graph()
+    bundling = bundle_edges(graph.nodes.values(), graph.edges)
+    # a -> b har tre kanter og buntes; a -> a og den ene a -> c tegnes direkte
+    assert {(e.src.info.name, e.dst.info.name) for e in bundling.direct} == {("a:f", "a:g"), ("a:h", "c:z")}
+    trunks = [line for line in bundling.lines if line.trunk]
+    assert [(t.src.name, t.dst.name, t.count) for t in trunks] == [("a", "b", 7)]
+    spokes = {(getattr(s.src, "name", None) or s.src.info.name, getattr(s.dst, "name", None) or s.dst.info.name,
+               s.count) for s in bundling.lines if not s.trunk}
+    assert spokes == {("a:f", "a", 5), ("a:g", "a", 2), ("b", "b:x", 6), ("b", "b:y", 1)}
+    hub = bundling.hubs["b"]
+    xs = [n.x + n.width / 2 for n in graph.nodes.values() if n.info.name.startswith("b:")]
+    assert hub.x == sum(xs) / len(xs)
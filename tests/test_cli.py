@@ -0,0 +1,24 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import cli
+
+def test_cli_exports_without_gui():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "proj"
+        root.mkdir()
+        (root / "a.py").write_text("def a():\n    b()\n\ndef b():\n    pass\n")
+        out = str(Path(tmp) / "graph")
+        assert cli.main([str(root), "-o", out, "-f", "json", "xml", "svg", "--no-cache", "-j", "1"]) == 0
+        data = json.loads(Path(out + ".json").read_text())
+        assert Path(out + ".xml").exists()
+        assert Path(out + ".svg").read_text().startswith("<svg")
+    assert sorted(n["name"] for n in data["nodes"]) == ["a:a", "a:b"]
+    assert data["edges"] == [{"src": "a:a", "dst": "a:b"}]
+    assert "gui_main" not in sys.modules
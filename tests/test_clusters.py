@@ -0,0 +1,96 @@
+import os
+import sys
+from collections import Counter
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from clusters import ClusterTree
+from graph_model import Graph
+from parser import EdgeInfo, GroupInfo, NodeInfo
+
+def _tree():
+    names = ["app.main:run", "app.main:helper", "app.db:connect", "app.db:query", "app.db:close", "util:log"]
+    nodes = {name: NodeInfo(name) for name in names}
+    edges = [("app.main:run", "app.db:connect"), ("app.main:run", "app.db:query"),
+             ("app.main:helper", "app.db:query"), ("app.db:query", "app.db:connect"),
+             ("app.main:run", "util:log"), ("app.db:close", "util:log"), ("app.main:run", "app.main:helper")]
+    graph = Graph()
+    graph.build(
+        list(nodes.values()),
+        [EdgeInfo(a, b) for a, b in edges],
+        [GroupInfo("app.db:Conn", children=[nodes["app.db:query"], nodes["app.db:close"]])],
+        layout=False,
+    )
+    return graph, ClusterTree(graph)
+
+def _counts(tree):
+    return {(e.src.name if hasattr(e.src, "kind") else e.src.info.name,
+             e.dst.name if hasattr(e.dst, "kind") else e.dst.info.name): e.count
+            for e in tree.edges.values()}
+
+def _consistent(tree):
+    a, b = tree.rep[tree.src], tree.rep[tree.dst]
+    keep = a != b
+    calls = Counter()
+    for pair, weight in zip(zip(a[keep].tolist(), b[keep].tolist()), tree.weight[keep].tolist()):
+        calls[pair] += weight
+    return calls == {k: e.count for k, e in tree.edges.items()}
+
+def test_hierarchy_and_top_level_edges():
+    graph, tree = _tree()
+    assert [c.name for c in tree.root.children] == ["app", "util"]
+    assert tree.by_name["app"].kind == "package"
+    assert [c.name for c in tree.by_name["app.db"].children] == ["app.db:Conn"]
+    assert tree.by_name["app.db:Conn"].members == ["app.db:query", "app.db:close"]
+    assert tree.by_name["app"].size == 5
+    # Bare toppnivået er synlig, med kallene slått sammen
+    assert [c.name for c in tree.visible()] == ["app", "util"]
+    assert _counts(tree) == {("app", "util"): 2}
+    assert not tree.by_name["app.db"].laid_out
+
+def test_expand_and_collapse_update_only_the_cut():
+    graph, tree = _tree()
+    change = tree.expand(tree.by_name["app"])
+    assert {getattr(k, "name", None) for k in change.added} >= {"app", "app.main", "app.db"}
+    assert _counts(tree) == {("app.main", "app.db"): 3, ("app.main", "util"): 1, ("app.db", "util"): 1}
+    assert _consistent(tree)
+
+    tree.expand(tree.by_name["app.db"])
+    assert _counts(tree)[("app.main", "app.db:Conn")] == 2
+    assert _counts(tree)[("app.db:Conn", "app.db:connect")] == 1
+    assert tree.by_name["app.db"].laid_out and _consistent(tree)
+    # Rammen omslutter barna
+    frame, conn = tree.by_name["app.db"], tree.by_name["app.db:Conn"]
+    assert frame.x < conn.x and conn.x + conn.width < frame.x + frame.width
+
+    change = tree.collapse(tree.by_name["app"])
+    assert not tree.by_name["app.db"].expanded
+    assert _counts(tree) == {("app", "util"): 2} and _consistent(tree)
+    assert graph.groups["app.db:Conn"].expanded is False
+
+def test_rebuild_keeps_expanded_clusters():
+    graph, tree = _tree()
+    tree.expand(tree.by_name["app"])
+    tree.expand(tree.by_name["app.main"])
+    again = ClusterTree(graph, expanded=tree.expanded_names())
+    assert again.expanded_names() == ["app", "app.main"]
+    assert _counts(again) == _counts(tree)
+
+def test_counts_are_calls_not_merged_edges():
+    graph, _ = _tree()
+    # Tre kall fra query til connect er én kant med vekt 3, inne i den lukkede app.db
+    graph.add_edge("app.db:query", "app.db:connect", weight=2)
+    graph.add_edge("app.main:run", "util:log", weight=4)
+    tree = ClusterTree(graph)
+    assert _counts(tree) == {("app", "util"): 6}
+    tree.expand(tree.by_name["app"])
+    assert _counts(tree)[("app.main", "util")] == 5 and _consistent(tree)
+    db = tree.by_name["app.db"]
+    src, dst, counts = tree.local_edges(db)
+    local = {(tree.item(a).name if a < len(tree.clusters) else tree.item(a).info.name,
+              tree.item(b).name if b < len(tree.clusters) else tree.item(b).info.name): n
+             for a, b, n in zip(src.tolist(), dst.tolist(), counts.tolist())}
+    assert local == {("app.db:Conn", "app.db:connect"): 3}
+    tree.expand(db)
+    assert _counts(tree)[("app.db:Conn", "app.db:connect")] == 3 and _consistent(tree)
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import export
+from compact_graph import CompactGraph
+from graph_model import Graph
+from parser import EdgeInfo, GroupInfo, NodeInfo
+from snapshot import load_snapshot, save_snapshot
+
+def _build(cls, layout=False):
+    a, b, c, d = NodeInfo("a", ["x"], ["y"]), NodeInfo("b", ["x", "z"]), NodeInfo("c"), NodeInfo("d")
+    graph = cls()
+    graph.build(
+        [a, b, c, d],
+        [EdgeInfo("a", "b"), EdgeInfo("b", "c"), EdgeInfo("c", "d"), EdgeInfo("x", "a"), EdgeInfo("a", "c")],
+        [GroupInfo("G", children=[b, c])],
+        layout=layout,
+    )
+    return graph
+
+def _summary(graph):
+    nodes = [(n.info.name, n.info.inputs, n.info.outputs, n.x, n.y, n.width, n.height)
+             for n in graph.nodes.values()]
+    edges = [(e.src.info.name, e.dst.info.name) for e in graph.edges]
+    out = {name: [e.dst.info.name for e in graph.out_edges[name]] for name in graph.nodes}
+    inc = {name: [e.src.info.name for e in graph.in_edges[name]] for name in graph.nodes}
+    groups = {name: ([c.name for c in g.info.children],
+                     [(e.src.info.name, e.dst.info.name) for e in g.connections])
+              for name, g in graph.groups.items()}
+    return nodes, edges, out, inc, groups
+
+def test_views_match_graph():
+    graph, compact = _build(Graph), _build(CompactGraph)
+    assert _summary(compact) == _summary(graph)
+    assert compact.find_edge("b", "c").dst.info.name == "c"
+    assert compact.find_edge("c", "b") is None
+    assert list(compact.names) == ["a", "b", "c", "d"] and "x" not in compact.nodes
+    assert compact.nodes["a"] == compact.edges[0].src
+    assert len({compact.nodes["a"], compact.edges[0].src}) == 1
+
+    node = compact.nodes["b"]
+    node.x, node.width = 12.5, 90
+    assert compact.pos[compact.names.index_of("b"), 0] == 12.5
+    assert compact.nodes["b"].width == 90
+
+def test_exports_and_snapshot_round_trip():
+    graph, compact = _build(Graph, layout=True), _build(CompactGraph, layout=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        export.export_to_json(graph, str(Path(tmp) / "graph"))
+        export.export_to_json(compact, str(Path(tmp) / "compact"))
+        assert (Path(tmp) / "graph.json").read_text() == (Path(tmp) / "compact.json").read_text()
+
+        base = str(Path(tmp) / "g")
+        save_snapshot(compact, base)
+        assert _summary(load_snapshot(base + ".pvg")) == _summary(graph)
+        assert _summary(load_snapshot(base + ".pvg", compact=True)) == _summary(graph)
+
+def test_layout_writes_position_array():
+    compact = _build(CompactGraph, layout=True)
+    assert compact.pos.shape == (4, 2)
+    assert len({(n.x, n.y) for n in compact.nodes.values()}) == 4
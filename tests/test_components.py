@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import components
+from components import connected_components, layout_components
+from graph_model import Graph
+from parser import EdgeInfo, NodeInfo
+
+def _islands(count, size):
+    """``count`` ringer med ``size`` noder hver, pluss tre løse noder."""
+    src, dst = [], []
+    for c in range(count):
+        base = c * size
+        for i in range(size):
+            src.append(base + i)
+            dst.append(base + (i + 1) % size)
+    n = count * size + 3
+    return n, np.array(src), np.array(dst)
+
+def _overlaps(pos, sizes):
+    boxes = np.hstack([pos, pos + sizes])
+    return sum(a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+               for i, a in enumerate(boxes) for b in boxes[i + 1:])
+
+def test_connected_components_ignore_direction():
+    label, count = connected_components(7, np.array([1, 3, 2, 5]), np.array([0, 2, 1, 4]))
+    assert count == 3
+    assert label.tolist() == [0, 0, 0, 0, 1, 1, 2]
+
+def test_components_are_packed_without_overlap():
+    n, src, dst = _islands(6, 12)
+    sizes = np.tile([140.0, 70.0], (n, 1))
+    pos = np.random.default_rng(1).uniform(0, 4000, (n, 2))
+    out = layout_components(pos, src, dst, sizes, workers=1)
+    assert _overlaps(out, sizes) == 0
+    # Ringene får ikke plass i 4000 × 4000; området vokser, men forblir omtrent kvadratisk
+    extent = (out + sizes).max(axis=0)
+    assert out.min() >= 0 and extent.max() < 6000 and extent.max() / extent.min() < 1.5
+    # Hver ring ligger samlet: boksene til to ringer overlapper ikke
+    label, _ = connected_components(n, src, dst)
+    boxes = [(out[label == c].min(axis=0), (out + sizes)[label == c].max(axis=0)) for c in range(6)]
+    for i, (lo, hi) in enumerate(boxes):
+        for lo2, hi2 in boxes[i + 1:]:
+            assert not (np.all(lo < hi2) and np.all(lo2 < hi))
+
+def test_process_pool_matches_serial_layout(monkeypatch):
+    n, src, dst = _islands(4, 30)
+    sizes = np.tile([140.0, 70.0], (n, 1))
+    pos = np.random.default_rng(2).uniform(0, 4000, (n, 2))
+    serial = layout_components(pos, src, dst, sizes, workers=1)
+    monkeypatch.setattr(components, "PARALLEL_MIN_NODES", 0)
+    parallel = layout_components(pos, src, dst, sizes, workers=2)
+    assert np.allclose(serial, parallel)
+
+    graph = Graph()
+    graph.build([NodeInfo(f"m:f{i}") for i in range(n)],
+                [EdgeInfo(f"m:f{a}", f"m:f{b}") for a, b in zip(src.tolist(), dst.tolist())], [],
+                engine="components")
+    placed = np.array([(node.x, node.y) for node in graph.nodes.values()])
+    assert _overlaps(placed, sizes) == 0
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import export
+from graph_model import Graph
+from parser import EdgeInfo, GroupInfo, NodeInfo
+from snapshot import load_snapshot, save_snapshot
+
+def _graph():
+    a, b, c = NodeInfo("a", ["x"], ["y"]), NodeInfo("b", ["ø"]), NodeInfo("c")
+    graph = Graph()
+    graph.build([a, b, c], [EdgeInfo("a", "b"), EdgeInfo("a", "b"), EdgeInfo("b", "c")],
+                [GroupInfo("G", children=[b, c])])
+    return graph
+
+def _summary(graph):
+    nodes = sorted((n.info.name, n.info.inputs, n.info.outputs, round(n.x, 6), round(n.y, 6))
+                   for n in graph.nodes.values())
+    edges = sorted((e.src.info.name, e.dst.info.name, e.weight) for e in graph.edges)
+    return nodes, edges
+
+def test_streamed_json_matches_json_dump():
+    graph = _graph()
+    expected = {
+        "nodes": [{"name": n.info.name, "inputs": n.info.inputs, "outputs": n.info.outputs,
+                   "x": n.x, "y": n.y} for n in graph.nodes.values()],
+        "edges": [{"src": "a", "dst": "b", "count": 2}, {"src": "b", "dst": "c"}],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        export.export_to_json(graph, str(Path(tmp) / "g"))
+        text = (Path(tmp) / "g.json").read_text()
+        export.export_to_json(Graph(), str(Path(tmp) / "empty"))
+        empty = (Path(tmp) / "empty.json").read_text()
+    assert text == json.dumps(expected, indent=4)
+    assert empty == json.dumps({"nodes": [], "edges": []}, indent=4)
+
+def test_jsonl_xml_and_snapshot_round_trip():
+    graph = _graph()
+    with tempfile.TemporaryDirectory() as tmp:
+        base = str(Path(tmp) / "g")
+        export.export_to_jsonl(graph, base)
+        export.export_to_xml(graph, base)
+        save_snapshot(graph, base)
+        loaded = [export.load_jsonl(base + ".jsonl"), export.load_xml(base + ".xml"), load_snapshot(base + ".pvg")]
+    for other in loaded:
+        assert _summary(other) == _summary(graph)
+    snap = loaded[2]
+    assert [c.name for c in snap.groups["G"].info.children] == ["b", "c"]
+    # De to kallene a -> b er én kant med vekt 2
+    assert len(snap.groups["G"].connections) == 2
+    assert snap.find_edge("a", "b").weight == 2
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import instrument
+from graph_model import Graph, GraphDiff
+from parser import EdgeInfo, GroupInfo, NodeInfo
+
+def _graph():
+    a, b, c, d = (NodeInfo(name) for name in "abcd")
+    graph = Graph()
+    graph.build(
+        [a, b, c, d],
+        [EdgeInfo("a", "b"), EdgeInfo("b", "c"), EdgeInfo("c", "d"), EdgeInfo("x", "a")],
+        [GroupInfo("G", children=[b, c])],
+    )
+    return graph
+
+def test_build_indexes_adjacency_and_group_connections():
+    graph = _graph()
+    assert len(graph.edges) == 3
+    assert [e.dst.info.name for e in graph.out_edges["b"]] == ["c"]
+    assert [e.src.info.name for e in graph.in_edges["b"]] == ["a"]
+    assert graph.group_of == {"b": "G", "c": "G"}
+    pairs = [(e.src.info.name, e.dst.info.name) for e in graph.groups["G"].connections]
+    assert pairs == [("a", "b"), ("b", "c"), ("c", "d")]
+    assert all(any(e is edge for edge in graph.edges) for e in graph.groups["G"].connections)
+
+def test_rebuild_starts_from_empty_graph():
+    graph = _graph()
+    graph.build([NodeInfo("z")], [], [])
+    assert list(graph.nodes) == ["z"]
+    assert graph.edges == [] and graph.groups == {}
+
+def test_remove_edge_updates_indexes():
+    graph = _graph()
+    edge = graph.find_edge("b", "c")
+    graph.remove_edge(edge)
+    assert graph.out_edges["b"] == [] and graph.in_edges["c"] == []
+    assert all(e is not edge for e in graph.edges + graph.groups["G"].connections)
+
+def test_rename_node_moves_index_entries():
+    graph = _graph()
+    assert graph.rename_node("b", "bee")
+    assert not graph.rename_node("c", "a")
+    assert "b" not in graph.nodes and graph.nodes["bee"].info.name == "bee"
+    assert [e.dst.info.name for e in graph.out_edges["bee"]] == ["c"]
+    assert graph.group_of["bee"] == "G"
+
+def test_layout_is_applied_by_name_after_a_diff():
+    graph = Graph()
+    graph.build([NodeInfo(f"f{i}") for i in range(5)], [EdgeInfo(f"f{i}", f"f{i + 1}") for i in range(4)], [])
+    snapshot = graph.layout_snapshot()
+    # Som i GUI-et: watcheren fjerner og legger til noder mens layouten går
+    graph.apply_diff(GraphDiff(added_nodes=[NodeInfo("new")], removed_nodes=["f1"],
+                               removed_edges=[EdgeInfo("f0", "f1"), EdgeInfo("f1", "f2")]))
+    new = (graph.nodes["new"].x, graph.nodes["new"].y)
+    names, pos = graph.compute_layout(snapshot=snapshot)
+    graph.set_positions((names, pos))
+    for name, (x, y) in zip(names, pos.tolist()):
+        if name != "f1":
+            assert (graph.nodes[name].x, graph.nodes[name].y) == (x, y)
+    assert "f1" not in graph.nodes
+    assert (graph.nodes["new"].x, graph.nodes["new"].y) == new
+
+def test_multilevel_build_is_not_dominated_by_overlap_removal():
+    # Tilfeldig graf med tre kanter per node; overlappsløsningen skal ikke ta mer tid enn layouten
+    n = 2000
+    rng = np.random.default_rng(0)
+    ends = rng.integers(0, n, (2, 3 * n)).tolist()
+    graph = Graph()
+    profile = instrument.enable()
+    try:
+        graph.build([NodeInfo(f"m:f{i}") for i in range(n)],
+                    [EdgeInfo(f"m:f{a}", f"m:f{b}") for a, b in zip(*ends)], [], engine="multilevel")
+    finally:
+        instrument.disable()
+    assert profile.seconds["layout.overlap"] < profile.seconds["layout.multilevel"] / 2
+    assert profile.counters["layout.overlap_placed"] < n / 100
@@ -0,0 +1,36 @@
+import os
+import sys
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import instrument
+from graph_model import Graph
+from parser import EdgeInfo, NodeInfo
+
+def _build():
+    graph = Graph()
+    graph.build([NodeInfo("a"), NodeInfo("b")], [EdgeInfo("a", "b")], [])
+    return graph
+
+def test_disabled_by_default_and_cheap():
+    assert not instrument.enabled()
+    assert instrument.stage("x") is instrument.stage("y")  # delt tom kontekst
+    instrument.count("x")
+
+def test_profile_and_hooks_collect_stages():
+    events = []
+    hook = lambda kind, name, value: events.append((kind, name))
+    instrument.add_hook(hook)
+    profile = instrument.enable()
+    try:
+        _build()
+    finally:
+        instrument.remove_hook(hook)
+        assert instrument.disable() is profile
+    assert not instrument.enabled()
+    assert {"build", "layout", "layout.force", "layout.overlap"} <= set(profile.seconds)
+    assert profile.counters["build.nodes"] == 2 and profile.counters["build.edges"] == 1
+    assert ("stage", "build") in events and ("count", "build.edges") in events
+    summary = profile.summary()
+    assert "layout.overlap" in summary and "build.nodes" in summary
@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from graph_model import Graph
+from jobs import Job
+from parser import EdgeInfo, NodeInfo
+
+def _finish(job):
+    job.thread.join(10)
+    return job.poll()
+
+def test_job_reports_progress_and_result():
+    def work(job, n):
+        for i in range(n):
+            job.progress("count", i / n)
+        return n * 2
+    messages = _finish(Job(work, 3).start())
+    assert [m for m in messages if m[0] == "progress"][-1] == ("progress", ("count", 2 / 3))
+    assert messages[-1] == ("done", 6)
+    assert _finish(Job(lambda job: 1 / 0).start())[-1][0] == "error"
+
+def test_cancel_stops_layout_and_discards_late_results():
+    started, discarded = threading.Event(), []
+
+    def work(job):
+        graph = Graph()
+        nodes = [NodeInfo(f"n{i}") for i in range(200)]
+        edges = [EdgeInfo(f"n{i}", f"n{i + 1}") for i in range(199)]
+
+        def progress(fraction):
+            started.set()
+            job.progress("layout", fraction)
+        graph.build(nodes, edges, [], progress=progress)
+        return graph
+
+    job = Job(work).start()
+    started.wait(10)
+    job.cancel()
+    assert _finish(job)[-1] == ("cancelled", None)
+
+    gate = threading.Event()
+    late = Job(lambda job: gate.wait(10) and "result", discard=discarded.append).start()
+    late.cancel()
+    gate.set()
+    assert _finish(late)[-1] == ("cancelled", None)
+    assert discarded == ["result"]
@@ -0,0 +1,109 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import instrument
+import layout
+from layout import QuadTree, coarsen, force_directed_layout, multilevel_layout, resolve_overlaps
+
+def test_barnes_hut_matches_exact_repulsion():
+    rng = np.random.default_rng(1)
+    pos = rng.uniform(0, 4000, (200, 2))
+    k2 = 1000.0
+    delta = pos[:, None, :] - pos[None, :, :]
+    d2 = np.maximum((delta * delta).sum(axis=-1), 0.01)
+    np.fill_diagonal(d2, np.inf)
+    exact = (delta * (k2 / d2)[..., None]).sum(axis=1)
+
+    assert np.allclose(QuadTree(pos).repulsion(pos, k2, theta=0.0), exact)
+    approx = QuadTree(pos).repulsion(pos, k2, theta=0.5)
+    assert np.abs(approx - exact).max() < 0.01 * np.abs(exact).max()
+
+def test_layout_pulls_connected_nodes_together_within_bounds():
+    pos = np.array([[0.0, 0.0], [4000.0, 4000.0], [0.0, 4000.0], [4000.0, 0.0]])
+    out = force_directed_layout(pos, src=[0], dst=[1])
+    assert out.shape == (4, 2)
+    assert (out >= 0).all() and (out <= 4000).all()
+    assert np.linalg.norm(out[0] - out[1]) < np.linalg.norm(out[2] - out[3])
+
+def test_resolve_overlaps_separates_boxes():
+    rng = np.random.default_rng(2)
+    pos = rng.uniform(0, 600, (100, 2))
+    sizes = np.tile([140.0, 70.0], (100, 1))
+    out = resolve_overlaps(pos, sizes, padding=0)
+    centers = out + sizes / 2
+    dx = np.abs(centers[:, None, 0] - centers[None, :, 0])
+    dy = np.abs(centers[:, None, 1] - centers[None, :, 1])
+    overlapping = (dx < 140 - 1e-6) & (dy < 70 - 1e-6)
+    np.fill_diagonal(overlapping, False)
+    assert not overlapping.any()
+
+def _overlapping_pairs(pos, sizes):
+    boxes = np.hstack([pos, pos + sizes])
+    return sum(((a[0] < boxes[i + 1:, 2]) & (boxes[i + 1:, 0] < a[2])
+                & (a[1] < boxes[i + 1:, 3]) & (boxes[i + 1:, 1] < a[3])).sum() for i, a in enumerate(boxes))
+
+def test_resolve_overlaps_clears_force_layout_clumps():
+    # Et tre fra force-layouten har tette klumper der skyvene før gikk i lås
+    n = 300
+    rng = np.random.default_rng(3)
+    pos = force_directed_layout(rng.uniform(0, 4000, (n, 2)), np.arange(1, n), rng.integers(0, np.arange(1, n)))
+    sizes = np.tile([140.0, 70.0], (n, 1))
+    clean = resolve_overlaps(pos, sizes)
+    assert _overlapping_pairs(clean, sizes) == 0
+    # Med for få pass plasseres resten på ledige plasser; fastlåste noder står
+    fixed = np.zeros(n, dtype=bool)
+    fixed[::7] = True
+    moved = np.where(fixed[:, None], clean, pos)
+    out = resolve_overlaps(moved, sizes, max_passes=2, fixed=fixed)
+    assert _overlapping_pairs(out, sizes) == 0
+    assert np.array_equal(out[fixed], clean[fixed])
+
+def test_resolve_overlaps_on_random_graph_stays_well_under_the_cap():
+    # Tilfeldig graf med tre kanter per node: force-layouten gir en tett kjerne
+    n = 3000
+    rng = np.random.default_rng(0)
+    pos = force_directed_layout(rng.uniform(0, 4000, (n, 2)), rng.integers(0, n, 3 * n), rng.integers(0, n, 3 * n))
+    sizes = np.tile([140.0, 70.0], (n, 1))
+    profile = instrument.enable()
+    try:
+        out = resolve_overlaps(pos, sizes)
+    finally:
+        instrument.disable()
+    assert _overlapping_pairs(out, sizes) == 0
+    assert profile.counters["layout.overlap_passes"] < layout.PASSES_PER_DOUBLING * np.ceil(np.log2(n))
+    assert profile.counters["layout.overlap_placed"] < n / 100
+
+def _two_communities(n=200):
+    # To tette grupper med én kant mellom seg
+    rng = np.random.default_rng(3)
+    half = n // 2
+    src = np.concatenate([rng.integers(0, half, 3 * half), rng.integers(half, n, 3 * half), [0]])
+    dst = np.concatenate([rng.integers(0, half, 3 * half), rng.integers(half, n, 3 * half), [half]])
+    return src, dst
+
+def test_coarsening_merges_along_edges():
+    src, dst = _two_communities()
+    parent, coarse = coarsen(200, src, dst)
+    assert coarse < 0.7 * 200
+    merged = parent[src] == parent[dst]
+    assert merged.any()
+    # Matching gir små grupper, ingen grov node sluker en stor del av grafen
+    groups = np.bincount(parent)
+    assert groups.max() <= 200 // 10
+
+def test_multilevel_separates_communities_and_keeps_warm_layout():
+    src, dst = _two_communities()
+    grid = np.stack([np.arange(200) % 10 * 400 + 50, np.arange(200) // 10 * 200 + 50], axis=1).astype(float)
+    out = multilevel_layout(grid, src, dst, min_nodes=20)
+    assert (out >= 0).all() and (out <= 4000).all()
+    a, b = out[:100].mean(axis=0), out[100:].mean(axis=0)
+    spread = max(out[:100].std(axis=0).max(), out[100:].std(axis=0).max())
+    assert np.linalg.norm(a - b) > spread
+
+    again = multilevel_layout(out, src, dst, min_nodes=20, warm_start=True)
+    assert np.linalg.norm(again - out, axis=1).mean() < np.linalg.norm(out - grid, axis=1).mean() / 3
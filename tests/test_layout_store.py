@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import instrument
+from graph_model import Graph
+from layout_store import LayoutStore
+from parser import EdgeInfo, NodeInfo
+
+def _infos(n):
+    nodes = [NodeInfo(f"m:f{i}") for i in range(n)]
+    edges = [EdgeInfo(f"m:f{i}", f"m:f{(i * 7 + 1) % n}") for i in range(n)]
+    return nodes, edges
+
+def _overlaps(graph):
+    boxes = [(n.x, n.y, n.x + n.width, n.y + n.height) for n in graph.nodes.values()]
+    return sum(a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+               for i, a in enumerate(boxes) for b in boxes[i + 1:])
+
+def test_store_round_trip_and_pins():
+    with tempfile.TemporaryDirectory() as tmp:
+        nodes, edges = _infos(5)
+        graph = Graph()
+        graph.build(nodes, edges, [])
+        with LayoutStore(Path(tmp) / "layout.sqlite") as store:
+            store.save(Path(tmp), graph)
+            node = graph.nodes["m:f2"]
+            node.x += 500
+            store.pin(Path(tmp), node)
+            loaded = store.load(Path(tmp))
+            assert loaded["m:f2"] == (node.x, node.y, True)
+            assert loaded["m:f0"] == (graph.nodes["m:f0"].x, graph.nodes["m:f0"].y, False)
+            assert store.load(Path(tmp) / "other") == {}
+            store.forget(Path(tmp))
+            assert store.load(Path(tmp)) == {}
+
+def test_rebuild_restores_positions_without_global_layout():
+    nodes, edges = _infos(40)
+    graph = Graph()
+    graph.build(nodes, edges, [])
+    positions = {name: (n.x, n.y, name == "m:f3") for name, n in graph.nodes.items()}
+
+    # To nye noder: én som kalles fra en gammel, én uten kanter
+    nodes2 = nodes + [NodeInfo("m:new"), NodeInfo("m:alone")]
+    edges2 = edges + [EdgeInfo("m:f5", "m:new")]
+    again = Graph()
+    profile = instrument.enable()
+    try:
+        again.build(nodes2, edges2, [], positions=positions)
+    finally:
+        instrument.disable()
+    assert "layout.force" not in profile.seconds and "layout.incremental" in profile.seconds
+    for name, (x, y, pinned) in positions.items():
+        node = again.nodes[name]
+        assert (node.x, node.y, node.pinned) == (x, y, pinned)
+    assert _overlaps(again) == 0
+    # Den nye noden havner nær kalleren, den løse til høyre for grafen
+    new, caller = again.nodes["m:new"], again.nodes["m:f5"]
+    assert abs(new.x - caller.x) + abs(new.y - caller.y) < 600
+    assert again.nodes["m:alone"].x >= max(n.x + n.width for n in graph.nodes.values())
+
+def test_relayout_leaves_pinned_nodes():
+    nodes, edges = _infos(20)
+    graph = Graph()
+    graph.build(nodes, edges, [])
+    pinned = graph.nodes["m:f4"]
+    pinned.x, pinned.y, pinned.pinned = 3000.0, 3000.0, True
+    graph.apply_layout("force")
+    assert (pinned.x, pinned.y) == (3000.0, 3000.0)
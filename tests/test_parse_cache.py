@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import parse_cache
+import parser
+from parse_cache import ParseCache
+from parser import parse_file, parse_project
+
+def test_cache_hit_miss_and_invalidation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.py"
+        path.write_text("def a():\n    b()\n\ndef b():\n    pass\n")
+        with ParseCache(Path(tmp) / "cache.sqlite") as cache:
+            first = parse_file(path, cache=cache)
+            again = parse_file(path, cache=cache)
+            assert again == first
+            assert (cache.hits, cache.misses) == (1, 1)
+
+            path.write_text("def c():\n    pass\n")
+            changed = parse_file(path, cache=cache)
+            assert [n.name for n in changed[0]] == ["c"]
+            assert cache.misses == 2
+
+def test_file_saved_during_parse_is_not_served_stale(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.py"
+        path.write_text("def a():\n    pass\n")
+        parse = parser._parse_file
+
+        def parse_then_save(*args):
+            result = parse(*args)
+            path.write_text("def b():\n    pass\n\ndef c():\n    pass\n")  # lagret før put
+            return result
+
+        with ParseCache(Path(tmp) / "cache.sqlite") as cache:
+            monkeypatch.setattr(parser, "_parse_file", parse_then_save)
+            assert [n.name for n in parse_file(path, cache=cache)[0]] == ["a"]
+            monkeypatch.setattr(parser, "_parse_file", parse)
+            assert [n.name for n in parse_file(path, cache=cache)[0]] == ["b", "c"]
+            assert cache.hits == 0
+
+def test_cache_is_dropped_on_parser_version_change(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.py"
+        path.write_text("def a():\n    pass\n")
+        db = Path(tmp) / "cache.sqlite"
+        with ParseCache(db) as cache:
+            parse_file(path, cache=cache)
+        monkeypatch.setattr(parse_cache, "PARSER_VERSION", -1)
+        with ParseCache(db) as cache:
+            assert cache.get(path, "classes=1,functions=1") is None
+
+def test_cache_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "proj"
+        root.mkdir()
+        for name in "abc":
+            (root / f"{name}.py").write_text(f"def {name}():\n    pass\n")
+        with ParseCache(Path(tmp) / "cache.sqlite") as cache:
+            parse_project(root, workers=1, cache=cache)
+            size = cache.db.execute("SELECT MAX(nbytes) FROM entries").fetchone()[0]
+            cache.max_bytes = 2 * size
+            cache.get(root / "a.py", "classes=1,functions=1")
+            cache.get(root / "c.py", "classes=1,functions=1")
+            cache.flush()
+            kept = {Path(p).name for (p,) in cache.db.execute("SELECT path FROM entries")}
+        assert kept == {"a.py", "c.py"}
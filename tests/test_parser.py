@@ -6,7 +6,7 @@ from pathlib import Path
 # Ensure repository root is on the import path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from parser import parse_file
+from parser import parse_file, parse_project
 
 def test_parse_file_edges():
     code = """
@@ -23,3 +23,71 @@ def b():
     names = sorted(n.name for n in nodes)
     assert names == ["a", "b"]
     assert any(e.caller == "a" and e.callee == "b" for e in edges)
+
+def test_parse_project_qualifies_names():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "pkg").mkdir()
+        (root / "pkg" / "__init__.py").write_text("")
+        (root / "pkg" / "a.py").write_text("def run():\n    helper()\n\ndef helper():\n    pass\n")
+        (root / "pkg" / "b.py").write_text("def run():\n    helper()\n")
+        serial = parse_project(root, workers=1)
+        parallel = parse_project(root, workers=2)
+    assert serial == parallel
+    nodes, edges, groups = serial
+    assert sorted(n.name for n in nodes) == ["pkg.a:helper", "pkg.a:run", "pkg.b:run"]
+    assert any(e.caller == "pkg.a:run" and e.callee == "pkg.a:helper" for e in edges)
+    assert any(e.caller == "pkg.b:run" and e.callee == "helper" for e in edges)
+
+def test_imported_attribute_and_method_calls_resolve():
+    files = {
+        "pkg/__init__.py": "from .impl import exported\n",
+        "pkg/impl.py": (
+            "def exported():\n    pass\n\n"
+            "class Store:\n"
+            "    def __init__(self):\n        self.load()\n\n"
+            "    def load(self):\n        helper()\n\n"
+            "    async def save(self):\n        await self.flush()\n\n"
+            "    async def flush(self):\n        pass\n\n"
+            "def helper():\n    pass\n"
+        ),
+        "pkg/sub/__init__.py": "",
+        "pkg/sub/use.py": (
+            "import pkg.impl\nimport pkg.impl as impl_mod\nfrom pkg import exported\n"
+            "from ..impl import Store, helper as h\n\n"
+            "async def main():\n"
+            "    pkg.impl.helper()\n    impl_mod.exported()\n    exported()\n"
+            "    Store()\n    h()\n    len([])\n"
+        ),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name, text in files.items():
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_text(text)
+        nodes, edges, groups = parse_project(root, workers=1)
+    assert "pkg.impl:Store.save" in {n.name for n in nodes}
+    assert [c.name for c in groups[0].children] == [
+        "pkg.impl:Store.__init__", "pkg.impl:Store.load", "pkg.impl:Store.save", "pkg.impl:Store.flush"]
+    pairs = {(e.caller, e.callee) for e in edges}
+    assert {("pkg.impl:Store.__init__", "pkg.impl:Store.load"), ("pkg.impl:Store.load", "pkg.impl:helper"),
+            ("pkg.impl:Store.save", "pkg.impl:Store.flush")} <= pairs
+    assert {callee for caller, callee in pairs if caller == "pkg.sub.use:main"} == {
+        "pkg.impl:helper", "pkg.impl:exported", "pkg.impl:Store.__init__", "len"}
+
+def test_repeated_calls_become_one_counted_edge():
+    code = "def a():\n    for _ in range(3):\n        log()\n    log()\n    b()\n\ndef b():\n    pass\n\ndef log():\n    pass\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.py"
+        path.write_text(code)
+        nodes, edges, groups = parse_file(path)
+    assert [(e.caller, e.callee, e.count) for e in edges] == [("a", "range", 1), ("a", "log", 2), ("a", "b", 1)]
+
+def test_syntax_errors_are_logged_not_written_to_cwd(caplog, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.chdir(tmp)
+        path = Path(tmp) / "broken.py"
+        path.write_text("def broken(:\n")
+        assert parse_file(path) == ([], [], [])
+        assert "broken.py" in caplog.text
+        assert os.listdir(tmp) == ["broken.py"]
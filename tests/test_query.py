@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from graph_model import Graph
+from parser import EdgeInfo, NodeInfo
+from query import QueryIndex
+
+def _graph():
+    names = ["app.main:run", "app.main:Runner.start", "app.db:connect", "app.db:query", "util:log", "util:unused"]
+    edges = [("app.main:run", "app.main:Runner.start"), ("app.main:Runner.start", "app.db:query"),
+             ("app.db:query", "app.db:connect"), ("app.db:connect", "util:log"), ("app.main:run", "util:log")]
+    graph = Graph()
+    graph.build([NodeInfo(n) for n in names], [EdgeInfo(a, b) for a, b in edges], [], layout=False)
+    return graph
+
+def test_prefix_search_matches_short_and_full_names():
+    query = QueryIndex(_graph())
+    assert query.search("app.db") == ["app.db:query", "app.db:connect"]
+    assert query.search("st") == ["app.main:Runner.start"]
+    assert query.search("RUNNER") == ["app.main:Runner.start"]
+    assert set(query.search("u")) == {"util:log", "util:unused"}
+    assert query.search("") == [] and query.search("nothing") == []
+
+def test_reachability_and_call_path():
+    query = QueryIndex(_graph())
+    assert query.callees("app.main:run") == {"app.main:Runner.start", "app.db:query", "app.db:connect", "util:log"}
+    assert query.callees("app.main:run", depth=1) == {"app.main:Runner.start", "util:log"}
+    assert query.callers("app.db:connect") == {"app.db:query", "app.main:Runner.start", "app.main:run"}
+    assert query.callers("util:unused") == frozenset()
+    assert query.call_path("app.main:run", "app.db:connect") == [
+        "app.main:run", "app.main:Runner.start", "app.db:query", "app.db:connect"]
+    assert query.call_path("app.main:run", "util:log") == ["app.main:run", "util:log"]
+    assert query.call_path("util:log", "app.main:run") is None
+
+def test_answers_are_memoized_until_the_graph_changes():
+    graph = _graph()
+    query = QueryIndex(graph)
+    first = query.callers("util:log")
+    assert query.callers("util:log") is first
+    graph.add_edge("util:unused", "util:log")
+    assert query.callers("util:log") == first | {"util:unused"}
+    graph.rename_node("util:unused", "util:used")
+    assert query.search("used") == ["util:used"]
+    edge = graph.find_edge("app.db:query", "app.db:connect")
+    graph.remove_edge(edge)
+    assert query.call_path("app.main:run", "app.db:connect") is None
@@ -0,0 +1,77 @@
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import render
+from compact_graph import CompactGraph
+from graph_model import Graph
+from parser import EdgeInfo, NodeInfo
+
+def _read_png(path):
+    """Dekod en PNG fra ``render`` (8 bit RGB, filtertype 0) til et array."""
+    data = Path(path).read_bytes()
+    assert data[:8] == render.PNG_SIGNATURE
+    pos, idat, size = 8, b"", None
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(kind + body)
+        if kind == b"IHDR":
+            size = struct.unpack(">II", body[:8])
+        elif kind == b"IDAT":
+            idat += body
+        pos += 12 + length
+    width, height = size
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, width * 3 + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 3)
+
+def _graph(cls=Graph):
+    graph = cls()
+    graph.build([NodeInfo("m:a"), NodeInfo("m:b"), NodeInfo("m:c")],
+                [EdgeInfo("m:a", "m:b"), EdgeInfo("m:b", "m:c")], [], layout=False)
+    for name, (x, y) in {"m:a": (0, 0), "m:b": (400, 300), "m:c": (900, 40)}.items():
+        graph.nodes[name].x, graph.nodes[name].y = x, y
+    return graph
+
+def test_png_is_drawn_from_graph_coordinates():
+    with tempfile.TemporaryDirectory() as tmp:
+        render.render_png(_graph(), Path(tmp) / "g.png")
+        image = _read_png(Path(tmp) / "g.png")
+    # Bredde og høyde: fra (0, 0) til (1040, 370), pluss margen på hver side
+    assert image.shape == (370 + 2 * render.MARGIN, 1040 + 2 * render.MARGIN, 3)
+    m = render.MARGIN
+    assert tuple(image[m + 35, m + 70]) == render.NODE_FILL  # midt i m:a
+    assert tuple(image[m, m + 70]) == render.NODE_OUTLINE
+    assert tuple(image[m + 200, m + 600]) == render.BACKGROUND
+    # Kanten m:a -> m:b går fra (140, 35) til (400, 335); midtpunktet er farget
+    assert tuple(image[m + 185, m + 270]) == render.EDGE_COLOR
+
+def test_tile_pyramid_matches_full_image():
+    with tempfile.TemporaryDirectory() as tmp:
+        render.render_png(_graph(), Path(tmp) / "g.png")
+        full = _read_png(Path(tmp) / "g.png")
+        top = render.render_tiles(_graph(), Path(tmp) / "tiles", tile_size=256)
+        meta = json.loads((Path(tmp) / "tiles" / "tiles.json").read_text())
+        assert top == meta["max_zoom"] == 3  # 1080 piksler bredt: 1, 2, 4 og 8 fliser bortover
+        assert _read_png(Path(tmp) / "tiles" / "0" / "0" / "0.png").shape == (256, 256, 3)
+        # Fliser på høyeste nivå er utsnitt av bildet i full størrelse
+        for col, row in ((0, 0), (1, 1), (3, 0)):
+            tile = _read_png(Path(tmp) / "tiles" / "3" / str(col) / f"{row}.png")
+            part = full[row * 256:(row + 1) * 256, col * 256:(col + 1) * 256]
+            assert np.array_equal(tile[:part.shape[0], :part.shape[1]], part)
+
+def test_compact_graph_renders_like_graph():
+    with tempfile.TemporaryDirectory() as tmp:
+        render.render_png(_graph(), Path(tmp) / "a.png")
+        render.render_png(_graph(CompactGraph), Path(tmp) / "b.png")
+        assert (Path(tmp) / "a.png").read_bytes() == (Path(tmp) / "b.png").read_bytes()
@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from spatial import GridIndex, segment_hits_rect
+
+def test_query_finds_every_box_and_segment_in_view():
+    rnd = random.Random(3)
+    index = GridIndex(cell=100)
+    boxes, segments = {}, {}
+    for i in range(300):
+        x, y = rnd.uniform(0, 5000), rnd.uniform(0, 5000)
+        boxes[f"n{i}"] = (x, y, x + 100, y + 50)
+        index.insert_box(f"n{i}", *boxes[f"n{i}"])
+        seg = tuple(rnd.uniform(0, 5000) for _ in range(4))
+        segments[f"e{i}"] = seg
+        index.insert_segment(f"e{i}", *seg)
+
+    view = (1000, 1500, 2200, 2300)
+    found = index.query(*view)
+    for key, (x0, y0, x1, y1) in boxes.items():
+        if x0 <= view[2] and x1 >= view[0] and y0 <= view[3] and y1 >= view[1]:
+            assert key in found
+    expected = {key for key, seg in segments.items() if segment_hits_rect(*seg, *view)}
+    assert {key for key in found if key.startswith("e")} == expected
+
+def test_remove_and_reinsert():
+    index = GridIndex(cell=100)
+    index.insert_box("a", 0, 0, 10, 10)
+    index.insert_box("a", 900, 900, 910, 910)
+    assert index.query(0, 0, 50, 50) == set()
+    assert index.query(850, 850, 950, 950) == {"a"}
+    index.remove("a")
+    assert "a" not in index and index.query(0, 0, 1000, 1000) == set()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure repository root is on the import path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from graph_model import Graph
+from watch import SourceWatcher
+
+def _touch_later(path: Path, text: str):
+    stamp = path.stat().st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(stamp + 10**9, stamp + 10**9))
+
+def test_poll_diffs_only_changed_module():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "a.py").write_text("def run():\n    helper()\n\ndef helper():\n    pass\n")
+        (root / "b.py").write_text("def other():\n    pass\n")
+        watcher = SourceWatcher(root)
+        graph = Graph()
+        graph.build(*watcher.load())
+        before = {name: (n.x, n.y) for name, n in graph.nodes.items()}
+
+        assert watcher.poll().is_empty()
+
+        _touch_later(root / "a.py", "def run(x):\n    extra()\n\ndef extra():\n    pass\n")
+        diff = watcher.poll()
+        graph.apply_diff(diff)
+
+    assert [n.name for n in diff.added_nodes] == ["a:extra"]
+    assert diff.removed_nodes == ["a:helper"]
+    assert [n.name for n in diff.changed_nodes] == ["a:run"]
+    assert [(e.caller, e.callee) for e in diff.removed_edges] == [("a:run", "a:helper")]
+    assert [(e.caller, e.callee) for e in diff.added_edges] == [("a:run", "a:extra")]
+
+    assert sorted(graph.nodes) == ["a:extra", "a:run", "b:other"]
+    assert graph.nodes["a:run"].info.inputs == ["x"]
+    for name in ("a:run", "b:other"):
+        assert (graph.nodes[name].x, graph.nodes[name].y) == before[name]
+    assert [(e.src.info.name, e.dst.info.name) for e in graph.edges] == [("a:run", "a:extra")]
+
+def test_new_definition_links_calls_from_unchanged_module():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "a.py").write_text("def other():\n    pass\n")
+        (root / "b.py").write_text("import a\n\ndef run():\n    a.helper()\n")
+        watcher = SourceWatcher(root)
+        nodes, edges, groups = watcher.load()
+        assert [(e.caller, e.callee) for e in edges] == [("b:run", "a.helper")]
+
+        _touch_later(root / "a.py", "def other():\n    pass\n\ndef helper():\n    pass\n")
+        diff = watcher.poll()
+
+    assert [n.name for n in diff.added_nodes] == ["a:helper"]
+    assert [(e.caller, e.callee) for e in diff.removed_edges] == [("b:run", "a.helper")]
+    assert [(e.caller, e.callee) for e in diff.added_edges] == [("b:run", "a:helper")]